@@ -2,7 +2,7 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Product, Category, Order, OrderItem, Coupon, CouponUsage, Design, Address, Wishlist
+from .models import CustomUser, Product, Category, Order, OrderItem, Coupon, CouponTier, CouponUsage, Design, Address, Wishlist
 
 class CustomUserAdmin(UserAdmin):
     # Use the default UserAdmin configuration but for our CustomUser model
@@ -26,6 +26,11 @@ admin.site.register(Wishlist)
 # COUPON ADMIN CONFIGURATION
 # ==============================================================================
 
+class CouponTierInline(admin.TabularInline):
+    model = CouponTier
+    extra = 0
+
+
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
     list_display = ['code', 'name', 'discount_type', 'discount_value', 'is_active', 'valid_from', 'valid_until', 'total_uses']
@@ -33,13 +38,14 @@ class CouponAdmin(admin.ModelAdmin):
     search_fields = ['code', 'name', 'description']
     readonly_fields = ['total_uses', 'created_at', 'updated_at']
     filter_horizontal = ['categories', 'products', 'user_restrictions']
+    inlines = [CouponTierInline]
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('code', 'name', 'description', 'created_by')
         }),
         ('Discount Configuration', {
-            'fields': ('discount_type', 'discount_value', 'minimum_order_value')
+            'fields': ('discount_type', 'discount_value', 'buy_quantity', 'get_quantity', 'minimum_order_value')
         }),
         ('Usage Limits', {
             'fields': ('max_uses_total', 'max_uses_per_user', 'total_uses')
@@ -0,0 +1,266 @@
+# backend/api/analytics_utils.py
+
+import logging
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth, TruncWeek
+from .models import ArchivedOrder, Category, Coupon, Order, OrderItem, Product, ProductVariant, SalesRollup
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+BREAKDOWNS = ('category', 'product', 'variant', 'gender', 'coupon')
+
+# Cancelled orders are left out of reports unless explicitly requested
+DEFAULT_REPORT_STATUSES = ('pending', 'shipped', 'delivered')
+
+METRICS = ('orders', 'units', 'gross_sales', 'discount', 'net_sales')
+
+
+def get_bucket(timestamp):
+    """Start of the rollup hour containing timestamp"""
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def build_order_contributions(order_ids):
+    """
+    What each order adds to the rollups, independent of its status:
+    {order_id: (bucket, {(dimension, key): [orders, units, gross, discount, net]})}.
+    Two queries however many orders are passed.
+    """
+    contributions = {}
+    orders = Order.objects.filter(id__in=order_ids).values_list(
+        'id', 'created_at', 'original_price', 'discount_amount', 'total_price', 'applied_coupon_id'
+    )
+    for order_id, created_at, original_price, discount, total_price, coupon_id in orders:
+        rows = {('total', ''): [1, 0, original_price, discount, total_price]}
+        if coupon_id:
+            rows[('coupon', str(coupon_id))] = [1, 0, original_price, discount, total_price]
+        contributions[order_id] = (get_bucket(created_at), rows)
+
+    items = OrderItem.objects.filter(order_id__in=contributions).values_list(
+        'order_id', 'product_id', 'product__category_id', 'product__gender', 'variant_id',
+        'quantity', 'price', 'variant__price_modifier', 'discount_amount'
+    )
+    for order_id, product_id, category_id, gender, variant_id, quantity, price, modifier, discount in items:
+        rows = contributions[order_id][1]
+        for key, values in rows.items():
+            if key[0] in ('total', 'coupon'):
+                values[1] += quantity
+
+        # Same line value as OrderItem.refundable_amount
+        gross = (price + (modifier or 0)) * quantity
+        keys = [('category', str(category_id or '')), ('product', str(product_id)), ('gender', gender)]
+        if variant_id:
+            keys.append(('variant', str(variant_id)))
+        for key in keys:
+            values = rows.get(key)
+            if values is None:
+                rows[key] = [1, quantity, gross, discount, gross - discount]
+            else:
+                values[1] += quantity
+                values[2] += gross
+                values[3] += discount
+                values[4] += gross - discount
+
+    return contributions
+
+
+def apply_status_changes(changes):
+    """
+    Move orders between status rollups. changes is an iterable of
+    (order_id, old_status, new_status), with old_status None for new orders.
+    """
+    changes = [(order_id, old, new) for order_id, old, new in changes if old != new]
+    if not changes:
+        return
+
+    contributions = build_order_contributions({order_id for order_id, _, _ in changes})
+    deltas = defaultdict(lambda: [0, 0, Decimal('0'), Decimal('0'), Decimal('0')])
+    for order_id, old_status, new_status in changes:
+        if order_id not in contributions:
+            continue
+        bucket, rows = contributions[order_id]
+        for sign, order_status in ((-1, old_status), (1, new_status)):
+            if order_status is None:
+                continue
+            for (dimension, key), values in rows.items():
+                delta = deltas[(bucket, order_status, dimension, key)]
+                for position, value in enumerate(values):
+                    delta[position] += sign * value
+
+    for attempt in range(3):
+        try:
+            with transaction.atomic():
+                _write_deltas(deltas)
+            return
+        except IntegrityError:
+            # Another writer created one of our rows first; retrying updates it instead
+            if attempt == 2:
+                raise
+
+
+def _write_deltas(deltas):
+    """Add deltas to existing rollup rows (locked) and create the missing ones"""
+    existing = SalesRollup.objects.select_for_update().filter(
+        bucket__in={key[0] for key in deltas},
+        status__in={key[1] for key in deltas},
+        dimension__in={key[2] for key in deltas},
+        key__in={key[3] for key in deltas},
+    ).order_by('id')
+
+    updated = []
+    for rollup in existing:
+        delta = deltas.get((rollup.bucket, rollup.status, rollup.dimension, rollup.key))
+        if delta is None:
+            continue
+        for field, value in zip(METRICS, delta):
+            setattr(rollup, field, getattr(rollup, field) + value)
+        updated.append(rollup)
+
+    found = {(rollup.bucket, rollup.status, rollup.dimension, rollup.key) for rollup in updated}
+    if updated:
+        SalesRollup.objects.bulk_update(updated, METRICS)
+    SalesRollup.objects.bulk_create([
+        SalesRollup(bucket=bucket, status=order_status, dimension=dimension, key=key,
+                    **dict(zip(METRICS, delta)))
+        for (bucket, order_status, dimension, key), delta in deltas.items()
+        if (bucket, order_status, dimension, key) not in found
+    ])
+
+
+def record_status_changes(changes):
+    """
+    Update rollups for (order_id, old_status, new_status) changes once the
+    current transaction commits. Failures are logged rather than raised;
+    rebuild_sales_rollups repairs any drift.
+    """
+    changes = [change for change in changes if change[1] != change[2]]
+    if not changes:
+        return
+
+    def run():
+        try:
+            apply_status_changes(changes)
+        except Exception as e:
+            logger.error(f"Failed to update sales rollups for orders {[change[0] for change in changes]}: {e}")
+
+    transaction.on_commit(run)
+
+
+def _hour_buckets(queryset, field):
+    """Distinct rollup buckets (UTC hours, as get_bucket) of a datetime column"""
+    return set(
+        queryset.annotate(hour=TruncHour(field, tzinfo=dt_timezone.utc))
+        .values_list('hour', flat=True).distinct()
+    )
+
+
+def rebuild_sales_rollups(start=None, end=None, batch_size=2000):
+    """
+    Recompute rollups for orders placed in [start, end) from scratch (all
+    orders when unset). Bounds are truncated to the hour. Hours that contain
+    an archived order are kept as they are, since that order is no longer in
+    Order. Each hour is rebuilt in its own transaction so live rollup updates
+    are only held up briefly. Returns the number of orders rolled up.
+    """
+    orders = Order.objects.all()
+    rollups = SalesRollup.objects.all()
+    archived = ArchivedOrder.objects.all()
+    if start:
+        orders = orders.filter(created_at__gte=get_bucket(start))
+        rollups = rollups.filter(bucket__gte=get_bucket(start))
+        archived = archived.filter(created_at__gte=get_bucket(start))
+    if end:
+        orders = orders.filter(created_at__lt=get_bucket(end))
+        rollups = rollups.filter(bucket__lt=get_bucket(end))
+        archived = archived.filter(created_at__lt=get_bucket(end))
+
+    hours = _hour_buckets(orders, 'created_at') | set(rollups.values_list('bucket', flat=True).distinct())
+    hours -= _hour_buckets(archived, 'created_at')
+
+    rolled_up = 0
+    for hour in sorted(hours):
+        hour_orders = orders.filter(created_at__gte=hour, created_at__lt=hour + timedelta(hours=1))
+        last_id = 0
+        with transaction.atomic():
+            SalesRollup.objects.filter(bucket=hour).delete()
+            while True:
+                batch = list(
+                    hour_orders.filter(id__gt=last_id).order_by('id').values_list('id', 'status')[:batch_size]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                apply_status_changes((order_id, None, order_status) for order_id, order_status in batch)
+                rolled_up += len(batch)
+    return rolled_up
+
+
+def get_breakdown_labels(dimension, keys):
+    """Display names for rollup keys of a breakdown dimension"""
+    ids = [int(key) for key in keys if key.isdigit()]
+    if dimension == 'category':
+        labels = {str(pk): name for pk, name in Category.objects.filter(id__in=ids).values_list('id', 'name')}
+        labels[''] = 'Uncategorized'
+    elif dimension == 'product':
+        labels = {str(pk): name for pk, name in Product.objects.filter(id__in=ids).values_list('id', 'name')}
+    elif dimension == 'variant':
+        labels = {
+            str(variant.id): f"{variant.product.name} - {variant.name}"
+            for variant in ProductVariant.objects.filter(id__in=ids).select_related('product')
+        }
+    elif dimension == 'gender':
+        labels = dict(Product.GENDER_CHOICES)
+    else:
+        labels = {str(pk): code for pk, code in Coupon.objects.filter(id__in=ids).values_list('id', 'code')}
+    return labels
+
+
+def get_sales_report(start, end, granularity='day', statuses=None, breakdown=None, limit=20):
+    """
+    Sales between start (inclusive) and end (exclusive) from the rollups:
+    overall totals, a time series at the given granularity, totals per status
+    and optionally the top `limit` keys of a breakdown dimension by net sales.
+    """
+    statuses = list(statuses or DEFAULT_REPORT_STATUSES)
+    sums = {metric: Sum(metric) for metric in METRICS}
+    rollups = SalesRollup.objects.filter(
+        bucket__gte=get_bucket(start), bucket__lt=end, status__in=statuses
+    )
+    totals = rollups.filter(dimension='total')
+
+    summary = totals.aggregate(**sums)
+    report = {
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'statuses': statuses,
+        'summary': {metric: summary[metric] or 0 for metric in METRICS},
+        'series': list(
+            totals.annotate(period=GRANULARITIES[granularity]('bucket'))
+            .values('period').annotate(**sums).order_by('period')
+        ),
+        'by_status': list(totals.values('status').annotate(**sums).order_by('status')),
+    }
+
+    if breakdown:
+        rows = list(
+            rollups.filter(dimension=breakdown).values('key')
+            .annotate(**sums).order_by('-net_sales', 'key')[:limit]
+        )
+        labels = get_breakdown_labels(breakdown, [row['key'] for row in rows])
+        for row in rows:
+            row['label'] = labels.get(row['key'], row['key'])
+        report['breakdown'] = {'dimension': breakdown, 'rows': rows}
+
+    return report
@@ -0,0 +1,155 @@
+# backend/api/archive_utils.py
+
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Prefetch, Q, Value, When
+from django.utils import timezone
+from .models import (
+    ArchivedCouponUsage, ArchivedOrder, ArchivedOrderItem, ArchivedRewardTransaction,
+    CouponUsage, Order, OrderItem, RewardPoints, RewardTransaction,
+)
+
+# Orders in these states never change again
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled')
+
+
+def get_archive_cutoff(days=None, now=None):
+    """Orders placed before this moment are old enough to archive"""
+    days = settings.ORDER_ARCHIVE_AFTER_DAYS if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archivable_orders(cutoff):
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+
+
+def archive_orders_batch(order_ids, cutoff):
+    """
+    Move a batch of orders, with their items and coupon usage, to the archive
+    tables in one short transaction. Orders locked by another writer are
+    skipped and left for a later run. Returns the number of orders archived.
+    """
+    from .serializers import OrderSerializer
+
+    with transaction.atomic():
+        locked_ids = list(
+            archivable_orders(cutoff).filter(id__in=order_ids)
+            .select_for_update(skip_locked=True).values_list('id', flat=True)
+        )
+        if not locked_ids:
+            return 0
+
+        orders = (
+            Order.objects.filter(id__in=locked_ids)
+            .select_related('applied_coupon')
+            .prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('product', 'variant').order_by('id')),
+                'status_events', 'shipment_events',
+            )
+        )
+
+        archived_orders = []
+        archived_items = []
+        for order in orders:
+            items = list(order.items.all())
+            data = {
+                # Exactly what OrderDetailView returned for the live order
+                'order': OrderSerializer(order).data,
+                'status_events': [
+                    {'from_status': event.from_status, 'to_status': event.to_status, 'source': event.source,
+                     'actor_id': event.actor_id, 'note': event.note, 'created_at': event.created_at}
+                    for event in order.status_events.all()
+                ],
+                'shipment_events': [
+                    {'status': event.status, 'activity': event.activity, 'location': event.location,
+                     'event_time': event.event_time, 'source': event.source}
+                    for event in order.shipment_events.all()
+                ],
+            }
+            first_image = items[0].product.image if items else None
+            archived_orders.append(ArchivedOrder(
+                id=order.id,
+                user_id=order.user_id,
+                status=order.status,
+                total_price=order.total_price,
+                item_count=sum(item.quantity for item in items),
+                thumbnail=first_image.name if first_image else '',
+                created_at=order.created_at,
+                data=json.loads(json.dumps(data, cls=DjangoJSONEncoder)),
+            ))
+            archived_items.extend(
+                ArchivedOrderItem(
+                    id=item.id, order_id=order.id, product_id=item.product_id, variant_id=item.variant_id,
+                    quantity=item.quantity, price=item.price, discount_amount=item.discount_amount,
+                )
+                for item in items
+            )
+
+        usages = [
+            ArchivedCouponUsage(**usage) for usage in CouponUsage.objects.filter(order_id__in=locked_ids).values(
+                'id', 'coupon_id', 'user_id', 'order_id', 'used_at', 'discount_amount', 'original_order_value'
+            )
+        ]
+
+        ArchivedOrder.objects.bulk_create(archived_orders)
+        ArchivedOrderItem.objects.bulk_create(archived_items)
+        ArchivedCouponUsage.objects.bulk_create(usages)
+        # Cascades to items, coupon usage and events; reward entries keep their row with order unset
+        Order.objects.filter(id__in=locked_ids).delete()
+
+    return len(archived_orders)
+
+
+def archive_reward_transactions_batch(user_ids, cutoff, now=None):
+    """
+    Move settled reward ledger entries of a batch of users to the archive:
+    debits and matured credits created before cutoff, already included in
+    the user's reconciliation snapshot and not linked to a live order. Their
+    net is added to RewardPoints.archived_points in the same transaction, so
+    balances, reconciliation and expiry are unaffected. Returns entries moved.
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        accounts = list(
+            RewardPoints.objects.select_for_update().filter(user_id__in=user_ids).values_list('user_id', flat=True)
+        )
+        entries = list(
+            RewardTransaction.objects.filter(
+                user_id__in=accounts,
+                id__lte=F('user__reward_points__snapshot_watermark'),
+                created_at__lt=cutoff,
+                order__isnull=True,
+            ).filter(Q(points__lt=0) | Q(expires_at__lte=now)).values(
+                'id', 'user_id', 'transaction_type', 'points', 'description', 'expires_at', 'created_at'
+            )
+        )
+        if not entries:
+            return 0
+
+        deltas = {}
+        for entry in entries:
+            deltas[entry['user_id']] = deltas.get(entry['user_id'], 0) + entry['points']
+
+        ArchivedRewardTransaction.objects.bulk_create([ArchivedRewardTransaction(**entry) for entry in entries])
+        RewardTransaction.objects.filter(id__in=[entry['id'] for entry in entries]).delete()
+        RewardPoints.objects.filter(user_id__in=deltas.keys()).update(
+            archived_points=F('archived_points') + Case(
+                *[When(user_id=user_id, then=Value(delta)) for user_id, delta in deltas.items()],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        )
+
+    return len(entries)
+
+
+def get_archived_order(order_id, user=None):
+    """Archived order by id (optionally restricted to a user), or None"""
+    archived = ArchivedOrder.objects.filter(id=order_id)
+    if user is not None:
+        archived = archived.filter(user=user)
+    return archived.first()
@@ -1,6 +1,7 @@
 # backend/api/coupon_utils.py
 
 from decimal import Decimal
+from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from .models import Coupon, CouponUsage
@@ -98,8 +99,11 @@ class CouponValidator:
 
     def _check_product_restrictions(self):
         """Check product/category restrictions"""
+        restricted_products = set(self.coupon.products.values_list('id', flat=True))
+        restricted_categories = set(self.coupon.categories.values_list('id', flat=True))
+
         # If no restrictions specified, coupon applies to all products
-        if not self.coupon.categories.exists() and not self.coupon.products.exists():
+        if not restricted_products and not restricted_categories:
             return True
 
         # Check if any order items match the restrictions
@@ -109,12 +113,12 @@ class CouponValidator:
             product = item.get('product') if isinstance(item, dict) else item.product
             
             # Check product-specific restrictions
-            if self.coupon.products.filter(id=product.id).exists():
+            if product.id in restricted_products:
                 applicable_items.append(item)
                 continue
             
             # Check category restrictions
-            if product.category and self.coupon.categories.filter(id=product.category.id).exists():
+            if product.category_id and product.category_id in restricted_categories:
                 applicable_items.append(item)
 
         if not applicable_items:
@@ -126,67 +130,192 @@ class CouponValidator:
 
 class CouponCalculator:
     """
-    Calculate discount amount based on coupon type and order details
+    Calculate discount amount based on coupon type and order details.
+
+    All coupon types are evaluated in a single pass over the cart lines and the
+    discount is allocated back to the individual items, so the per-item share
+    can be stored on OrderItem and used for partial refunds.
     """
-    
+
+    CENT = Decimal('0.01')
+
     @staticmethod
-    def calculate_discount(coupon, order_total, order_items=None):
+    def calculate_discount(coupon, order_total, order_items=None, shipping_cost=None):
         """
         Calculate the discount amount for a given coupon and order
         Returns: (discount_amount, final_total)
         """
+        result = CouponCalculator.calculate(coupon, order_total, order_items, shipping_cost)
+        return result['discount_amount'], result['final_total']
+
+    @staticmethod
+    def calculate(coupon, order_total, order_items=None, shipping_cost=None):
+        """
+        Evaluate a coupon against an order.
+        Returns: {
+            'discount_amount': Decimal,
+            'final_total': Decimal,
+            'shipping_discount': Decimal,
+            'allocations': list of Decimal (one per order item, same order)
+        }
+        """
         order_total = Decimal(str(order_total))
+        lines = CouponCalculator._build_lines(coupon, order_items or [])
+        allocations = [Decimal('0')] * len(lines)
+        shipping_discount = Decimal('0')
+
+        # Without cart lines the whole order total is the discount base
+        eligible = [line for line in lines if line['eligible']]
+        if lines:
+            eligible_total = sum((line['total'] for line in eligible), Decimal('0'))
+        else:
+            eligible_total = order_total
+
         discount_amount = Decimal('0')
 
         if coupon.discount_type == 'percentage':
-            discount_amount = (order_total * coupon.discount_value) / Decimal('100')
-        
+            discount_amount = (eligible_total * coupon.discount_value) / Decimal('100')
+
         elif coupon.discount_type == 'fixed':
-            discount_amount = min(coupon.discount_value, order_total)
-        
+            discount_amount = min(coupon.discount_value, eligible_total)
+
+        elif coupon.discount_type == 'tiered':
+            discount_amount = CouponCalculator._calculate_tiered_discount(coupon, eligible_total)
+
         elif coupon.discount_type == 'free_shipping':
-            # Assuming shipping cost calculation - could be enhanced
-            # For now, we'll apply a fixed shipping discount
-            shipping_cost = Decimal('10.00')  # This should be dynamic
-            discount_amount = min(shipping_cost, order_total)
-        
+            if shipping_cost is None:
+                shipping_cost = getattr(settings, 'COUPON_DEFAULT_SHIPPING_COST', Decimal('10.00'))
+            shipping_discount = Decimal(str(shipping_cost))
+            # discount_value acts as a cap when set
+            if coupon.discount_value and coupon.discount_value > 0:
+                shipping_discount = min(shipping_discount, coupon.discount_value)
+            discount_amount = shipping_discount
+
         elif coupon.discount_type == 'buy_x_get_y':
-            # This requires more complex logic based on specific product quantities
-            # For now, we'll implement a simple version
             discount_amount = CouponCalculator._calculate_buy_x_get_y_discount(
-                coupon, order_items or []
+                coupon, eligible, allocations
             )
 
         # Ensure discount doesn't exceed order total
-        discount_amount = min(discount_amount, order_total)
+        discount_amount = min(discount_amount, order_total).quantize(CouponCalculator.CENT)
+        shipping_discount = min(shipping_discount, discount_amount)
         final_total = order_total - discount_amount
 
-        return discount_amount, final_total
+        if coupon.discount_type in ('percentage', 'fixed', 'tiered'):
+            CouponCalculator._allocate_proportionally(discount_amount, eligible, allocations)
+
+        return {
+            'discount_amount': discount_amount,
+            'final_total': final_total,
+            'shipping_discount': shipping_discount,
+            'allocations': allocations,
+        }
+
+    @staticmethod
+    def _build_lines(coupon, order_items):
+        """
+        Normalise order items (dicts or OrderItem instances) into cart lines,
+        resolving product/category restrictions with two queries for the whole cart.
+        """
+        if not order_items:
+            return []
+
+        restricted_products = set(coupon.products.values_list('id', flat=True))
+        restricted_categories = set(coupon.categories.values_list('id', flat=True))
+        unrestricted = not restricted_products and not restricted_categories
+
+        lines = []
+        for index, item in enumerate(order_items):
+            if isinstance(item, dict):
+                product = item.get('product')
+                variant = item.get('variant')
+                quantity = item.get('quantity', 1)
+                price = item.get('price')
+            else:
+                product = item.product
+                variant = item.variant
+                quantity = item.quantity
+                price = item.price
+
+            product_id = product if isinstance(product, int) else getattr(product, 'id', None)
+            category_id = getattr(product, 'category_id', None)
+
+            unit_price = Decimal(str(price if price is not None else getattr(product, 'price', 0)))
+            if variant is not None and not isinstance(variant, int):
+                unit_price += Decimal(str(variant.price_modifier))
+
+            lines.append({
+                'index': index,
+                'unit_price': unit_price,
+                'quantity': int(quantity),
+                'total': unit_price * int(quantity),
+                'eligible': (
+                    unrestricted
+                    or product_id in restricted_products
+                    or (category_id is not None and category_id in restricted_categories)
+                ),
+            })
+
+        return lines
+
+    @staticmethod
+    def _calculate_tiered_discount(coupon, eligible_total):
+        """Apply the highest tier whose threshold the eligible subtotal reaches"""
+        tier = coupon.tiers.filter(
+            minimum_order_value__lte=eligible_total
+        ).order_by('-minimum_order_value').first()
+
+        if not tier:
+            return Decimal('0')
+        if tier.discount_type == 'percentage':
+            return (eligible_total * tier.discount_value) / Decimal('100')
+        return min(tier.discount_value, eligible_total)
 
     @staticmethod
-    def _calculate_buy_x_get_y_discount(coupon, order_items):
+    def _calculate_buy_x_get_y_discount(coupon, eligible_lines, allocations):
         """
-        Calculate discount for buy X get Y free offers
-        This is a simplified implementation
+        Calculate discount for buy X get Y offers across all eligible lines.
+        For every (X + Y) eligible units in the cart, Y units are discounted by
+        discount_value percent, always picking the cheapest units first.
         """
+        buy_quantity = coupon.buy_quantity or 0
+        get_quantity = coupon.get_quantity or 0
+        if get_quantity <= 0:
+            return Decimal('0')
+
+        total_units = sum(line['quantity'] for line in eligible_lines)
+        free_units = (total_units // (buy_quantity + get_quantity)) * get_quantity
+        percent_off = min(coupon.discount_value, Decimal('100')) / Decimal('100')
+
         discount_amount = Decimal('0')
-        
-        # Example: Buy 2 get 1 free (discount_value represents the ratio)
-        # This would need to be enhanced based on specific business rules
-        
-        for item in order_items:
-            product = item.get('product') if isinstance(item, dict) else item.product
-            quantity = item.get('quantity', 1) if isinstance(item, dict) else item.quantity
-            price = item.get('price') if isinstance(item, dict) else item.price
-            
-            # Simple logic: for every 3 items, discount 1
-            free_items = quantity // 3
-            discount_amount += Decimal(str(price)) * free_items
+        for line in sorted(eligible_lines, key=lambda l: l['unit_price']):
+            if free_units <= 0:
+                break
+            units = min(free_units, line['quantity'])
+            line_discount = (line['unit_price'] * units * percent_off).quantize(CouponCalculator.CENT)
+            allocations[line['index']] += line_discount
+            discount_amount += line_discount
+            free_units -= units
 
         return discount_amount
 
-
-def apply_coupon_to_order(coupon_code, user, order_items, order_total):
+    @staticmethod
+    def _allocate_proportionally(discount_amount, eligible_lines, allocations):
+        """Spread an order-level discount over eligible lines by line value"""
+        eligible_total = sum((line['total'] for line in eligible_lines), Decimal('0'))
+        if not eligible_lines or eligible_total <= 0:
+            return
+
+        remaining = discount_amount
+        for line in eligible_lines[:-1]:
+            share = (discount_amount * line['total'] / eligible_total).quantize(CouponCalculator.CENT)
+            allocations[line['index']] = share
+            remaining -= share
+        # Rounding remainder goes to the last line so the shares sum exactly
+        allocations[eligible_lines[-1]['index']] = remaining
+
+
+def apply_coupon_to_order(coupon_code, user, order_items, order_total, shipping_cost=None):
     """
     Main function to validate and apply coupon to an order
     Returns: {
@@ -195,7 +324,8 @@ def apply_coupon_to_order(coupon_code, user, order_items, order_total):
         'discount_amount': Decimal,
         'final_total': Decimal,
         'coupon': Coupon instance,
-        'no_return_policy': bool
+        'no_return_policy': bool,
+        'allocations': list of per-item discount shares
     }
     """
     validator = CouponValidator(coupon_code, user, order_items, order_total)
@@ -207,17 +337,19 @@ def apply_coupon_to_order(coupon_code, user, order_items, order_total):
         'discount_amount': Decimal('0'),
         'final_total': Decimal(str(order_total)),
         'coupon': coupon,
-        'no_return_policy': False
+        'no_return_policy': False,
+        'allocations': [Decimal('0')] * len(order_items or [])
     }
 
     if is_valid and coupon:
-        discount_amount, final_total = CouponCalculator.calculate_discount(
-            coupon, order_total, order_items
+        calculation = CouponCalculator.calculate(
+            coupon, order_total, order_items, shipping_cost
         )
         
         result.update({
-            'discount_amount': discount_amount,
-            'final_total': final_total,
+            'discount_amount': calculation['discount_amount'],
+            'final_total': calculation['final_total'],
+            'allocations': calculation['allocations'],
             'no_return_policy': coupon.no_return_policy
         })
 
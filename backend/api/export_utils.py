@@ -0,0 +1,126 @@
+# backend/api/export_utils.py
+
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+# (header, lookup) pairs per export; lookups go straight into values_list()
+ORDER_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('customer_email', 'user__email'),
+    ('original_price', 'original_price'),
+    ('discount_amount', 'discount_amount'),
+    ('total_price', 'total_price'),
+    ('coupon_code', 'applied_coupon__code'),
+    ('shipping_name', 'shipping_name'),
+    ('shipping_city', 'shipping_city'),
+    ('shipping_state', 'shipping_state'),
+    ('shipping_pincode', 'shipping_pincode'),
+    ('awb_code', 'awb_code'),
+    ('courier', 'courier_company_name'),
+    ('shiprocket_status', 'shiprocket_status'),
+    ('shipped_date', 'shipped_date'),
+    ('delivered_date', 'delivered_date'),
+]
+
+USER_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('email', 'email'),
+    ('username', 'username'),
+    ('first_name', 'first_name'),
+    ('last_name', 'last_name'),
+    ('phone', 'phone'),
+    ('role', 'role'),
+    ('is_active', 'is_active'),
+    ('date_joined', 'date_joined'),
+    ('last_login', 'last_login'),
+]
+
+COUPON_USAGE_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('used_at', 'used_at'),
+    ('coupon_code', 'coupon__code'),
+    ('customer_email', 'user__email'),
+    ('order_id', 'order_id'),
+    ('original_order_value', 'original_order_value'),
+    ('discount_amount', 'discount_amount'),
+]
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def csv_safe(value):
+    """Keep spreadsheet apps from evaluating text cells as formulas"""
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def iter_csv(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([csv_safe(value) for value in row])
+
+
+def iter_ndjson(headers, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+def iter_values(queryset, lookups, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield values_list rows of queryset without loading them all at once:
+    through a server-side cursor normally, or in primary-key pages when
+    server-side cursors are disabled (PgBouncer transaction pooling), where
+    the driver would otherwise fetch the whole result into memory.
+    Rows come in primary-key order in the latter case.
+    """
+    if not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield from queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+        return
+
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page.values_list('pk', *lookups)[:chunk_size])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        for row in rows:
+            yield row[1:]
+
+
+def stream_export(queryset, columns, name, export_format='csv'):
+    """
+    StreamingHttpResponse writing queryset rows as CSV or NDJSON. Only the
+    listed columns are selected, and rows are read in chunks (see
+    iter_values), so memory use stays flat however many rows are exported.
+    """
+    headers = [header for header, _ in columns]
+    rows = iter_values(queryset, [lookup for _, lookup in columns])
+    content = iter_csv(headers, rows) if export_format == 'csv' else iter_ndjson(headers, rows)
+
+    filename = f"{name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    streaming_response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    streaming_response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return streaming_response
@@ -0,0 +1,63 @@
+# backend/api/fieldset_utils.py
+
+from django.core.exceptions import FieldDoesNotExist
+
+# Returned whatever ?fields= asks for
+ALWAYS_INCLUDED = ('id',)
+
+
+def parse_field_list(value):
+    """Names from a comma-separated query parameter, or None if it wasn't given"""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def get_expansion(serializer_class, field):
+    """Name of the Meta.expandable_fields group a field belongs to, if any"""
+    for expansion, names in getattr(serializer_class.Meta, 'expandable_fields', {}).items():
+        if field in names:
+            return expansion
+    return None
+
+
+def includes_field(field, expansion, fields, expand):
+    """
+    Whether a response field is returned for ?fields= (None if not given)
+    and ?expand= (None if not given). A field named in fields, or belonging
+    to a requested expansion, is always returned. Otherwise fields= leaves
+    it out, and so does expand= when it names other expansions only.
+    """
+    if field in ALWAYS_INCLUDED:
+        return True
+    if fields is not None and field in fields:
+        return True
+    if expansion is not None and expand is not None and expansion in expand:
+        return True
+    if fields is not None:
+        return False
+    return expansion is None or expand is None
+
+
+def get_column_fields(serializer_class, field_names):
+    """
+    Model columns (for only()) needed to render field_names with
+    serializer_class: Meta.field_columns for computed fields, the field
+    itself for model columns, nothing for relations and nested fields.
+    """
+    model = serializer_class.Meta.model
+    field_columns = getattr(serializer_class.Meta, 'field_columns', {})
+    columns = list(ALWAYS_INCLUDED)
+    for name in field_names:
+        if name in field_columns:
+            candidates = field_columns[name]
+        else:
+            try:
+                model_field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if not model_field.concrete or model_field.many_to_many:
+                continue
+            candidates = (name,)
+        columns.extend(column for column in candidates if column not in columns)
+    return columns
@@ -0,0 +1,120 @@
+"""
+Django management command to move old completed orders to the archive tables.
+Delivered and cancelled orders placed more than ORDER_ARCHIVE_AFTER_DAYS ago
+are moved with their items, coupon usage and event history in small id
+batches, each in its own short transaction, so live traffic is never blocked
+for long. Settled reward ledger entries are archived afterwards.
+Safe to stop and re-run at any time.
+
+Usage: python manage.py archive_orders [--days 365] [--batch-size 500] [--sleep 0.1] [--limit 0] [--skip-rewards] [--dry-run]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive_utils import (
+    archivable_orders, archive_orders_batch, archive_reward_transactions_batch, get_archive_cutoff,
+)
+from api.models import RewardPoints
+
+
+class Command(BaseCommand):
+    help = 'Archive completed orders and settled reward entries older than the retention horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Archive orders placed more than this many days ago (default: ORDER_ARCHIVE_AFTER_DAYS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Orders moved per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.1,
+            help='Pause between batches in seconds, to spare the database (default: 0.1)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Stop after this many orders (default: no limit)',
+        )
+        parser.add_argument(
+            '--skip-rewards',
+            action='store_true',
+            help='Do not archive reward ledger entries',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count what would be archived',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 30:
+            raise CommandError('--days must be at least 30')
+
+        cutoff = get_archive_cutoff(options['days'])
+        batch_size = options['batch_size']
+        limit = options['limit']
+        candidates = archivable_orders(cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {candidates.count()} orders placed before {cutoff:%Y-%m-%d} would be archived'
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'📦 Archiving orders placed before {cutoff:%Y-%m-%d}...'))
+        started = time.monotonic()
+        archived = skipped = 0
+        last_id = 0
+
+        while True:
+            size = min(batch_size, limit - archived) if limit else batch_size
+            if size <= 0:
+                break
+            order_ids = list(candidates.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:size])
+            if not order_ids:
+                break
+            last_id = order_ids[-1]
+
+            moved = archive_orders_batch(order_ids, cutoff)
+            archived += moved
+            skipped += len(order_ids) - moved
+            self.stdout.write(f'  ✅ {archived} orders archived')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        entries = 0
+        if not options['skip_rewards']:
+            self.stdout.write('  🎁 Archiving settled reward ledger entries...')
+            last_user_id = 0
+            while True:
+                user_ids = list(
+                    RewardPoints.objects.filter(user_id__gt=last_user_id)
+                    .order_by('user_id').values_list('user_id', flat=True)[:batch_size]
+                )
+                if not user_ids:
+                    break
+                last_user_id = user_ids[-1]
+                entries += archive_reward_transactions_batch(user_ids, cutoff)
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Archived {archived} orders and {entries} reward entries in {elapsed:.1f}s'
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {skipped} orders were locked by other writers and will be archived on a later run'
+            ))
@@ -0,0 +1,112 @@
+"""
+Django management command to fill the structured shipping address fields of
+legacy orders by parsing their free-text shipping_address once.
+Orders are read in id batches and the text is parsed across worker processes;
+results are written back with bulk_update. Orders whose text has no
+recognisable pincode are left untouched and reported.
+
+Usage: python manage.py backfill_order_addresses [--batch-size 5000] [--workers 4] [--dry-run]
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from api.models import Order
+from api.shiprocket_utils import ShipRocketDataMapper
+
+
+def parse_addresses(rows):
+    """Parse (order_id, address_text) rows; runs in a worker process"""
+    return [(order_id, ShipRocketDataMapper.parse_shipping_address(text)) for order_id, text in rows]
+
+
+class Command(BaseCommand):
+    help = 'Populate structured shipping address fields from legacy address text'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Orders read and written per batch (default: 5000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Parser processes (default: 4)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Parse and report without saving',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = options['workers']
+        dry_run = options['dry_run']
+
+        candidates = (
+            Order.objects.filter(shipping_pincode='')
+            .exclude(shipping_address='')
+            .order_by('id')
+        )
+
+        self.stdout.write(self.style.SUCCESS('🏠 Backfilling structured order addresses...'))
+        updated = 0
+        unparsed = []
+        started = time.monotonic()
+        last_id = 0
+
+        # Workers only parse text; close connections so forked children don't share them
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            while True:
+                rows = list(candidates.filter(id__gt=last_id).values_list('id', 'shipping_address')[:batch_size])
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                chunk_size = max(1, len(rows) // workers)
+                chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+                orders = []
+                for parsed_chunk in pool.map(parse_addresses, chunks):
+                    for order_id, parsed in parsed_chunk:
+                        if not parsed['pin_code']:
+                            unparsed.append(order_id)
+                            continue
+                        orders.append(Order(
+                            id=order_id,
+                            shipping_address_line_1=parsed['address'][:255],
+                            shipping_address_line_2=parsed['address_2'][:255],
+                            shipping_city=parsed['city'][:100],
+                            shipping_state=parsed['state'][:100],
+                            shipping_pincode=parsed['pin_code'],
+                            shipping_country=parsed['country'],
+                        ))
+
+                if orders and not dry_run:
+                    with transaction.atomic():
+                        Order.objects.bulk_update(orders, [
+                            'shipping_address_line_1', 'shipping_address_line_2', 'shipping_city',
+                            'shipping_state', 'shipping_pincode', 'shipping_country',
+                        ])
+                updated += len(orders)
+                self.stdout.write(f'  ✅ {updated} parsed, {len(unparsed)} without a pincode')
+
+        elapsed = time.monotonic() - started
+        verb = 'Would update' if dry_run else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'✅ {verb} {updated} orders in {elapsed:.1f}s'))
+        if unparsed:
+            sample = ', '.join(str(order_id) for order_id in unparsed[:20])
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {len(unparsed)} orders need manual review (e.g. {sample})'
+            ))
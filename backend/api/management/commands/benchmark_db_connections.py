@@ -0,0 +1,99 @@
+"""
+Django management command to measure per-request database connection overhead.
+Simulates requests through Django's request_started/request_finished signals
+(which close or recycle connections exactly as in production) and compares
+the configured mode (persistent connections, pool or PgBouncer) against a
+fresh connection per request. Reports latency per request and how many
+physical connections each mode opened.
+
+Usage: python manage.py benchmark_db_connections [--requests 500] [--queries 3]
+"""
+
+import copy
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+from django.db.utils import load_backend
+
+
+class Command(BaseCommand):
+    help = 'Compare configured database connection handling with a connection per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Simulated requests per mode (default: 500)',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=3,
+            help='Queries per simulated request (default: 3)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark needs the PostgreSQL backend')
+        if options['requests'] < 1 or options['queries'] < 1:
+            raise CommandError('--requests and --queries must be at least 1')
+
+        settings_dict = connection.settings_dict
+        pool = settings_dict['OPTIONS'].get('pool')
+        if pool:
+            mode = f"psycopg pool (min {pool.get('min_size')}, max {pool.get('max_size')})"
+        else:
+            mode = f"CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}"
+        if settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+            mode += ', PgBouncer mode'
+        self.stdout.write(self.style.SUCCESS(
+            f"📊 {options['requests']} requests x {options['queries']} queries against {settings_dict['HOST']}:{settings_dict['PORT']}"
+        ))
+
+        baseline = self.run_requests(self.per_request_connection(), options['requests'], options['queries'])
+        configured = self.run_requests(connection, options['requests'], options['queries'], signals=True)
+
+        for name, (elapsed_ms, backends) in (('connection per request', baseline), (mode, configured)):
+            self.stdout.write(
+                f'  🔌 {name}: {elapsed_ms / options["requests"]:.3f} ms/request, '
+                f'{backends} connections opened'
+            )
+
+        saved_ms = (baseline[0] - configured[0]) / options['requests']
+        self.stdout.write(self.style.SUCCESS(f'✅ {saved_ms:.3f} ms of connection overhead saved per request'))
+
+    def per_request_connection(self):
+        """A separate connection to the same database that is never kept or pooled"""
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict['CONN_MAX_AGE'] = 0
+        settings_dict['OPTIONS'].pop('pool', None)
+        backend = load_backend(settings_dict['ENGINE'])
+        return backend.DatabaseWrapper(settings_dict, connection.alias)
+
+    def run_requests(self, wrapper, requests, queries, signals=False):
+        """
+        Time `requests` simulated requests on wrapper. With signals the
+        connection is handled by Django's request signals, otherwise it is
+        closed after every request. Returns (elapsed ms, backend pids seen).
+        """
+        backend_pids = set()
+        started = time.perf_counter()
+        for _ in range(requests):
+            if signals:
+                request_started.send(sender=self.__class__)
+            with wrapper.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute('SELECT pg_backend_pid()')
+                    backend_pids.add(cursor.fetchone()[0])
+            if signals:
+                request_finished.send(sender=self.__class__)
+            else:
+                wrapper.close()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if signals:
+            connections.close_all()
+        return elapsed_ms, len(backend_pids)
@@ -0,0 +1,127 @@
+"""
+Django management command to benchmark order lookups by shipping identifier
+and the customer/admin order listings.
+Prints the query plan for each lookup (to confirm the Order indexes are used)
+and the average latency over repeated runs. --seed bulk-inserts synthetic
+orders first so the numbers can be checked at production-like volumes.
+
+Usage: python manage.py benchmark_order_lookups [--seed 1000000] [--iterations 200] [--cleanup]
+"""
+
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.models import CustomUser, Order
+
+
+class Command(BaseCommand):
+    help = 'Benchmark shipping-identifier and order listing lookups'
+
+    SEED_PREFIX = 'BENCH'
+    SEED_ADDRESS = 'Benchmark address'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Insert this many synthetic orders before benchmarking',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Rows per bulk insert when seeding (default: 10000)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Runs per lookup (default: 200)',
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete synthetic orders and exit',
+        )
+
+    def handle(self, *args, **options):
+        seeded = Order.objects.filter(shipping_address=self.SEED_ADDRESS)
+
+        if options['cleanup']:
+            deleted, _ = seeded.delete()
+            self.stdout.write(self.style.SUCCESS(f'🧹 Deleted {deleted} synthetic rows'))
+            return
+
+        if options['seed']:
+            self.seed_orders(options['seed'], options['batch_size'])
+
+        sample = list(
+            Order.objects.filter(awb_code__isnull=False)
+            .values_list('awb_code', 'shipment_id', 'shiprocket_order_id', 'user_id')
+            .order_by('-id')[:options['iterations']]
+        )
+        if not sample:
+            raise CommandError('No orders with an AWB code found; run with --seed first')
+
+        total_orders = Order.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'📊 Benchmarking lookups over {total_orders} orders'))
+
+        lookups = [
+            ('awb_code', lambda row: Order.objects.filter(awb_code=row[0])),
+            ('shipment_id', lambda row: Order.objects.filter(shipment_id=row[1])),
+            ('shiprocket_order_id', lambda row: Order.objects.filter(shiprocket_order_id=row[2])),
+            ('customer orders', lambda row: Order.objects.filter(user_id=row[3]).order_by('-created_at')[:20]),
+            ('orders by status', lambda row: Order.objects.filter(status='shipped').order_by('-created_at')[:20]),
+        ]
+
+        for name, build_query in lookups:
+            self.stdout.write(f'\n🔎 {name}')
+            self.stdout.write(build_query(sample[0]).explain())
+
+            started = time.perf_counter()
+            for row in sample:
+                list(build_query(row).values_list('id', flat=True))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(self.style.SUCCESS(
+                f'  ✅ {elapsed_ms / len(sample):.3f} ms/lookup over {len(sample)} runs'
+            ))
+
+    def seed_orders(self, count, batch_size):
+        user_ids = list(CustomUser.objects.values_list('id', flat=True)[:1000])
+        if not user_ids:
+            raise CommandError('Seeding needs at least one user')
+
+        offset = Order.objects.filter(shipping_address=self.SEED_ADDRESS).count()
+        statuses = [choice[0] for choice in Order.STATUS_CHOICES]
+        self.stdout.write(f'🌱 Seeding {count} synthetic orders...')
+
+        created = 0
+        while created < count:
+            batch = []
+            for n in range(offset + created, offset + min(created + batch_size, count)):
+                # Roughly a third of real orders are not yet handed to ShipRocket
+                shipped = n % 3 != 0
+                batch.append(Order(
+                    user_id=random.choice(user_ids),
+                    status=random.choice(statuses),
+                    total_price=Decimal('499.00'),
+                    shipping_address=self.SEED_ADDRESS,
+                    awb_code=f'{self.SEED_PREFIX}{n:010d}' if shipped else None,
+                    shipment_id=f'{n}' if shipped else None,
+                    shiprocket_order_id=f'SR{n}' if shipped else None,
+                ))
+            with transaction.atomic():
+                Order.objects.bulk_create(batch)
+            created += len(batch)
+            self.stdout.write(f'  ✅ {created}/{count}')
+
+        # Fresh statistics so the planner sees the new row counts
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Order._meta.db_table}')
@@ -0,0 +1,91 @@
+"""
+Django management command to compare product listing serialization speed.
+Serializes the same page of products with ProductSerializer,
+NewArrivalProductSerializer and EnhancedProductSerializer, and with the
+values_list() card path that replaces them on listing pages, reporting
+rows/second (query time included) for each. Also checks that the card path
+returns exactly what the serializers it replaces return.
+
+Usage: python manage.py benchmark_product_cards [--limit 100] [--iterations 20]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Q
+from django.test import RequestFactory
+
+from api.models import Product
+from api.product_card_utils import (
+    GRID_CARD_FIELD_SPECS, GRID_CARD_FIELDS, NEW_ARRIVAL_CARD_FIELDS, PRODUCT_CARD_FIELDS, build_product_cards,
+)
+from api.serializers import EnhancedProductSerializer, NewArrivalProductSerializer, ProductSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark product card serialization against the DRF serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Products per listing page (default: 100)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Runs per serializer (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        if limit < 1 or options['iterations'] < 1:
+            raise CommandError('--limit and --iterations must be at least 1')
+        if not Product.objects.exists():
+            raise CommandError('No products found; run setup_dev_data or seed_complete_data first')
+
+        request = RequestFactory().get('/api/products/', HTTP_HOST='localhost')
+        context = {'request': request}
+        products = Product.objects.order_by('id')
+        rated = products.annotate(
+            average_rating=Avg('reviews__rating', filter=Q(reviews__is_approved=True)),
+            review_count=Count('reviews', filter=Q(reviews__is_approved=True))
+        )
+
+        cases = [
+            ('ProductSerializer',
+             lambda: ProductSerializer(products.select_related('category')[:limit], many=True, context=context).data),
+            ('cards (product fields)',
+             lambda: build_product_cards(products, PRODUCT_CARD_FIELDS, request, limit)),
+            ('NewArrivalProductSerializer',
+             lambda: NewArrivalProductSerializer(rated.select_related('category')[:limit], many=True, context=context).data),
+            ('cards (new arrival fields)',
+             lambda: build_product_cards(rated, NEW_ARRIVAL_CARD_FIELDS, request, limit)),
+            ('EnhancedProductSerializer',
+             lambda: EnhancedProductSerializer(
+                 products.prefetch_related('variants', 'images', 'reviews')[:limit], many=True, context=context
+             ).data),
+            ('cards (grid fields)',
+             lambda: build_product_cards(products, GRID_CARD_FIELDS, request, limit, GRID_CARD_FIELD_SPECS)),
+        ]
+
+        self.check_matches(cases[0][1](), cases[1][1](), 'ProductSerializer')
+        self.check_matches(cases[2][1](), cases[3][1](), 'NewArrivalProductSerializer')
+
+        self.stdout.write(self.style.SUCCESS(f'📊 {options["iterations"]} runs of up to {limit} products'))
+        for name, serialize in cases:
+            rows = 0
+            started = time.perf_counter()
+            for _ in range(options['iterations']):
+                rows += len(serialize())
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'  ⏱️  {name}: {rows / elapsed:,.0f} rows/s ({elapsed * 1000 / options["iterations"]:.2f} ms/page)')
+
+    def check_matches(self, expected, actual, name):
+        expected = [dict(row) for row in expected]
+        if expected == actual:
+            self.stdout.write(self.style.SUCCESS(f'✅ Cards match {name} output'))
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️  Cards differ from {name} output'))
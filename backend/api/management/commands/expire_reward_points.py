@@ -0,0 +1,59 @@
+"""
+Django management command to expire matured reward points.
+Processes reward accounts in batches; safe to re-run at any time.
+
+Usage: python manage.py expire_reward_points [--batch-size 1000]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import RewardPoints
+from api.reward_utils import expire_points_batch
+
+
+class Command(BaseCommand):
+    help = 'Expire reward points whose expiry date has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of reward accounts processed per transaction (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.now()
+        started = time.monotonic()
+
+        self.stdout.write(self.style.SUCCESS('⏳ Expiring reward points...'))
+
+        last_user_id = 0
+        accounts = 0
+        users_expired = 0
+        points_expired = 0
+
+        while True:
+            user_ids = list(
+                RewardPoints.objects.filter(user_id__gt=last_user_id, total_points__gt=0)
+                .order_by('user_id')
+                .values_list('user_id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+
+            expired = expire_points_batch(user_ids, now=now)
+            accounts += len(user_ids)
+            users_expired += len(expired)
+            points_expired += sum(expired.values())
+            last_user_id = user_ids[-1]
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Checked {accounts} accounts in {elapsed:.1f}s: '
+            f'expired {points_expired} points for {users_expired} users'
+        ))
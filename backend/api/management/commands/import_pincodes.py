@@ -0,0 +1,140 @@
+"""
+Django management command to import the local pincode serviceability table
+from a CSV file (our own format or a ShipRocket serviceability export).
+Rows are upserted in batches; --replace also removes pincodes missing from
+the file. Running processes pick up the new data within a minute.
+
+Recognised columns (case-insensitive): pincode / pin_code / postcode,
+serviceable / is_serviceable / prepaid, cod / cod_available,
+etd / etd_days / tat, zone, courier_count / couriers, city, state.
+
+Usage: python manage.py import_pincodes <csv_path> [--replace] [--batch-size 5000]
+"""
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import PincodeServiceability
+from api.pincode_utils import invalidate_pincode_index
+
+
+COLUMN_ALIASES = {
+    'pincode': ('pincode', 'pin_code', 'postcode', 'pin code'),
+    'is_serviceable': ('is_serviceable', 'serviceable', 'prepaid', 'prepaid delivery'),
+    'cod_available': ('cod_available', 'cod', 'cod delivery'),
+    'etd_days': ('etd_days', 'etd', 'tat', 'delivery days'),
+    'zone': ('zone',),
+    'courier_count': ('courier_count', 'couriers', 'courier count'),
+    'city': ('city',),
+    'state': ('state',),
+}
+
+TRUE_VALUES = {'1', 'y', 'yes', 'true', 't'}
+
+
+class Command(BaseCommand):
+    help = 'Import pincode serviceability data from CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', type=str, help='Path to the CSV file')
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Delete pincodes that are not in the file',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows upserted per query (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            csv_file = open(options['csv_path'], newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(f'Cannot open {options["csv_path"]}: {e}')
+
+        with csv_file:
+            reader = csv.DictReader(csv_file)
+            columns = self.resolve_columns(reader.fieldnames or [])
+
+            self.stdout.write(self.style.SUCCESS('📮 Importing pincode serviceability...'))
+            batch = []
+            seen = set()
+            imported = skipped = 0
+
+            for row in reader:
+                record = self.parse_row(row, columns)
+                if record is None or record.pincode in seen:
+                    skipped += 1
+                    continue
+                seen.add(record.pincode)
+                batch.append(record)
+
+                if len(batch) >= options['batch_size']:
+                    imported += self.upsert(batch)
+                    batch = []
+                    self.stdout.write(f'  ✅ {imported} pincodes imported')
+
+            imported += self.upsert(batch)
+
+        removed = 0
+        if options['replace']:
+            removed, _ = PincodeServiceability.objects.exclude(pincode__in=seen).delete()
+
+        invalidate_pincode_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Imported {imported} pincodes ({skipped} rows skipped, {removed} removed)'
+        ))
+
+    def resolve_columns(self, fieldnames):
+        """Map model fields to the CSV's header names"""
+        headers = {name.strip().lower(): name for name in fieldnames}
+        columns = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in headers:
+                    columns[field] = headers[alias]
+                    break
+        if 'pincode' not in columns:
+            raise CommandError('CSV has no pincode column')
+        return columns
+
+    def parse_row(self, row, columns):
+        """PincodeServiceability for a CSV row, or None if the pincode is invalid"""
+        def value(field):
+            return (row.get(columns[field]) or '').strip() if field in columns else ''
+
+        pincode = value('pincode')
+        if len(pincode) != 6 or not pincode.isdigit():
+            return None
+
+        serviceable = value('is_serviceable')
+        etd = value('etd_days')
+        courier_count = value('courier_count')
+        return PincodeServiceability(
+            pincode=pincode,
+            is_serviceable=serviceable.lower() in TRUE_VALUES if serviceable else True,
+            cod_available=value('cod_available').lower() in TRUE_VALUES,
+            etd_days=int(float(etd)) if etd.replace('.', '', 1).isdigit() else None,
+            zone=value('zone')[:20],
+            courier_count=int(courier_count) if courier_count.isdigit() else 0,
+            city=value('city')[:100],
+            state=value('state')[:100],
+        )
+
+    def upsert(self, records):
+        if not records:
+            return 0
+        with transaction.atomic():
+            PincodeServiceability.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=['pincode'],
+                update_fields=['is_serviceable', 'cod_available', 'etd_days', 'zone',
+                               'courier_count', 'city', 'state', 'updated_at'],
+            )
+        return len(records)
@@ -0,0 +1,80 @@
+"""
+Django management command to apply stored ShipRocket webhook events to orders.
+The webhook endpoint only records events; this worker drains the pending queue
+in batches. Several workers can run at once since rows are claimed with SKIP LOCKED.
+
+Usage: python manage.py process_shiprocket_webhooks [--batch-size 500] [--loop] [--interval 5]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import ShipmentWebhookEvent
+from api.webhook_processor import ShipRocketWebhookProcessor
+
+
+class Command(BaseCommand):
+    help = 'Apply pending ShipRocket webhook events to orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Events processed per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling for new events instead of exiting when the queue is empty',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to sleep between polls when looping (default: 5)',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Requeue failed events (including those whose order was not found) before processing',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['retry_failed']:
+            requeued = ShipmentWebhookEvent.objects.filter(processing_status='failed').update(
+                processing_status='pending', error=''
+            )
+            self.stdout.write(f'🔁 Requeued {requeued} failed events')
+
+        self.stdout.write(self.style.SUCCESS('📦 Processing ShipRocket webhook events...'))
+        totals = {'processed': 0, 'ignored': 0, 'failed': 0}
+        started = time.monotonic()
+
+        try:
+            while True:
+                counts = ShipRocketWebhookProcessor.process_pending(batch_size=batch_size)
+                for key, value in counts.items():
+                    totals[key] += value
+
+                if sum(counts.values()):
+                    self.stdout.write(
+                        f"  ✅ {counts['processed']} processed, {counts['ignored']} ignored, "
+                        f"{counts['failed']} failed"
+                    )
+                    continue
+
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️  Stopped')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Done in {elapsed:.1f}s: {totals['processed']} processed, "
+            f"{totals['ignored']} ignored, {totals['failed']} failed"
+        ))
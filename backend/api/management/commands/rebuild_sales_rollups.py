@@ -0,0 +1,62 @@
+"""
+Django management command to rebuild the hourly sales rollups from orders.
+Use it once to backfill existing orders, and to repair rollups after bulk
+data fixes (e.g. orders edited in the Django admin). Rollups are normally
+kept current as orders are placed and change status.
+
+Usage: python manage.py rebuild_sales_rollups [--start 2024-01-01] [--end 2024-02-01] [--batch-size 2000]
+"""
+
+import time
+from datetime import datetime, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.analytics_utils import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute sales rollups from orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            type=str,
+            help='First day to rebuild (YYYY-MM-DD, default: all history)',
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='Day to stop before (YYYY-MM-DD, default: no limit)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Orders rolled up per batch (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        start = self.parse_day(options['start'], '--start')
+        end = self.parse_day(options['end'], '--end')
+        if start and end and start >= end:
+            raise CommandError('--start must be before --end')
+
+        self.stdout.write(self.style.SUCCESS('📊 Rebuilding sales rollups...'))
+        started = time.monotonic()
+        orders = rebuild_sales_rollups(start, end, batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'✅ Rolled up {orders} orders in {elapsed:.1f}s'))
+
+    def parse_day(self, value, option):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError(f'{option} must be a date (YYYY-MM-DD)')
+        return timezone.make_aware(datetime.combine(day, dt_time.min))
@@ -0,0 +1,73 @@
+"""
+Django management command to verify reward balances against the points ledger.
+Each account is checked by adding ledger entries newer than its snapshot to the
+snapshot balance, so repeated runs only read the recent part of the ledger.
+
+Usage: python manage.py reconcile_reward_points [--fix] [--snapshot] [--batch-size 1000]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import RewardPoints
+from api.reward_utils import reconcile_batch
+
+
+class Command(BaseCommand):
+    help = 'Verify reward point balances against the RewardTransaction ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of reward accounts locked and verified per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Reset mismatched balances to the ledger balance',
+        )
+        parser.add_argument(
+            '--snapshot',
+            action='store_true',
+            help='Record verified balances as the new snapshot',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = time.monotonic()
+
+        self.stdout.write(self.style.SUCCESS('🔍 Reconciling reward points...'))
+
+        last_user_id = 0
+        accounts = 0
+        mismatches = []
+
+        while True:
+            user_ids = list(
+                RewardPoints.objects.filter(user_id__gt=last_user_id)
+                .order_by('user_id')
+                .values_list('user_id', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+
+            mismatches.extend(reconcile_batch(
+                user_ids, fix=options['fix'], snapshot=options['snapshot']
+            ))
+            accounts += len(user_ids)
+            last_user_id = user_ids[-1]
+
+        elapsed = time.monotonic() - started
+        rate = accounts / elapsed if elapsed else accounts
+
+        for user_id, balance, ledger_balance in mismatches[:50]:
+            self.stdout.write(f'  ⚠️ User {user_id}: balance {balance}, ledger {ledger_balance}')
+
+        summary = f'Checked {accounts} accounts in {elapsed:.1f}s ({rate:.0f}/s), {len(mismatches)} mismatches'
+        if mismatches and not options['fix']:
+            raise CommandError(summary)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {summary}'))
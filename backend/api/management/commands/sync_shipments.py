@@ -0,0 +1,166 @@
+"""
+Django management command to refresh tracking for in-flight shipments from ShipRocket.
+Catches orders whose webhooks were missed. Orders with a non-terminal
+shiprocket_status and a snapshot older than its status TTL are walked in id
+order; each batch is tracked concurrently by a bounded worker pool under a
+shared rate limit, then written back with one bulk_update.
+
+Point SHIPROCKET_BASE_URL at a local fake server to exercise it without
+hitting ShipRocket.
+
+Usage: python manage.py sync_shipments [--batch-size 200] [--workers 8] [--rate 5] [--limit 0] [--all]
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Order
+from api.order_utils import OrderStateMachine
+from api.shiprocket_utils import RateLimiter
+from api.tracking_utils import (
+    FINAL_TRACKING_STATUSES, apply_tracking_info, fetch_tracking_info,
+    mark_tracking_checked, save_shipment_events, stale_tracking_filter,
+)
+
+
+class Command(BaseCommand):
+    help = 'Refresh stale shipment tracking from ShipRocket'
+
+    # Order columns read and written by tracking updates
+    ORDER_FIELDS = [
+        'id', 'status', 'awb_code', 'shiprocket_status', 'courier_company_name',
+        'courier_company_id', 'shipped_date', 'delivered_date', 'estimated_delivery_date',
+        'tracking_synced_at', 'tracking_summary', 'updated_at',
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Orders fetched and written per batch (default: 200)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Concurrent tracking requests (default: 8)',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            help='Maximum tracking requests per second (default: SHIPROCKET_TRACKING_RATE_LIMIT)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=0,
+            help='Stop after this many orders (default: no limit)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Poll every in-flight shipment, ignoring snapshot TTLs',
+        )
+
+    def handle(self, *args, **options):
+        from api.shiprocket_service import ShipRocketAPIError
+
+        rate = options['rate'] if options['rate'] is not None else settings.SHIPROCKET_TRACKING_RATE_LIMIT
+        limiter = RateLimiter(rate)
+        batch_size = options['batch_size']
+        limit = options['limit']
+
+        if options['all']:
+            candidates = Order.objects.filter(awb_code__isnull=False).exclude(
+                shiprocket_status__in=FINAL_TRACKING_STATUSES
+            )
+        else:
+            candidates = Order.objects.filter(stale_tracking_filter())
+        candidates = candidates.only(*self.ORDER_FIELDS).order_by('id')
+
+        def track(order):
+            limiter.wait()
+            try:
+                return order, fetch_tracking_info(order.awb_code), None
+            except ShipRocketAPIError as e:
+                return order, None, e
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🚚 Syncing shipments with {options['workers']} workers at {rate:g} req/s..."
+        ))
+        totals = {'polled': 0, 'updated': 0, 'not_found': 0, 'errors': 0}
+        started = time.monotonic()
+        last_id = 0
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                size = min(batch_size, limit - totals['polled']) if limit else batch_size
+                if size <= 0:
+                    break
+                batch = list(candidates.filter(id__gt=last_id)[:size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                # Network calls run in the pool; all database work stays on this thread
+                now = timezone.now()
+                tracked = {}
+                not_found = []
+
+                for order, tracking_info, error in pool.map(track, batch):
+                    totals['polled'] += 1
+                    if error:
+                        totals['errors'] += 1
+                        self.stderr.write(f'  ❌ Order {order.id} ({order.awb_code}): {error}')
+                        continue
+                    if not tracking_info:
+                        totals['not_found'] += 1
+                        not_found.append(order.id)
+                        continue
+                    tracked[order.id] = tracking_info
+
+                # Otherwise they'd stay stale and be polled again on every run
+                if not_found:
+                    mark_tracking_checked(not_found, now=now)
+
+                if tracked:
+                    changed_orders = []
+                    changed_fields = set()
+                    events = []
+                    status_changes = []
+                    with transaction.atomic():
+                        # Applied to freshly locked rows, so concurrent status changes aren't overwritten
+                        for order in OrderStateMachine.lock_many(tracked, self.ORDER_FIELDS).values():
+                            previous_status = order.status
+                            fields, order_events = apply_tracking_info(order, tracked[order.id], now=now)
+                            status_changes.append((order.id, previous_status, order.status))
+                            order.updated_at = now
+                            changed_orders.append(order)
+                            changed_fields.update(fields)
+                            events.extend(order_events)
+
+                        Order.objects.bulk_update(changed_orders, sorted(changed_fields) + ['updated_at'])
+                        save_shipment_events(events)
+                        OrderStateMachine.record_transitions(status_changes, 'tracking')
+                    totals['updated'] += len(changed_orders)
+
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f"  ✅ {totals['polled']} polled ({totals['polled'] / elapsed:.1f}/s), "
+                    f"{totals['updated']} updated, {totals['errors']} errors"
+                )
+
+        elapsed = time.monotonic() - started
+        rate_achieved = totals['polled'] / elapsed if elapsed else totals['polled']
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Polled {totals['polled']} shipments in {elapsed:.1f}s ({rate_achieved:.1f}/s): "
+            f"{totals['updated']} updated, {totals['not_found']} without tracking data, "
+            f"{totals['errors']} errors"
+        ))
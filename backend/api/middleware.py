@@ -0,0 +1,44 @@
+# backend/api/middleware.py
+
+from .replica_utils import is_pinned_to_primary, pin_to_primary, replicas_enabled, set_read_from_replica
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe requests to views with read_from_replica = True read from a
+    replica. A user whose own write succeeded is kept on the primary for
+    REPLICA_PIN_SECONDS, so they always see their new orders, wishlist and
+    addresses.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # The flag lives in the thread's context; clear what the previous request left
+        set_read_from_replica(False)
+        response = self.get_response(request)
+
+        if not replicas_enabled():
+            return response
+        if not response.streaming:
+            # Streaming responses (exports) read while being sent, so keep the flag until the next request
+            set_read_from_replica(False)
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            pin_to_primary(user.pk)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if (not replicas_enabled() or request.method not in SAFE_METHODS
+                or not getattr(view_class, 'read_from_replica', False)):
+            return None
+        # Resolved here, before the flag is set, so the session user comes from the primary
+        if request.user.is_authenticated and is_pinned_to_primary(request.user.pk):
+            return None
+        set_read_from_replica(True)
+        return None
@@ -3,6 +3,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from allauth.account.signals import user_signed_up
+from django.db.models.signals import m2m_changed
 from django.dispatch import receiver
 import uuid
 
@@ -86,6 +87,16 @@ class Product(models.Model):
     stock = models.PositiveIntegerField(default=0)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, default='unisex')
 
+    # Shipping attributes of one packed unit (SHIPROCKET_DEFAULT_DIMENSIONS when unset)
+    weight = models.DecimalField(max_digits=6, decimal_places=3, null=True, blank=True,
+                                 help_text="Packed weight in kg")
+    length = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True,
+                                 help_text="Packed length in cm")
+    breadth = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True,
+                                  help_text="Packed breadth in cm")
+    height = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True,
+                                 help_text="Packed height in cm")
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -129,6 +140,17 @@ class Order(models.Model):
                                           help_text="Return policy restriction from coupon")
     
     shipping_address = models.TextField()
+    
+    # Structured snapshot of the shipping address taken at checkout
+    shipping_name = models.CharField(max_length=255, blank=True, default='')
+    shipping_phone = models.CharField(max_length=20, blank=True, default='')
+    shipping_address_line_1 = models.CharField(max_length=255, blank=True, default='')
+    shipping_address_line_2 = models.CharField(max_length=255, blank=True, default='')
+    shipping_city = models.CharField(max_length=100, blank=True, default='')
+    shipping_state = models.CharField(max_length=100, blank=True, default='')
+    shipping_pincode = models.CharField(max_length=20, blank=True, default='')
+    shipping_country = models.CharField(max_length=100, blank=True, default='India')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     tracking_number = models.CharField(max_length=255, blank=True, null=True)
@@ -152,12 +174,34 @@ class Order(models.Model):
                                                    help_text="Estimated delivery date from courier")
     shipped_date = models.DateTimeField(blank=True, null=True,
                                        help_text="Date when shipment was picked up")
-    delivered_date = models.DateTimeField(blank=True, null=True,
+    delivered_date = models.DateTimeField(blank=True, null=True, db_index=True,
                                          help_text="Date when shipment was delivered")
     shipping_charges = models.DecimalField(max_digits=10, decimal_places=2, default=0,
                                           help_text="Actual shipping charges from courier")
     is_shiprocket_enabled = models.BooleanField(default=True,
                                                help_text="Whether to use ShipRocket for this order")
+    package_details = models.JSONField(default=dict, blank=True,
+                                       help_text="Cached package weight/dimensions computed from items")
+    tracking_synced_at = models.DateTimeField(blank=True, null=True,
+                                              help_text="When tracking was last refreshed from ShipRocket")
+    tracking_summary = models.JSONField(default=dict, blank=True,
+                                        help_text="Latest tracking snapshot (status text, origin, destination)")
+
+    class Meta:
+        indexes = [
+            # Customer order history and admin listings filtered by status
+            models.Index(fields=['user', '-created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            models.Index(fields=['shiprocket_status', '-created_at'], name='order_sr_status_created_idx'),
+            # Shipping identifiers used by webhooks and tracking; most orders
+            # have none yet, so only rows with a value are indexed
+            models.Index(fields=['awb_code'], name='order_awb_code_idx',
+                         condition=models.Q(awb_code__isnull=False)),
+            models.Index(fields=['shipment_id'], name='order_shipment_id_idx',
+                         condition=models.Q(shipment_id__isnull=False)),
+            models.Index(fields=['shiprocket_order_id'], name='order_sr_order_id_idx',
+                         condition=models.Q(shiprocket_order_id__isnull=False)),
+        ]
 
     def __str__(self):
         return f"Order {self.id} by {self.user.email if self.user else 'Guest'}"
@@ -174,6 +218,27 @@ class Order(models.Model):
             return (self.discount_amount / self.original_price) * 100
         return 0
 
+    @property
+    def has_structured_address(self):
+        """Check if the shipping address snapshot is filled in"""
+        return bool(self.shipping_pincode and self.shipping_city and self.shipping_address_line_1)
+
+    def snapshot_address(self, address):
+        """Copy a saved Address onto the order so later edits don't affect it"""
+        self.shipping_name = address.full_name
+        self.shipping_phone = address.phone_number
+        self.shipping_address_line_1 = address.address_line_1
+        self.shipping_address_line_2 = address.address_line_2 or ''
+        self.shipping_city = address.city
+        self.shipping_state = address.state_province
+        self.shipping_pincode = address.zip_postal_code
+        self.shipping_country = address.country
+        if not self.shipping_address:
+            lines = [address.full_name, address.address_line_1, address.address_line_2,
+                     f"{address.city}, {address.state_province} {address.zip_postal_code}",
+                     address.country]
+            self.shipping_address = '\n'.join(line for line in lines if line)
+
     @property
     def is_shipped_via_shiprocket(self):
         """Check if order is shipped through ShipRocket"""
@@ -249,6 +314,8 @@ class OrderItem(models.Model):
     variant = models.ForeignKey('ProductVariant', related_name='order_items', on_delete=models.CASCADE, null=True, blank=True)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2) # Price at the time of purchase
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0,
+                                        help_text="Share of the order discount allocated to this item")
 
     def __str__(self):
         variant_info = f" - {self.variant.name}" if self.variant else ""
@@ -262,6 +329,138 @@ class OrderItem(models.Model):
             return Decimal(str(self.price)) + Decimal(str(self.variant.price_modifier))
         return self.price
 
+    @property
+    def refundable_amount(self):
+        """Amount actually paid for this line, i.e. what a full refund returns"""
+        from decimal import Decimal
+        return Decimal(str(self.final_price)) * self.quantity - Decimal(str(self.discount_amount))
+
+
+class OrderStatusEvent(models.Model):
+    """Append-only audit log of order status transitions (see order_utils)"""
+    SOURCE_CHOICES = (
+        ('checkout', 'Checkout'),
+        ('admin', 'Admin'),
+        ('bulk', 'Bulk Update'),
+        ('webhook', 'Webhook'),
+        ('tracking', 'Tracking Sync'),
+    )
+
+    order = models.ForeignKey(Order, related_name='status_events', on_delete=models.CASCADE)
+    from_status = models.CharField(max_length=20, blank=True, help_text="Empty for the order's creation")
+    to_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    actor = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='order_status_events')
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['order', 'created_at'], name='order_status_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id}: {self.from_status or 'new'} -> {self.to_status} ({self.source})"
+
+    def save(self, *args, **kwargs):
+        # The log is immutable; corrections are new transitions
+        if self.pk is not None and not kwargs.get('force_insert'):
+            raise ValueError("Order status events are append-only and cannot be modified")
+        super().save(*args, **kwargs)
+
+
+class ShipmentWebhookEvent(models.Model):
+    """
+    Raw ShipRocket webhook delivery, stored on receipt and applied to orders
+    later in batches. dedup_key makes courier retries a no-op.
+    """
+    PROCESSING_STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+        ('ignored', 'Ignored'),
+    )
+
+    dedup_key = models.CharField(max_length=64, unique=True,
+                                 help_text="Hash of AWB, status and event timestamp")
+    awb_code = models.CharField(max_length=100, blank=True, null=True)
+    order_reference = models.CharField(max_length=100, blank=True, null=True,
+                                       help_text="order_id as sent by ShipRocket")
+    current_status = models.CharField(max_length=50, blank=True, null=True)
+    event_time = models.DateTimeField(null=True, blank=True)
+    payload = models.JSONField()
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='webhook_events')
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['processing_status', 'received_at']),
+        ]
+
+    def __str__(self):
+        return f"Webhook {self.current_status} for AWB {self.awb_code} ({self.processing_status})"
+
+
+class ShipmentEvent(models.Model):
+    """
+    One courier scan in a shipment's history, collected from webhooks and
+    tracking polls. Tracking pages are served from these rows.
+    """
+    SOURCE_CHOICES = (
+        ('webhook', 'Webhook'),
+        ('poll', 'Poll'),
+    )
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='shipment_events')
+    awb_code = models.CharField(max_length=100)
+    status = models.CharField(max_length=100, blank=True)
+    activity = models.TextField(blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    event_time = models.DateTimeField(null=True, blank=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    dedup_key = models.CharField(max_length=64, unique=True,
+                                 help_text="Hash of AWB, scan time, status and activity")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-event_time', '-id']
+        indexes = [
+            models.Index(fields=['order', '-event_time']),
+        ]
+
+    def __str__(self):
+        return f"{self.status} for AWB {self.awb_code} at {self.event_time}"
+
+
+class PincodeServiceability(models.Model):
+    """
+    Locally stored delivery coverage per pincode, imported from ShipRocket
+    exports or CSV. Serves pincode checks without an API round trip.
+    """
+    pincode = models.CharField(max_length=6, unique=True)
+    is_serviceable = models.BooleanField(default=True)
+    cod_available = models.BooleanField(default=False)
+    etd_days = models.PositiveSmallIntegerField(null=True, blank=True,
+                                                help_text="Typical delivery time in days")
+    zone = models.CharField(max_length=20, blank=True)
+    courier_count = models.PositiveSmallIntegerField(default=0)
+    city = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=100, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Pincode serviceability'
+
+    def __str__(self):
+        return f"{self.pincode} ({'serviceable' if self.is_serviceable else 'not serviceable'})"
+
 
 # ==============================================================================
 # USER PROFILE MODELS
@@ -311,6 +510,30 @@ class Wishlist(models.Model):
         return f"Wishlist for {self.user.email}"
 
 
+@receiver(m2m_changed, sender=Wishlist.products.through)
+def invalidate_wishlist_ids(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep the cached wishlist id sets in step with changes made through the
+    ORM relation (admin, serializers, seed data).
+    """
+    from .wishlist_utils import invalidate_wishlist_cache
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_wishlist_cache(instance.user_id)
+        return
+
+    # product.wishlists.<op>(...) - instance is the product, pk_set holds wishlist ids
+    if action in ('post_add', 'post_remove') and pk_set:
+        wishlists = Wishlist.objects.filter(id__in=pk_set)
+    elif action == 'pre_clear':
+        wishlists = Wishlist.objects.filter(products=instance)
+    else:
+        return
+    for user_id in wishlists.values_list('user_id', flat=True):
+        invalidate_wishlist_cache(user_id)
+
+
 # ==============================================================================
 # COUPON SYSTEM MODELS
 # ==============================================================================
@@ -321,6 +544,7 @@ class Coupon(models.Model):
         ('fixed', 'Fixed Amount Discount'),
         ('free_shipping', 'Free Shipping'),
         ('buy_x_get_y', 'Buy X Get Y Free'),
+        ('tiered', 'Tiered Discount'),
     )
 
     # Basic coupon information
@@ -333,6 +557,12 @@ class Coupon(models.Model):
     discount_value = models.DecimalField(max_digits=10, decimal_places=2, 
                                        help_text="Amount or percentage value")
     
+    # Buy X get Y configuration (discount_value is the percentage off the Y items)
+    buy_quantity = models.PositiveIntegerField(default=2,
+                                             help_text="Items to buy for buy X get Y offers")
+    get_quantity = models.PositiveIntegerField(default=1,
+                                             help_text="Items discounted for buy X get Y offers")
+    
     # Usage restrictions
     minimum_order_value = models.DecimalField(max_digits=10, decimal_places=2, default=0,
                                             help_text="Minimum order total required")
@@ -377,7 +607,7 @@ class Coupon(models.Model):
     @property
     def total_uses(self):
         """Get total number of times this coupon has been used"""
-        return self.coupon_usages.count()
+        return self.coupon_usages.count() + self.archived_usages.count()
 
     @property
     def is_valid_date_range(self):
@@ -395,7 +625,29 @@ class Coupon(models.Model):
 
     def get_user_usage_count(self, user):
         """Get how many times a specific user has used this coupon"""
-        return self.coupon_usages.filter(user=user).count()
+        return self.coupon_usages.filter(user=user).count() + self.archived_usages.filter(user=user).count()
+
+
+class CouponTier(models.Model):
+    """Spend threshold for tiered coupons (highest matching tier wins)"""
+    TIER_DISCOUNT_TYPES = (
+        ('percentage', 'Percentage Discount'),
+        ('fixed', 'Fixed Amount Discount'),
+    )
+
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='tiers')
+    minimum_order_value = models.DecimalField(max_digits=10, decimal_places=2,
+                                            help_text="Eligible subtotal required for this tier")
+    discount_type = models.CharField(max_length=20, choices=TIER_DISCOUNT_TYPES, default='percentage')
+    discount_value = models.DecimalField(max_digits=10, decimal_places=2,
+                                       help_text="Amount or percentage value for this tier")
+
+    class Meta:
+        ordering = ['minimum_order_value']
+        unique_together = ['coupon', 'minimum_order_value']
+
+    def __str__(self):
+        return f"{self.coupon.code} tier from {self.minimum_order_value}"
 
 
 class CouponUsage(models.Model):
@@ -493,6 +745,15 @@ class ProductVariant(models.Model):
     price_modifier = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text="Price difference from base product")
     stock = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
+    # Override the product's shipping attributes when set (e.g. larger sizes)
+    weight = models.DecimalField(max_digits=6, decimal_places=3, null=True, blank=True,
+                                 help_text="Packed weight in kg")
+    length = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True,
+                                 help_text="Packed length in cm")
+    breadth = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True,
+                                  help_text="Packed breadth in cm")
+    height = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True,
+                                 help_text="Packed height in cm")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -568,9 +829,22 @@ class Review(models.Model):
 
 
 class RewardPoints(models.Model):
-    """Model for user reward points"""
+    """
+    Model for user reward points.
+    total_points is the running balance of the RewardTransaction ledger and is
+    only changed through api.reward_utils with atomic F() updates.
+    """
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='reward_points')
     total_points = models.PositiveIntegerField(default=0)
+    
+    # Last verified balance; reconciliation only sums ledger entries after the watermark
+    snapshot_points = models.IntegerField(default=0)
+    snapshot_watermark = models.BigIntegerField(default=0,
+                                               help_text="Highest ledger entry id included in the snapshot")
+    snapshot_at = models.DateTimeField(null=True, blank=True)
+    # Net points of settled entries moved to ArchivedRewardTransaction
+    archived_points = models.IntegerField(default=0)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -579,7 +853,7 @@ class RewardPoints(models.Model):
 
 
 class RewardTransaction(models.Model):
-    """Model to track reward point transactions"""
+    """Append-only ledger of reward point movements"""
     TRANSACTION_TYPES = [
         ('earn', 'Earned Points'),
         ('redeem', 'Redeemed Points'),
@@ -592,14 +866,33 @@ class RewardTransaction(models.Model):
     points = models.IntegerField(help_text="Positive for earning, negative for spending")
     description = models.CharField(max_length=200)
     order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True,
+                                      help_text="When earned points expire (credits only)")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+        constraints = [
+            # An order earns points at most once
+            models.UniqueConstraint(
+                fields=['order', 'transaction_type'],
+                condition=models.Q(transaction_type='earn'),
+                name='unique_reward_earn_per_order'
+            ),
+        ]
         
     def __str__(self):
         return f"{self.user.email} - {self.transaction_type}: {self.points} points"
 
+    def save(self, *args, **kwargs):
+        # Ledger entries are immutable; corrections are new entries
+        if self.pk is not None and not kwargs.get('force_insert'):
+            raise ValueError("Reward transactions are append-only and cannot be modified")
+        super().save(*args, **kwargs)
+
 
 class Banner(models.Model):
     """Model for homepage banners"""
@@ -684,6 +977,146 @@ class Spotlight(models.Model):
         return f"Spotlight: {self.title}"
 
 
+# ==============================================================================
+# SALES ANALYTICS
+# ==============================================================================
+
+class SalesRollup(models.Model):
+    """
+    Hourly sales totals per order status and dimension, maintained
+    incrementally as orders are placed and change status (see
+    analytics_utils). Reports aggregate these rows instead of scanning orders.
+    """
+    DIMENSION_CHOICES = (
+        ('total', 'Total'),
+        ('category', 'Category'),
+        ('product', 'Product'),
+        ('variant', 'Variant'),
+        ('gender', 'Gender'),
+        ('coupon', 'Coupon'),
+    )
+
+    bucket = models.DateTimeField(help_text="Start of the hour the orders were placed in")
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Category/product/variant/coupon id or gender; empty for 'total' and uncategorised products
+    key = models.CharField(max_length=50, blank=True, default='')
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    gross_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net_sales = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key', 'status', 'bucket'], name='sales_rollup_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'bucket'], name='sales_rollup_dim_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}:{self.key or '-'} {self.status} @ {self.bucket}"
+
+
+# ==============================================================================
+# ARCHIVE
+# ==============================================================================
+
+class ArchivedOrder(models.Model):
+    """
+    Completed order moved out of Order by archive_orders (see archive_utils).
+    Keeps the original id, the columns used by order history, and the order
+    as the API returned it (plus its status and shipment events) in data.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Original Order id")
+    user = models.ForeignKey(CustomUser, related_name='archived_orders', on_delete=models.SET_NULL,
+                             null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    item_count = models.PositiveIntegerField(default=0)
+    thumbnail = models.CharField(max_length=255, blank=True, default='',
+                                 help_text="Image path of the first item's product")
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_order_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id}"
+
+
+class ArchivedOrderItem(models.Model):
+    """Line of an archived order; product ids stay queryable (e.g. verified purchases)"""
+    id = models.BigIntegerField(primary_key=True, help_text="Original OrderItem id")
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    product_id = models.BigIntegerField(db_index=True)
+    variant_id = models.BigIntegerField(null=True, blank=True)
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.quantity} of product {self.product_id} in archived order {self.order_id}"
+
+
+class ArchivedCouponUsage(models.Model):
+    """CouponUsage of an archived order, still counted towards coupon usage limits"""
+    id = models.BigIntegerField(primary_key=True, help_text="Original CouponUsage id")
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='archived_usages')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='archived_coupon_usages')
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='coupon_usage')
+    used_at = models.DateTimeField()
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    original_order_value = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"Archived usage of coupon {self.coupon_id} on order {self.order_id}"
+
+
+class ArchivedRewardTransaction(models.Model):
+    """
+    Settled reward ledger entry moved out of RewardTransaction. Their net
+    total is kept in RewardPoints.archived_points so expiry stays exact.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Original RewardTransaction id")
+    user = models.ForeignKey(CustomUser, related_name='archived_reward_transactions', on_delete=models.CASCADE)
+    transaction_type = models.CharField(max_length=10)
+    points = models.IntegerField()
+    description = models.CharField(max_length=200)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_reward_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived {self.transaction_type}: {self.points} points for user {self.user_id}"
+
+
+# ==============================================================================
+# BACKGROUND JOB STATE
+# ==============================================================================
+
+class JobCheckpoint(models.Model):
+    """Resume position for batch jobs that walk a table by (timestamp, id)"""
+    name = models.CharField(max_length=100, unique=True)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_timestamp} / {self.last_id}"
+
+
 # ==============================================================================
 # ADVANCED ROLE AND PERMISSION SYSTEM
 # ==============================================================================
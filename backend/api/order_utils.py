@@ -0,0 +1,161 @@
+# backend/api/order_utils.py
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .analytics_utils import record_status_changes
+from .models import Order, OrderStatusEvent, RewardTransaction
+from .reward_utils import accrue_order_points_batch
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidTransitionError(Exception):
+    """Raised when an order cannot move to the requested status"""
+    pass
+
+
+class OrderStateMachine:
+    """
+    Allowed order status transitions and what happens on each of them.
+    Every status change is written to OrderStatusEvent, feeds the sales
+    rollups and, on delivery, stamps delivered_date and awards reward points.
+    """
+
+    TRANSITIONS = {
+        'pending': {'shipped', 'delivered', 'cancelled'},
+        'shipped': {'delivered', 'cancelled'},
+        'delivered': set(),
+        'cancelled': set(),
+    }
+
+    # Columns written when a status changes
+    STATUS_FIELDS = ['status', 'shipped_date', 'delivered_date', 'updated_at']
+
+    MAX_BULK_ORDERS = 5000
+
+    @staticmethod
+    def can_transition(from_status: str, to_status: str) -> bool:
+        return to_status in OrderStateMachine.TRANSITIONS.get(from_status, ())
+
+    @staticmethod
+    def apply_status(order: Order, to_status: str, now=None):
+        """
+        Move an order to to_status in memory, stamping the shipped/delivered
+        date if missing. Raises InvalidTransitionError if not allowed.
+        """
+        if not OrderStateMachine.can_transition(order.status, to_status):
+            raise InvalidTransitionError(f"Cannot move order {order.id} from {order.status} to {to_status}")
+
+        now = now or timezone.now()
+        order.status = to_status
+        if to_status in ('shipped', 'delivered') and not order.shipped_date:
+            order.shipped_date = now
+        if to_status == 'delivered' and not order.delivered_date:
+            order.delivered_date = now
+        order.updated_at = now
+
+    @staticmethod
+    def record_transitions(changes: Iterable[Tuple[int, Optional[str], str]], source: str,
+                           actor=None, note: str = ''):
+        """
+        Side effects of (order_id, from_status, to_status) changes that have
+        been (or are about to be) saved in the current transaction: audit
+        events, reward points for deliveries and sales rollups. from_status
+        is None for a newly placed order; unchanged entries are skipped.
+        """
+        changes = [change for change in changes if change[1] != change[2]]
+        if not changes:
+            return
+
+        OrderStatusEvent.objects.bulk_create([
+            OrderStatusEvent(order_id=order_id, from_status=from_status or '', to_status=to_status,
+                             source=source, actor=actor, note=note[:255])
+            for order_id, from_status, to_status in changes
+        ])
+
+        delivered_ids = [order_id for order_id, _, to_status in changes if to_status == 'delivered']
+        if delivered_ids:
+            OrderStateMachine._accrue_points(delivered_ids)
+
+        record_status_changes(changes)
+
+    @staticmethod
+    def _accrue_points(order_ids: List[int]):
+        """Award delivery points now instead of waiting for accrue_reward_points"""
+        already_earned = RewardTransaction.objects.filter(order=OuterRef('pk'), transaction_type='earn')
+        rows = list(
+            Order.objects.filter(id__in=order_ids, user__isnull=False)
+            .exclude(Exists(already_earned))
+            .values_list('id', 'user_id', 'total_price')
+        )
+        if not rows:
+            return
+        try:
+            with transaction.atomic():
+                accrue_order_points_batch(rows)
+        except IntegrityError:
+            # accrue_reward_points got there first (one earn per order is enforced)
+            logger.info(f"Reward points for orders {order_ids} were already awarded")
+
+    @staticmethod
+    def lock(order: Order, fields: Optional[List[str]] = None):
+        """
+        Lock the order's row for the rest of the current transaction and
+        reload it (or just `fields`), so a transition is checked against the
+        committed status rather than one read before a concurrent change.
+        """
+        order.refresh_from_db(fields=fields, from_queryset=Order.objects.select_for_update())
+
+    @staticmethod
+    def lock_many(order_ids: Iterable[int], fields: List[str]) -> Dict[int, Order]:
+        """Lock orders in id order (avoiding deadlocks) and return fresh copies by id"""
+        return {
+            order.id: order for order in
+            Order.objects.select_for_update().filter(id__in=list(order_ids)).only(*fields).order_by('id')
+        }
+
+    @staticmethod
+    def bulk_transition(order_ids: List[int], to_status: str, source: str = 'bulk',
+                        actor=None, note: str = '') -> List[Dict]:
+        """
+        Move many orders to to_status in one transaction: orders are locked
+        and read in one query, written with one bulk_update and logged with
+        one bulk insert. Orders that can't move are reported, not fatal.
+        Returns one result per order id.
+        """
+        results = {}
+        changed_orders = []
+        changes = []
+        now = timezone.now()
+
+        with transaction.atomic():
+            orders = {
+                order.id: order for order in
+                Order.objects.select_for_update().filter(id__in=order_ids)
+                .only('id', 'status', 'shipped_date', 'delivered_date', 'updated_at').order_by('id')
+            }
+            for order_id in order_ids:
+                order = orders.get(order_id)
+                if order is None:
+                    results[order_id] = {'order_id': order_id, 'success': False, 'error': 'Order not found'}
+                elif order.status == to_status:
+                    results[order_id] = {'order_id': order_id, 'success': True, 'changed': False,
+                                         'status': to_status}
+                elif not OrderStateMachine.can_transition(order.status, to_status):
+                    results[order_id] = {'order_id': order_id, 'success': False,
+                                         'error': f"Cannot move order from {order.status} to {to_status}"}
+                else:
+                    changes.append((order_id, order.status, to_status))
+                    OrderStateMachine.apply_status(order, to_status, now)
+                    changed_orders.append(order)
+                    results[order_id] = {'order_id': order_id, 'success': True, 'changed': True,
+                                         'status': to_status}
+
+            if changed_orders:
+                Order.objects.bulk_update(changed_orders, OrderStateMachine.STATUS_FIELDS, batch_size=1000)
+                OrderStateMachine.record_transitions(changes, source, actor, note)
+
+        return [results[order_id] for order_id in order_ids]
@@ -0,0 +1,53 @@
+# backend/api/pagination.py
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class AdminListPagination(PageNumberPagination):
+    """Page-numbered admin listings (?page=2&page_size=100)"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class OrderHistoryPagination(CursorPagination):
+    """
+    Cursor pages over a customer's orders, newest first. Follows the
+    (user, -created_at) index, so deep pages cost the same as the first.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class MergedQuerySet:
+    """
+    Read-only union of querysets over the same ordering columns, with just
+    what CursorPagination needs: order_by() and filter() apply to every part,
+    and a slice merges the first rows of each. Each part keeps using its own
+    index, which a SQL UNION (unfilterable once built) would not allow.
+    """
+
+    def __init__(self, *querysets, ordering=()):
+        self.querysets = querysets
+        self.ordering = tuple(ordering)
+
+    def order_by(self, *fields):
+        return MergedQuerySet(*(queryset.order_by(*fields) for queryset in self.querysets), ordering=fields)
+
+    def filter(self, *args, **kwargs):
+        return MergedQuerySet(
+            *(queryset.filter(*args, **kwargs) for queryset in self.querysets), ordering=self.ordering
+        )
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.stop is None or index.step is not None:
+            raise TypeError('MergedQuerySet only supports bounded slices')
+        # The first `stop` rows of the union are among the first `stop` rows of each part
+        rows = [row for queryset in self.querysets for row in queryset[:index.stop]]
+        if self.ordering:
+            fields = [field.lstrip('-') for field in self.ordering]
+            rows.sort(key=lambda row: tuple(getattr(row, field) for field in fields),
+                      reverse=self.ordering[0].startswith('-'))
+        return rows[index]
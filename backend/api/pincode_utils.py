@@ -0,0 +1,112 @@
+# backend/api/pincode_utils.py
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from django.core.cache import caches
+from .models import PincodeServiceability
+
+# Bumped by import_pincodes so every process reloads its index
+PINCODE_INDEX_VERSION_KEY = "pincode_index_version"
+
+# How often a process checks the shared version (seconds)
+VERSION_CHECK_INTERVAL = 60
+
+FLAG_SERVICEABLE = 1
+FLAG_COD = 2
+
+
+class PincodeIndex:
+    """
+    Compact in-memory copy of PincodeServiceability: parallel arrays sorted
+    by pincode, searched with bisect. 30k pincodes take well under 1 MB.
+    """
+
+    def __init__(self, rows=()):
+        self.pincodes = array('I')
+        self.flags = array('B')
+        self.etd_days = array('H')  # 0 = unknown
+        self.courier_counts = array('H')
+        self.zone_ids = array('B')
+        self.zones = ['']
+
+        zone_lookup = {'': 0}
+        for pincode, is_serviceable, cod_available, etd_days, zone, courier_count in sorted(rows):
+            self.pincodes.append(int(pincode))
+            self.flags.append((FLAG_SERVICEABLE if is_serviceable else 0) | (FLAG_COD if cod_available else 0))
+            self.etd_days.append(min(etd_days or 0, 65535))
+            self.courier_counts.append(min(courier_count or 0, 65535))
+            if zone not in zone_lookup:
+                zone_lookup[zone] = len(self.zones)
+                self.zones.append(zone)
+            self.zone_ids.append(zone_lookup[zone])
+
+    def __len__(self):
+        return len(self.pincodes)
+
+    def lookup(self, pincode):
+        """Serviceability dict for a pincode, or None if it isn't in the dataset"""
+        key = int(pincode)
+        position = bisect_left(self.pincodes, key)
+        if position == len(self.pincodes) or self.pincodes[position] != key:
+            return None
+
+        flags = self.flags[position]
+        return {
+            'pincode': str(pincode),
+            'serviceable': bool(flags & FLAG_SERVICEABLE),
+            'cod_available': bool(flags & FLAG_COD),
+            'fastest_delivery_days': self.etd_days[position] or None,
+            'available_couriers_count': self.courier_counts[position],
+            'zone': self.zones[self.zone_ids[position]] or None,
+        }
+
+
+_index = None
+_index_version = None
+_last_version_check = 0.0
+_lock = threading.Lock()
+
+
+def load_pincode_index():
+    """Build an index from the database"""
+    rows = PincodeServiceability.objects.values_list(
+        'pincode', 'is_serviceable', 'cod_available', 'etd_days', 'zone', 'courier_count'
+    ).iterator(chunk_size=5000)
+    return PincodeIndex(row for row in rows if row[0].isdigit())
+
+
+def get_pincode_index():
+    """
+    The process-wide index, loaded on first use and reloaded when the
+    shared version changes after an import.
+    """
+    global _index, _index_version, _last_version_check
+
+    now = time.monotonic()
+    if _index is not None and now - _last_version_check < VERSION_CHECK_INTERVAL:
+        return _index
+
+    with _lock:
+        if _index is not None and now - _last_version_check < VERSION_CHECK_INTERVAL:
+            return _index
+        version = caches['shared'].get(PINCODE_INDEX_VERSION_KEY)
+        if _index is None or version != _index_version:
+            _index = load_pincode_index()
+            _index_version = version
+        _last_version_check = now
+        return _index
+
+
+def lookup_pincode(pincode):
+    """Local serviceability for a pincode, or None if unknown"""
+    return get_pincode_index().lookup(pincode)
+
+
+def invalidate_pincode_index():
+    """Make every process reload its index on its next version check"""
+    global _last_version_check
+
+    caches['shared'].set(PINCODE_INDEX_VERSION_KEY, time.time(), timeout=None)
+    _last_version_check = 0.0
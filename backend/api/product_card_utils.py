@@ -0,0 +1,162 @@
+# backend/api/product_card_utils.py
+
+from decimal import Decimal
+from django.core.files.storage import default_storage
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
+from django.utils import timezone
+from .models import Product, ProductImage
+
+# Listing cards are built straight from values_list() rows instead of model
+# instances and DRF fields. Output matches ProductSerializer and
+# NewArrivalProductSerializer field for field; grid cards format ratings the
+# way EnhancedProductSerializer does.
+
+GENDER_DISPLAY = dict(Product.GENDER_CHOICES)
+
+TWO_PLACES = Decimal('0.01')
+
+# Fields of ProductSerializer and NewArrivalProductSerializer
+PRODUCT_CARD_FIELDS = ('id', 'name', 'description', 'price', 'image', 'category', 'stock', 'gender', 'gender_display')
+NEW_ARRIVAL_CARD_FIELDS = ('id', 'name', 'price', 'image', 'category', 'stock', 'gender', 'gender_display',
+                           'average_rating', 'review_count', 'created_at')
+
+# Compact card for product grids (EnhancedProductListView ?card=true)
+GRID_CARD_FIELDS = ('id', 'name', 'price', 'image', 'primary_image', 'category', 'stock', 'gender',
+                    'gender_display', 'average_rating', 'review_count', 'created_at')
+
+
+def format_decimal(value):
+    """Same string as a 2-place DRF DecimalField"""
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return '{:f}'.format(value.quantize(TWO_PLACES))
+
+
+def format_rating(value):
+    """Same number as EnhancedProductSerializer.average_rating: 1 decimal, 0 without reviews"""
+    return round(value, 1) if value is not None else 0
+
+
+def format_datetime(value):
+    """Same string as DRF's ISO 8601 DateTimeField"""
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def format_gender(value):
+    return GENDER_DISPLAY.get(value, value)
+
+
+def primary_image_subquery():
+    """Path of the product's primary gallery image, falling back to the first one"""
+    return Subquery(
+        ProductImage.objects.filter(product=OuterRef('pk'))
+        .order_by('-is_primary', 'order', 'id').values('image')[:1]
+    )
+
+
+# field: (values_list lookup, converter, annotation needed for the lookup)
+CARD_FIELD_SPECS = {
+    'id': ('id', None, None),
+    'name': ('name', None, None),
+    'description': ('description', None, None),
+    'price': ('price', format_decimal, None),
+    'image': ('image', 'image', None),
+    'primary_image': ('primary_image', 'image', primary_image_subquery),
+    'category': ('category__name', None, None),
+    'stock': ('stock', None, None),
+    'gender': ('gender', None, None),
+    'gender_display': ('gender', format_gender, None),
+    'average_rating': ('average_rating', format_decimal,
+                       lambda: Avg('reviews__rating', filter=Q(reviews__is_approved=True))),
+    'review_count': ('review_count', None,
+                     lambda: Count('reviews', filter=Q(reviews__is_approved=True))),
+    'created_at': ('created_at', format_datetime, None),
+}
+
+# Grid cards stand in for EnhancedProductSerializer, so ratings use its
+# annotations (see EnhancedProductQuerysetMixin) and number format
+GRID_CARD_FIELD_SPECS = {
+    **CARD_FIELD_SPECS,
+    'average_rating': ('approved_rating_avg', format_rating,
+                       lambda: Avg('reviews__rating', filter=Q(reviews__is_approved=True))),
+    'review_count': ('approved_review_count', None,
+                     lambda: Count('reviews', filter=Q(reviews__is_approved=True))),
+}
+
+
+class ProductCardMapper:
+    """
+    Precompiled projection for a tuple of card fields: the values_list
+    lookups to select (each column once), the annotations they need and,
+    per output field, its column position and converter.
+    """
+
+    def __init__(self, fields, specs=CARD_FIELD_SPECS):
+        self.fields = tuple(fields)
+        self.lookups = []
+        self.annotations = {}
+        self.columns = []
+        for field in self.fields:
+            lookup, converter, annotation = specs[field]
+            if lookup not in self.lookups:
+                self.lookups.append(lookup)
+            if annotation is not None:
+                self.annotations[lookup] = annotation
+            self.columns.append((field, self.lookups.index(lookup), converter))
+
+    def rows(self, queryset):
+        # Annotations already on the queryset (e.g. NewArrivalProductsView's ratings) are reused
+        missing = {
+            name: build() for name, build in self.annotations.items()
+            if name not in queryset.query.annotations
+        }
+        if missing:
+            queryset = queryset.annotate(**missing)
+        return queryset.values_list(*self.lookups)
+
+    def map(self, rows, request=None):
+        """Card dicts for values_list rows, with image URLs absolute when a request is given"""
+        def image_url(name):
+            if not name:
+                return None
+            url = default_storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        columns = [
+            (field, position, image_url if converter == 'image' else converter)
+            for field, position, converter in self.columns
+        ]
+        return [
+            {field: row[position] if converter is None else converter(row[position])
+             for field, position, converter in columns}
+            for row in rows
+        ]
+
+
+_mappers = {}
+
+
+def get_card_mapper(fields, specs=CARD_FIELD_SPECS):
+    """Mapper for a field tuple and spec table, compiled once per process"""
+    key = (fields, id(specs))
+    mapper = _mappers.get(key)
+    if mapper is None:
+        mapper = _mappers[key] = ProductCardMapper(fields, specs)
+    return mapper
+
+
+def build_product_cards(queryset, fields=PRODUCT_CARD_FIELDS, request=None, limit=None, specs=CARD_FIELD_SPECS):
+    """
+    Card dicts for a filtered, ordered (unsliced) product queryset, at most
+    limit of them. One query, whatever the fields.
+    """
+    mapper = get_card_mapper(tuple(fields), specs)
+    rows = mapper.rows(queryset)
+    if limit is not None:
+        rows = rows[:limit]
+    return mapper.map(rows, request)
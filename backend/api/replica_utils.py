@@ -0,0 +1,123 @@
+# backend/api/replica_utils.py
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# Set for the duration of a request whose reads may be served by a replica
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+# Written by a user's own requests; while present their reads stay on the primary
+PRIMARY_PIN_KEY = "db_primary_pin:{user_id}"
+
+# Seconds behind the primary; NULL (not a standby, e.g. a local stand-in) counts as caught up
+REPLICA_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_healthy_replicas = []
+_last_lag_check = None
+_lock = threading.Lock()
+
+
+def replicas_enabled():
+    return bool(settings.REPLICA_DATABASES)
+
+
+def set_read_from_replica(enabled):
+    _read_from_replica.set(enabled)
+
+
+@contextmanager
+def read_from_replica():
+    """Send reads inside the block to a replica, e.g. from management commands"""
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def pin_to_primary(user_id):
+    """Read user_id's requests from the primary until their own writes have replicated"""
+    caches['shared'].set(PRIMARY_PIN_KEY.format(user_id=user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user_id):
+    return bool(caches['shared'].get(PRIMARY_PIN_KEY.format(user_id=user_id)))
+
+
+def get_replica_lag(alias):
+    """Replication lag of a replica in seconds, or None if it can't be reached"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(REPLICA_LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except Exception as e:
+        logger.warning(f"Replica {alias} is unavailable: {e}")
+        connection.close()
+        return None
+    return float(lag or 0)
+
+
+def get_healthy_replicas():
+    """
+    Replicas that are reachable and within REPLICA_MAX_LAG_SECONDS of the
+    primary. Checked at most every REPLICA_LAG_CHECK_INTERVAL seconds per
+    process; the primary is used while none qualify.
+    """
+    global _healthy_replicas, _last_lag_check
+
+    now = time.monotonic()
+    if _last_lag_check is not None and now - _last_lag_check < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return _healthy_replicas
+
+    with _lock:
+        if _last_lag_check is not None and now - _last_lag_check < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return _healthy_replicas
+        healthy = []
+        for alias in settings.REPLICA_DATABASES:
+            lag = get_replica_lag(alias)
+            if lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS:
+                healthy.append(alias)
+            elif lag is not None:
+                logger.warning(f"Replica {alias} is {lag:.1f}s behind; reading from the primary")
+        _healthy_replicas = healthy
+        _last_lag_check = now
+        return _healthy_replicas
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a healthy replica while a request has opted in (see
+    ReplicaRoutingMiddleware or read_from_replica), everything else to the
+    primary. Reads inside a transaction on the primary stay there.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _read_from_replica.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = get_healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
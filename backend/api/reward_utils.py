@@ -0,0 +1,244 @@
+# backend/api/reward_utils.py
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, IntegerField, Max, Q, Sum, Value, When
+from django.utils import timezone
+from .models import RewardPoints, RewardTransaction
+
+
+class InsufficientPointsError(Exception):
+    """Raised when a debit would take a reward balance below zero"""
+    pass
+
+
+def get_points_expiry(from_time=None):
+    """Expiry timestamp for points earned now (None disables expiry)"""
+    expiry_days = getattr(settings, 'REWARD_POINTS_EXPIRY_DAYS', None)
+    if not expiry_days:
+        return None
+    return (from_time or timezone.now()) + timedelta(days=expiry_days)
+
+
+def get_balance(user):
+    """Current balance, read from the maintained running total"""
+    return RewardPoints.objects.filter(user=user).values_list('total_points', flat=True).first() or 0
+
+
+def award_points(user, points, description, transaction_type='earn', order=None, expires_at=None):
+    """
+    Credit points to a user: ledger entry and balance update in one transaction.
+    Returns the created RewardTransaction.
+    """
+    if points <= 0:
+        raise ValueError("Awarded points must be positive")
+
+    with transaction.atomic():
+        RewardPoints.objects.get_or_create(user=user)
+        # Updating first locks the balance row before the ledger insert (see reconcile_batch)
+        RewardPoints.objects.filter(user=user).update(
+            total_points=F('total_points') + points,
+            updated_at=timezone.now()
+        )
+        return RewardTransaction.objects.create(
+            user=user,
+            transaction_type=transaction_type,
+            points=points,
+            description=description,
+            order=order,
+            expires_at=expires_at if expires_at is not None else get_points_expiry()
+        )
+
+
+def redeem_points(user, points, description):
+    """
+    Debit points from a user. The balance check and the decrement are a single
+    conditional UPDATE, so concurrent redemptions can never overdraw.
+    Must be called inside transaction.atomic() when combined with other writes.
+    Returns the remaining balance.
+    """
+    if points <= 0:
+        raise ValueError("Redeemed points must be positive")
+
+    with transaction.atomic():
+        updated = RewardPoints.objects.filter(user=user, total_points__gte=points).update(
+            total_points=F('total_points') - points,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            raise InsufficientPointsError("Insufficient points")
+
+        RewardTransaction.objects.create(
+            user=user,
+            transaction_type='redeem',
+            points=-points,
+            description=description
+        )
+        return get_balance(user)
+
+
+def apply_balance_deltas(deltas):
+    """
+    Apply {user_id: points_delta} to reward balances with a single grouped UPDATE.
+    Rows must already exist; callers run this in the same transaction as the
+    matching ledger inserts.
+    """
+    if not deltas:
+        return 0
+
+    return RewardPoints.objects.filter(user_id__in=deltas.keys()).update(
+        total_points=F('total_points') + Case(
+            *[When(user_id=user_id, then=Value(delta)) for user_id, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        ),
+        updated_at=timezone.now()
+    )
+
+
+def calculate_order_points(order_total):
+    """Points earned for a delivered order (REWARD_POINTS_PER_100 per ₹100 spent)"""
+    points_per_100 = getattr(settings, 'REWARD_POINTS_PER_100', 10)
+    return int(order_total * points_per_100 // 100)
+
+
+def accrue_order_points_batch(orders):
+    """
+    Award points for a batch of delivered orders given as
+    (order_id, user_id, total_price) tuples: one bulk ledger insert and one
+    grouped balance UPDATE. Returns {user_id: points_awarded}.
+    """
+    expires_at = get_points_expiry()
+    entries = []
+    deltas = {}
+
+    for order_id, user_id, total_price in orders:
+        points = calculate_order_points(total_price)
+        if points <= 0:
+            continue
+        entries.append(RewardTransaction(
+            user_id=user_id,
+            transaction_type='earn',
+            points=points,
+            description=f"Points earned for order #{order_id}",
+            order_id=order_id,
+            expires_at=expires_at
+        ))
+        deltas[user_id] = deltas.get(user_id, 0) + points
+
+    with transaction.atomic():
+        RewardPoints.objects.bulk_create(
+            [RewardPoints(user_id=user_id) for user_id in deltas],
+            ignore_conflicts=True
+        )
+        # Lock the balance rows before inserting ledger entries (see reconcile_batch)
+        list(RewardPoints.objects.select_for_update().filter(user_id__in=deltas.keys())
+             .order_by('user_id').values_list('id', flat=True))
+        RewardTransaction.objects.bulk_create(entries)
+        apply_balance_deltas(deltas)
+
+    return deltas
+
+
+def expire_points_batch(user_ids, now=None):
+    """
+    Expire matured points for a batch of users.
+    Debits consume the oldest credits first, so the amount to expire is
+    (credits matured by now) - (all debits so far), capped by the balance,
+    with archived ledger entries included through archived_points.
+    Running it again is a no-op because the expiry debits count as debits.
+    Returns {user_id: expired_points}.
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        accounts = {
+            user_id: (balance, archived)
+            for user_id, balance, archived in RewardPoints.objects.select_for_update()
+            .filter(user_id__in=user_ids)
+            .values_list('user_id', 'total_points', 'archived_points')
+        }
+        ledger = {
+            row['user_id']: row for row in
+            RewardTransaction.objects.filter(user_id__in=accounts.keys()).values('user_id').annotate(
+                matured=Sum('points', filter=Q(points__gt=0, expires_at__lte=now)),
+                debited=Sum('points', filter=Q(points__lt=0)),
+            )
+        }
+
+        expired = {}
+        for user_id, (balance, archived) in accounts.items():
+            row = ledger.get(user_id, {})
+            # Archived entries are matured credits and debits, so their net counts as-is
+            expirable = (row.get('matured') or 0) + (row.get('debited') or 0) + archived
+            expirable = min(expirable, balance)
+            if expirable > 0:
+                expired[user_id] = expirable
+
+        RewardTransaction.objects.bulk_create([
+            RewardTransaction(
+                user_id=user_id,
+                transaction_type='expire',
+                points=-points,
+                description='Points expired'
+            )
+            for user_id, points in expired.items()
+        ])
+        apply_balance_deltas({user_id: -points for user_id, points in expired.items()})
+
+    return expired
+
+
+def reconcile_batch(user_ids, fix=False, snapshot=False):
+    """
+    Verify balances against the ledger for a batch of users.
+    Only ledger entries newer than each user's snapshot watermark are summed.
+    Rows are locked for the duration so in-flight earns/redeems can't skew the check:
+    every writer locks or updates the balance row before inserting ledger entries,
+    so a locked user has no uncommitted entries.
+    Returns a list of (user_id, balance, ledger_balance) mismatches.
+    """
+    with transaction.atomic():
+        accounts = list(
+            RewardPoints.objects.select_for_update()
+            .filter(user_id__in=user_ids)
+            .values('id', 'user_id', 'total_points', 'snapshot_points', 'snapshot_watermark')
+        )
+        ledger = {
+            user_id: (delta, last_id) for user_id, delta, last_id in
+            RewardTransaction.objects.filter(user_id__in=[account['user_id'] for account in accounts])
+            .values('user_id').annotate(
+                delta=Sum('points', filter=Q(id__gt=F('user__reward_points__snapshot_watermark'))),
+                last_id=Max('id'),
+            ).values_list('user_id', 'delta', 'last_id')
+        }
+
+        mismatches = []
+        verified = []
+        for account in accounts:
+            delta = ledger.get(account['user_id'], (0, None))[0]
+            ledger_balance = account['snapshot_points'] + (delta or 0)
+            if ledger_balance != account['total_points']:
+                mismatches.append((account['user_id'], account['total_points'], ledger_balance))
+                if fix and ledger_balance >= 0:
+                    RewardPoints.objects.filter(id=account['id']).update(total_points=ledger_balance)
+                    verified.append(account['id'])
+            else:
+                verified.append(account['id'])
+
+        # Each user's watermark is their own newest entry, read under the lock
+        if snapshot and verified:
+            watermarks = [
+                When(id=account['id'], then=Value(ledger[account['user_id']][1]))
+                for account in accounts
+                if account['id'] in verified and account['user_id'] in ledger
+            ]
+            RewardPoints.objects.filter(id__in=verified).update(
+                snapshot_points=F('total_points'),
+                snapshot_watermark=Case(*watermarks, default=F('snapshot_watermark'),
+                                        output_field=BigIntegerField()) if watermarks else F('snapshot_watermark'),
+                snapshot_at=timezone.now()
+            )
+
+    return mismatches
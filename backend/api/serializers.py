@@ -5,10 +5,31 @@ from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 from dj_rest_auth.serializers import UserDetailsSerializer
 from dj_rest_auth.registration.serializers import RegisterSerializer as DefaultRegisterSerializer
+from .fieldset_utils import get_expansion, includes_field
 
 
 User = get_user_model()
 
+
+class SparseFieldsMixin:
+    """
+    Returns only the fields the request asked for: context['requested_fields']
+    (?fields=) and context['requested_expansions'] (?expand=, groups listed in
+    Meta.expandable_fields). Without either, every field is returned.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('requested_fields')
+        expand = self.context.get('requested_expansions')
+        if requested is None and expand is None:
+            return fields
+        return {
+            name: field for name, field in fields.items()
+            if field.write_only or includes_field(name, get_expansion(type(self), name), requested, expand)
+        }
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True)
@@ -87,7 +108,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'slug', 'image')
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # To display the category name instead of its ID
     category = serializers.StringRelatedField()
     gender_display = serializers.CharField(source='get_gender_display', read_only=True)
@@ -95,6 +116,8 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ('id', 'name', 'description', 'price', 'image', 'category', 'stock', 'gender', 'gender_display')
+        # Columns behind computed fields, for only()
+        field_columns = {'category': ('category__name',), 'gender_display': ('gender',)}
 
 
 class AdminProductSerializer(serializers.ModelSerializer):
@@ -102,7 +125,8 @@ class AdminProductSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Product
-        fields = ('id', 'name', 'description', 'price', 'image', 'category', 'stock', 'gender', 'gender_display')
+        fields = ('id', 'name', 'description', 'price', 'image', 'category', 'stock', 'gender', 'gender_display',
+                  'weight', 'length', 'breadth', 'height')
 
 
 
@@ -118,7 +142,7 @@ class DesignSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at',)
 
 
-from .models import Order, OrderItem
+from .models import Address, Order, OrderItem
 
 class OrderItemSerializer(serializers.ModelSerializer):
     final_price = serializers.ReadOnlyField()
@@ -127,10 +151,12 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderItem
-        fields = ('product', 'product_name', 'variant', 'variant_name', 'quantity', 'price', 'final_price')
+        fields = ('product', 'product_name', 'variant', 'variant_name', 'quantity', 'price', 'final_price',
+                  'discount_amount')
+        read_only_fields = ('discount_amount',)
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     coupon_code = serializers.CharField(source='applied_coupon.code', read_only=True)
@@ -142,12 +168,16 @@ class OrderSerializer(serializers.ModelSerializer):
     can_be_tracked = serializers.ReadOnlyField()
     shiprocket_tracking_url = serializers.ReadOnlyField()
     shiprocket_status_display = serializers.CharField(source='get_shiprocket_status_display', read_only=True)
+    # Saved address to ship to; snapshotted onto the order at checkout
+    address_id = serializers.IntegerField(write_only=True, required=False)
 
     class Meta:
         model = Order
         fields = [
             'id', 'user', 'items', 'original_price', 'discount_amount', 'total_price',
-            'shipping_address', 'created_at', 'updated_at', 'status', 'applied_coupon', 'coupon_code',
+            'shipping_address', 'address_id', 'shipping_name', 'shipping_phone', 'shipping_address_line_1',
+            'shipping_address_line_2', 'shipping_city', 'shipping_state', 'shipping_pincode', 'shipping_country',
+            'created_at', 'updated_at', 'status', 'applied_coupon', 'coupon_code',
             'no_return_allowed', 'discount_percentage', 'has_discount', 'tracking_number',
             # ShipRocket fields
             'shiprocket_order_id', 'awb_code', 'courier_company_id', 'courier_company_name',
@@ -160,22 +190,135 @@ class OrderSerializer(serializers.ModelSerializer):
             'shiprocket_order_id', 'awb_code', 'courier_company_id', 'courier_company_name',
             'shipment_id', 'shiprocket_status', 'shiprocket_status_display', 'estimated_delivery_date',
             'shipped_date', 'delivered_date', 'shipping_charges', 'tracking_number',
-            'is_shipped_via_shiprocket', 'can_be_tracked', 'shiprocket_tracking_url'
+            'is_shipped_via_shiprocket', 'can_be_tracked', 'shiprocket_tracking_url',
+            'shipping_name', 'shipping_phone', 'shipping_address_line_1', 'shipping_address_line_2',
+            'shipping_city', 'shipping_state', 'shipping_pincode', 'shipping_country'
         ]
+        extra_kwargs = {
+            'shipping_address': {'required': False},
+        }
+        # ?expand= groups; with expand=items the ShipRocket fields are left out
+        expandable_fields = {
+            'items': ('items',),
+            'shipment': (
+                'shiprocket_order_id', 'awb_code', 'courier_company_id', 'courier_company_name',
+                'shipment_id', 'shiprocket_status', 'shiprocket_status_display', 'estimated_delivery_date',
+                'shipped_date', 'delivered_date', 'shipping_charges', 'is_shiprocket_enabled',
+                'is_shipped_via_shiprocket', 'can_be_tracked', 'shiprocket_tracking_url',
+            ),
+        }
+        # Columns behind computed fields, for only()
+        field_columns = {
+            'coupon_code': ('applied_coupon__code',),
+            'discount_percentage': ('original_price', 'discount_amount'),
+            'has_discount': ('discount_amount',),
+            'shiprocket_status_display': ('shiprocket_status',),
+            'is_shipped_via_shiprocket': ('shiprocket_order_id', 'awb_code'),
+            'can_be_tracked': ('awb_code', 'tracking_number'),
+            'shiprocket_tracking_url': ('awb_code',),
+        }
+
+    def validate(self, data):
+        address_id = data.get('address_id')
+        if address_id is not None:
+            request = self.context.get('request')
+            try:
+                data['address'] = Address.objects.get(id=address_id, user=request.user)
+            except Address.DoesNotExist:
+                raise serializers.ValidationError({'address_id': 'Address not found'})
+        elif not data.get('shipping_address') and not self.instance:
+            raise serializers.ValidationError({'shipping_address': 'Provide shipping_address or address_id'})
+
+        coupon = data.get('applied_coupon')
+        if coupon and not self.instance:
+            errors = self.get_coupon_errors(coupon, data)
+            if errors:
+                raise serializers.ValidationError({'applied_coupon': errors})
+        return data
+
+    @staticmethod
+    def get_coupon_errors(coupon, data):
+        """CouponValidator errors for applying coupon to the order in data"""
+        from .coupon_utils import CouponValidator
+
+        order_total = data.get('original_price', data.get('total_price'))
+        validator = CouponValidator(coupon.code, data['user'], data.get('items'), order_total=order_total)
+        return validator.validate()[1]
 
     def create(self, validated_data):
+        from django.db import transaction
+        from .coupon_utils import CouponCalculator, record_coupon_usage
+        from .order_utils import OrderStateMachine
+
         items_data = validated_data.pop('items')
+        validated_data.pop('address_id', None)
+        address = validated_data.pop('address', None)
         
         # Set original_price equal to total_price if not provided (for backward compatibility)
         if 'original_price' not in validated_data:
             validated_data['original_price'] = validated_data['total_price']
         
-        order = Order.objects.create(**validated_data)
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        with transaction.atomic():
+            # Price the coupon server-side and keep each item's share for refunds
+            allocations = [0] * len(items_data)
+            coupon = validated_data.get('applied_coupon')
+            if coupon:
+                # Usage limits are re-checked under the coupon's row lock so
+                # concurrent checkouts can't both take the last use
+                coupon = Coupon.objects.select_for_update().get(pk=coupon.pk)
+                errors = self.get_coupon_errors(coupon, {**validated_data, 'items': items_data})
+                if errors:
+                    raise serializers.ValidationError({'applied_coupon': errors})
+
+                # Free shipping is worth the cached courier rate to the saved address's pincode
+                shipping_cost = None
+                if coupon.discount_type == 'free_shipping' and address:
+                    from .shiprocket_utils import ShipRocketHelper
+                    shipping_cost = ShipRocketHelper.get_cached_shipping_cost(address.zip_postal_code)
+                calculation = CouponCalculator.calculate(
+                    coupon, validated_data['original_price'], items_data, shipping_cost
+                )
+                validated_data['discount_amount'] = calculation['discount_amount']
+                validated_data['total_price'] = calculation['final_total']
+                validated_data['no_return_allowed'] = coupon.no_return_policy
+                allocations = calculation['allocations']
+
+            order = Order(**validated_data)
+            if address:
+                order.snapshot_address(address)
+            order.save()
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, discount_amount=allocation, **item_data)
+                for item_data, allocation in zip(items_data, allocations)
+            ])
+            if coupon:
+                record_coupon_usage(coupon, order.user, order, order.discount_amount, order.original_price)
+            OrderStateMachine.record_transitions([(order.id, None, order.status)], 'checkout', actor=order.user)
         return order
 
 
+class OrderSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Order history card. Expects item_count and thumbnail annotations
+    (see OrderListView); full details come from OrderDetailView.
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Order
+        fields = ('id', 'created_at', 'status', 'status_display', 'total_price', 'item_count', 'thumbnail')
+
+    def get_thumbnail(self, obj):
+        if not obj.thumbnail:
+            return None
+        from django.core.files.storage import default_storage
+        url = default_storage.url(obj.thumbnail)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
 # ==============================================================================
 # USER PROFILE SERIALIZERS
 # ==============================================================================
@@ -200,11 +343,20 @@ class WishlistSerializer(serializers.ModelSerializer):
         model = Wishlist
         fields = ('user', 'products', 'total_items', 'total_value')
     
+    def _get_totals(self, obj):
+        # One aggregate query shared by both fields
+        if not hasattr(obj, '_wishlist_totals'):
+            from django.db.models import Count, Sum
+            obj._wishlist_totals = obj.products.aggregate(
+                total_items=Count('id'), total_value=Sum('price')
+            )
+        return obj._wishlist_totals
+
     def get_total_items(self, obj):
-        return obj.products.count()
+        return self._get_totals(obj)['total_items']
     
     def get_total_value(self, obj):
-        return sum(product.price for product in obj.products.all())
+        return self._get_totals(obj)['total_value'] or 0
 
 
 class WishlistProductSerializer(serializers.ModelSerializer):
@@ -217,9 +369,16 @@ class WishlistProductSerializer(serializers.ModelSerializer):
 # ==============================================================================
 # COUPON SERIALIZERS
 # ==============================================================================
-from .models import Coupon, CouponUsage, Category, Product
+from .models import Coupon, CouponTier, CouponUsage, Category, Product
+
+class CouponTierSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CouponTier
+        fields = ['id', 'minimum_order_value', 'discount_type', 'discount_value']
+
 
 class CouponSerializer(serializers.ModelSerializer):
+    tiers = CouponTierSerializer(many=True, read_only=True)
     total_uses = serializers.ReadOnlyField()
     is_valid_date_range = serializers.ReadOnlyField()
     created_by_email = serializers.CharField(source='created_by.email', read_only=True)
@@ -228,7 +387,7 @@ class CouponSerializer(serializers.ModelSerializer):
         model = Coupon
         fields = [
             'id', 'code', 'name', 'description', 'discount_type', 'discount_value',
-            'minimum_order_value', 'max_uses_total', 'max_uses_per_user',
+            'buy_quantity', 'get_quantity', 'tiers', 'minimum_order_value', 'max_uses_total', 'max_uses_per_user',
             'valid_from', 'valid_until', 'is_active', 'no_return_policy',
             'allow_stacking', 'total_uses', 'is_valid_date_range',
             'created_by_email', 'created_at', 'updated_at'
@@ -257,6 +416,12 @@ class CouponSerializer(serializers.ModelSerializer):
         if discount_type in ['fixed', 'free_shipping'] and discount_value <= 0:
             raise serializers.ValidationError("Fixed discount amount must be greater than 0.")
 
+        if discount_type == 'buy_x_get_y':
+            if discount_value <= 0 or discount_value > 100:
+                raise serializers.ValidationError("Buy X get Y discount must be a percentage between 1 and 100.")
+            if data.get('get_quantity', 1) < 1:
+                raise serializers.ValidationError("Buy X get Y offers must discount at least one item.")
+
         return data
 
 
@@ -278,9 +443,37 @@ class AdminCouponSerializer(CouponSerializer):
         required=False
     )
 
+    tiers = CouponTierSerializer(many=True, required=False)
+
     class Meta(CouponSerializer.Meta):
         fields = CouponSerializer.Meta.fields + ['categories', 'products', 'user_restrictions']
 
+    def validate(self, data):
+        data = super().validate(data)
+        discount_type = data.get('discount_type', self.instance.discount_type if self.instance else None)
+        if discount_type == 'tiered':
+            tiers = data.get('tiers')
+            has_tiers = bool(tiers) if tiers is not None else bool(self.instance and self.instance.tiers.exists())
+            if not has_tiers:
+                raise serializers.ValidationError("Tiered coupons need at least one tier.")
+        return data
+
+    def create(self, validated_data):
+        tiers_data = validated_data.pop('tiers', [])
+        coupon = super().create(validated_data)
+        CouponTier.objects.bulk_create([CouponTier(coupon=coupon, **tier) for tier in tiers_data])
+        return coupon
+
+    def update(self, instance, validated_data):
+        tiers_data = validated_data.pop('tiers', None)
+        coupon = super().update(instance, validated_data)
+
+        # Tiers are replaced as a whole when provided
+        if tiers_data is not None:
+            coupon.tiers.all().delete()
+            CouponTier.objects.bulk_create([CouponTier(coupon=coupon, **tier) for tier in tiers_data])
+        return coupon
+
 
 class CouponUsageSerializer(serializers.ModelSerializer):
     coupon_code = serializers.CharField(source='coupon.code', read_only=True)
@@ -299,6 +492,7 @@ class CouponValidationSerializer(serializers.Serializer):
     """Serializer for coupon validation requests"""
     coupon_code = serializers.CharField(max_length=50)
     order_total = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    delivery_pincode = serializers.CharField(max_length=6, required=False)
     
     def validate_coupon_code(self, value):
         return value.upper().strip()
@@ -367,7 +561,8 @@ class ProductVariantSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductVariant
         fields = ['id', 'size', 'size_display', 'color_hex', 'color_name', 'sku',
-                 'price_modifier', 'final_price', 'stock', 'is_active', 'created_at']
+                 'price_modifier', 'final_price', 'stock', 'is_active',
+                 'weight', 'length', 'breadth', 'height', 'created_at']
         read_only_fields = ['created_at']
 
     def validate_color_hex(self, value):
@@ -418,7 +613,7 @@ class RewardPointsSerializer(serializers.ModelSerializer):
 class RewardTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = RewardTransaction
-        fields = ['id', 'transaction_type', 'points', 'description', 'order', 'created_at']
+        fields = ['id', 'transaction_type', 'points', 'description', 'order', 'expires_at', 'created_at']
         read_only_fields = ['created_at']
 
 
@@ -446,7 +641,7 @@ class SpotlightSerializer(serializers.ModelSerializer):
 
 
 # Enhanced Product Serializer with variants and images
-class EnhancedProductSerializer(serializers.ModelSerializer):
+class EnhancedProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category = serializers.StringRelatedField()
     variants = ProductVariantSerializer(many=True, read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
@@ -460,16 +655,31 @@ class EnhancedProductSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'price', 'image', 'category', 
                  'stock', 'gender', 'gender_display', 'variants', 'images', 'reviews', 'average_rating', 
                  'review_count', 'created_at', 'updated_at']
+        expandable_fields = {'variants': ('variants',), 'images': ('images',), 'reviews': ('reviews',)}
+        # Columns behind computed fields, for only()
+        field_columns = {'category': ('category__name',), 'gender_display': ('gender',)}
     
     def get_average_rating(self, obj):
+        # The product views annotate approved review stats; otherwise query them
+        if hasattr(obj, 'approved_rating_avg'):
+            return round(obj.approved_rating_avg, 1) if obj.approved_review_count else 0
         reviews = obj.reviews.filter(is_approved=True)
         if reviews.exists():
             return round(sum(r.rating for r in reviews) / reviews.count(), 1)
         return 0
     
     def get_review_count(self, obj):
+        if hasattr(obj, 'approved_review_count'):
+            return obj.approved_review_count
         return obj.reviews.filter(is_approved=True).count()
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        wishlist_ids = self.context.get('wishlist_ids')
+        if wishlist_ids is not None:
+            data['in_wishlist'] = instance.id in wishlist_ids
+        return data
+
 
 class NewArrivalProductSerializer(serializers.ModelSerializer):
     """
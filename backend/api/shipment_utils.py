@@ -0,0 +1,318 @@
+# backend/api/shipment_utils.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .order_utils import OrderStateMachine
+from .models import Address, Order, Product, ProductVariant
+from .pincode_utils import lookup_pincode
+from .shiprocket_utils import PackageCalculator, RateLimiter, ShipRocketHelper, ShipRocketValidator
+
+logger = logging.getLogger(__name__)
+
+
+class BulkShipmentActions:
+    """
+    Runs admin shipment actions for many orders at once. Orders are grouped
+    into chunks sent as single ShipRocket calls (ShipRocket accepts lists of
+    shipment ids / AWBs), chunks run concurrently under the tracking rate
+    limit, and every order gets its own result entry.
+    """
+
+    # action -> (Order field sent to ShipRocket, service method name)
+    ACTIONS = {
+        'generate_pickup': ('shipment_id', 'generate_pickups'),
+        'cancel_shipment': ('awb_code', 'cancel_shipment'),
+        'generate_manifest': ('shipment_id', 'generate_manifest'),
+        'generate_label': ('shipment_id', 'generate_label'),
+    }
+
+    # action -> Order fields its handler changes; only these are written back,
+    # so columns updated by webhooks during the ShipRocket call are kept
+    WRITTEN_FIELDS = {
+        'generate_pickup': ['shipment_pickup_token'],
+        'cancel_shipment': ['status', 'shiprocket_status'],
+    }
+
+    MAX_ORDERS = 1000
+
+    ORDER_FIELDS = [
+        'id', 'status', 'shiprocket_order_id', 'awb_code', 'shipment_id',
+        'shiprocket_status', 'shipment_pickup_token', 'updated_at',
+    ]
+
+    @staticmethod
+    def run(action: str, order_ids: List[int]) -> List[Dict]:
+        """Execute `action` for the given orders and return one result per order id"""
+        from .shiprocket_service import shiprocket_service, ShipRocketAPIError
+
+        identifier_field, method_name = BulkShipmentActions.ACTIONS[action]
+        results = {}
+
+        orders = {
+            order.id: order
+            for order in Order.objects.filter(id__in=order_ids).only(*BulkShipmentActions.ORDER_FIELDS)
+        }
+        original_statuses = {order.id: order.status for order in orders.values()}
+        eligible = []
+        for order_id in order_ids:
+            order = orders.get(order_id)
+            if order is None:
+                results[order_id] = {'order_id': order_id, 'success': False, 'error': 'Order not found'}
+            elif not order.is_shipped_via_shiprocket:
+                results[order_id] = {'order_id': order_id, 'success': False,
+                                     'error': 'Order is not shipped via ShipRocket'}
+            elif not getattr(order, identifier_field):
+                results[order_id] = {'order_id': order_id, 'success': False,
+                                     'error': f'No {identifier_field} found for this order'}
+            else:
+                eligible.append(order)
+
+        chunk_size = settings.SHIPROCKET_BULK_CHUNK_SIZE
+        chunks = [eligible[i:i + chunk_size] for i in range(0, len(eligible), chunk_size)]
+        limiter = RateLimiter(settings.SHIPROCKET_TRACKING_RATE_LIMIT)
+        service_call = getattr(shiprocket_service, method_name)
+
+        def call(chunk):
+            limiter.wait()
+            try:
+                return chunk, service_call([getattr(order, identifier_field) for order in chunk]), None
+            except ShipRocketAPIError as e:
+                return chunk, None, e
+
+        # Network calls run in the pool; database writes happen below on this thread
+        handler = getattr(BulkShipmentActions, f'_handle_{action}')
+        changed_orders = []
+        with ThreadPoolExecutor(max_workers=settings.SHIPROCKET_BULK_WORKERS) as pool:
+            for chunk, api_response, error in pool.map(call, chunks):
+                if error:
+                    logger.error(f"Bulk {action} failed for orders {[order.id for order in chunk]}: {error}")
+                    for order in chunk:
+                        results[order.id] = {'order_id': order.id, 'success': False,
+                                             'error': 'ShipRocket service error'}
+                    continue
+                for order, result in handler(chunk, api_response):
+                    if result.pop('_changed', False):
+                        changed_orders.append(order)
+                    results[order.id] = {'order_id': order.id, **result}
+
+        if changed_orders:
+            now = timezone.now()
+            fields = BulkShipmentActions.WRITTEN_FIELDS[action]
+            with transaction.atomic():
+                locked = OrderStateMachine.lock_many([order.id for order in changed_orders], ['id', 'status'])
+                for order in changed_orders:
+                    order.updated_at = now
+                    if 'status' not in fields:
+                        continue
+                    # Re-check transitions against the committed status of each locked row
+                    current_status = locked[order.id].status if order.id in locked else original_statuses[order.id]
+                    wanted_status = order.status
+                    order.status = current_status
+                    if (wanted_status != original_statuses[order.id]
+                            and OrderStateMachine.can_transition(current_status, wanted_status)):
+                        order.status = wanted_status
+                    original_statuses[order.id] = current_status
+                Order.objects.bulk_update(changed_orders, fields + ['updated_at'])
+                if 'status' in fields:
+                    OrderStateMachine.record_transitions(
+                        [(order.id, original_statuses[order.id], order.status) for order in changed_orders], 'bulk'
+                    )
+
+        return [results[order_id] for order_id in order_ids]
+
+    @staticmethod
+    def _handle_generate_pickup(chunk, api_response):
+        if not api_response.get('pickup_status') and not api_response.get('status'):
+            message = api_response.get('message', 'Failed to generate pickup')
+            return [(order, {'success': False, 'error': message}) for order in chunk]
+
+        pickup_token = (api_response.get('response') or {}).get('pickup_token')
+        outcomes = []
+        for order in chunk:
+            order.shipment_pickup_token = pickup_token
+            outcomes.append((order, {'success': True, 'pickup_token': pickup_token, '_changed': True}))
+        return outcomes
+
+    @staticmethod
+    def _handle_cancel_shipment(chunk, api_response):
+        if api_response.get('status_code') != 1:
+            message = api_response.get('message', 'Failed to cancel shipment')
+            return [(order, {'success': False, 'error': message}) for order in chunk]
+
+        outcomes = []
+        for order in chunk:
+            if OrderStateMachine.can_transition(order.status, 'cancelled'):
+                order.status = 'cancelled'
+            order.shiprocket_status = 'CANCELLED'
+            outcomes.append((order, {'success': True, '_changed': True}))
+        return outcomes
+
+    @staticmethod
+    def _handle_generate_manifest(chunk, api_response):
+        manifest_url = api_response.get('manifest_url')
+        if not manifest_url:
+            message = api_response.get('message', 'Failed to generate manifest')
+            return [(order, {'success': False, 'error': message}) for order in chunk]
+        return [(order, {'success': True, 'manifest_url': manifest_url}) for order in chunk]
+
+    @staticmethod
+    def _handle_generate_label(chunk, api_response):
+        label_url = api_response.get('label_url')
+        if not api_response.get('label_created') or not label_url:
+            message = api_response.get('message', 'Failed to generate label')
+            return [(order, {'success': False, 'error': message}) for order in chunk]
+
+        not_created = {str(shipment_id) for shipment_id in api_response.get('not_created') or []}
+        return [
+            (order, {'success': False, 'error': 'Label not created'})
+            if str(order.shipment_id) in not_created
+            else (order, {'success': True, 'label_url': label_url})
+            for order in chunk
+        ]
+
+
+class CartShippingQuote:
+    """
+    Shipping quotes for a cart before an order exists. The package is
+    computed from catalog attributes, and every (pincode, payment mode)
+    pair is quoted concurrently through the cached serviceability lookup.
+    """
+
+    MAX_ITEMS = 100
+    MAX_ADDRESSES = 10
+
+    @staticmethod
+    def get_cart_rows(items: List[Dict]) -> List[Dict]:
+        """
+        PackageCalculator rows (plus unit price) for cart items given as
+        {'product': id, 'variant': id or None, 'quantity': n}. Variant items
+        are resolved with one query joined to their product, the rest with a
+        second one only when needed. Raises ValueError for unknown ids.
+        """
+        dimensions = PackageCalculator.DIMENSIONS
+        variant_ids = {item['variant'] for item in items if item.get('variant')}
+        product_ids = {item['product'] for item in items if not item.get('variant')}
+
+        variants = {}
+        if variant_ids:
+            variants = {
+                row['id']: row for row in ProductVariant.objects.filter(id__in=variant_ids, is_active=True).values(
+                    'id', 'product_id', 'price_modifier', 'product__price', *dimensions,
+                    *[f'product__{dimension}' for dimension in dimensions]
+                )
+            }
+        products = {}
+        if product_ids:
+            products = {
+                row['id']: row for row in Product.objects.filter(id__in=product_ids).values('id', 'price', *dimensions)
+            }
+
+        rows = []
+        for item in items:
+            if item.get('variant'):
+                variant = variants.get(item['variant'])
+                if not variant or variant['product_id'] != item['product']:
+                    raise ValueError(f"Variant {item['variant']} not found for product {item['product']}")
+                row = {f'variant__{dimension}': variant[dimension] for dimension in dimensions}
+                row.update({f'product__{dimension}': variant[f'product__{dimension}'] for dimension in dimensions})
+                row['unit_price'] = variant['product__price'] + variant['price_modifier']
+            else:
+                product = products.get(item['product'])
+                if not product:
+                    raise ValueError(f"Product {item['product']} not found")
+                row = {f'product__{dimension}': product[dimension] for dimension in dimensions}
+                row['unit_price'] = product['price']
+            row['quantity'] = item['quantity']
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def quote(user, items: List[Dict], address_ids: Optional[List[int]] = None) -> Dict:
+        """
+        Prepaid and COD options for each of the user's addresses (all saved
+        addresses when address_ids is None). Raises ValueError for bad items.
+        """
+        rows = CartShippingQuote.get_cart_rows(items)
+        package = PackageCalculator.calculate(rows)
+        order_value = sum((row['unit_price'] * row['quantity'] for row in rows), Decimal('0'))
+
+        addresses = Address.objects.filter(user=user)
+        if address_ids is not None:
+            addresses = addresses.filter(id__in=address_ids)
+        addresses = list(
+            addresses.order_by('-is_default', 'id')
+            .values('id', 'address_type', 'city', 'zip_postal_code')[:CartShippingQuote.MAX_ADDRESSES]
+        )
+
+        # One lookup per distinct (pincode, cod); addresses often share a pincode.
+        # Pincodes the local dataset marks unserviceable (or COD-less) are skipped.
+        lookups = set()
+        unserviceable = set()
+        for address in addresses:
+            pincode = address['zip_postal_code']
+            if not ShipRocketValidator.validate_pincode(pincode):
+                continue
+            local = lookup_pincode(pincode)
+            if local is not None and not local['serviceable']:
+                unserviceable.add(pincode)
+                continue
+            lookups.add((pincode, 0))
+            cod_allowed = local['cod_available'] if local is not None else True
+            if cod_allowed and ShipRocketHelper.is_cod_available(pincode, float(order_value)):
+                lookups.add((pincode, 1))
+
+        def lookup(key):
+            pincode, cod = key
+            try:
+                serviceability = ShipRocketHelper.get_cached_serviceability(pincode, package['weight'], cod)
+                return key, ShipRocketHelper.format_shipping_options(serviceability, cod)
+            except Exception as e:
+                logger.warning(f"Shipping quote failed for pincode {pincode} (cod={cod}): {e}")
+                return key, None
+
+        results = {}
+        if lookups:
+            with ThreadPoolExecutor(max_workers=min(len(lookups), settings.SHIPROCKET_BULK_WORKERS)) as pool:
+                results = dict(pool.map(lookup, lookups))
+
+        quotes = []
+        for address in addresses:
+            pincode = address['zip_postal_code']
+            quote = {
+                'address_id': address['id'],
+                'address_type': address['address_type'],
+                'city': address['city'],
+                'pincode': pincode,
+            }
+            if pincode in unserviceable:
+                quote.update({'serviceable': False, 'error': 'Delivery not available to this pincode'})
+            elif (pincode, 0) not in lookups:
+                quote.update({'serviceable': False, 'error': 'Invalid pincode format'})
+            elif results.get((pincode, 0)) is None:
+                quote.update({'serviceable': False, 'error': 'Unable to fetch shipping rates'})
+            else:
+                prepaid = results[(pincode, 0)]
+                cod = results.get((pincode, 1))
+                quote.update({
+                    'serviceable': bool(prepaid),
+                    'prepaid': {
+                        'shipping_options': prepaid,
+                        'recommended_option': prepaid[0] if prepaid else None,
+                    },
+                    'cod': {
+                        'shipping_options': cod,
+                        'recommended_option': cod[0] if cod else None,
+                    } if cod else None,
+                })
+            quotes.append(quote)
+
+        return {
+            'package': package,
+            'order_value': order_value,
+            'quotes': quotes,
+        }
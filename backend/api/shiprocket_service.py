@@ -2,9 +2,11 @@
 
 import requests
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+import uuid
 from django.conf import settings
-from django.core.cache import cache
+from django.core.cache import caches
 from typing import Dict, Optional, List, Tuple
 import json
 
@@ -14,38 +16,85 @@ class ShipRocketAPIError(Exception):
     """Custom exception for ShipRocket API errors"""
     pass
 
-class ShipRocketService:
+class ShipRocketTokenManager:
     """
-    Service class for interacting with ShipRocket API
-    Handles authentication, token management, and all API calls
+    ShipRocket auth token shared by every process through the shared cache.
+    Token and expiry are stored together in one entry. Logins happen under a
+    cross-process lock, so concurrent expiries or 401s lead to a single login
+    while other callers wait for its result. Tokens close to expiry are
+    refreshed in a background thread before any request sees them expire.
     """
     
-    BASE_URL = "https://apiv2.shiprocket.in/v1/external"
-    AUTH_URL = "https://apiv2.shiprocket.in/v1/external/auth/login"
-    TOKEN_CACHE_KEY = "shiprocket_auth_token"
-    TOKEN_EXPIRY_CACHE_KEY = "shiprocket_token_expiry"
+    TOKEN_CACHE_KEY = "shiprocket_auth"
+    LOCK_CACHE_KEY = "shiprocket_auth_lock"
+    LOCK_TIMEOUT = 30  # seconds; longer than a login request can take
+    WAIT_INTERVAL = 0.2
     
-    def __init__(self):
-        self.email = getattr(settings, 'SHIPROCKET_EMAIL', None)
-        self.password = getattr(settings, 'SHIPROCKET_PASSWORD', None)
-        self.session = requests.Session()
+    def __init__(self, auth_url: str, email: str, password: str):
+        self.auth_url = auth_url
+        self.email = email
+        self.password = password
+        self.cache = caches['shared'] if 'shared' in settings.CACHES else caches['default']
+        self.lifetime = getattr(settings, 'SHIPROCKET_TOKEN_LIFETIME_HOURS', 239) * 3600
+        self.refresh_before = getattr(settings, 'SHIPROCKET_TOKEN_REFRESH_BEFORE_HOURS', 24) * 3600
+        self.local_lock = threading.Lock()
+        self.background_refresh = None
+    
+    def get_token(self) -> str:
+        """Current token, logging in only if there is no valid one"""
+        entry = self.cache.get(self.TOKEN_CACHE_KEY)
+        now = time.time()
         
-        if not self.email or not self.password:
-            raise ShipRocketAPIError("ShipRocket credentials not found in settings")
+        if entry and now < entry['expires_at']:
+            if now >= entry['expires_at'] - self.refresh_before:
+                self._start_background_refresh(entry['token'])
+            return entry['token']
+        
+        return self.refresh(stale_token=entry['token'] if entry else None)
     
-    def _get_auth_token(self) -> str:
+    def refresh(self, stale_token: Optional[str] = None) -> str:
         """
-        Get authentication token from cache or request new one
-        Token is valid for 240 hours (10 days)
+        Replace stale_token with a new one. If another thread or process has
+        already replaced it, its token is returned without logging in again.
         """
-        # Check if we have a cached token
-        token = cache.get(self.TOKEN_CACHE_KEY)
-        expiry = cache.get(self.TOKEN_EXPIRY_CACHE_KEY)
+        # Threads of this process queue here; only one of them talks to the cache lock
+        with self.local_lock:
+            deadline = time.time() + self.LOCK_TIMEOUT
+            while True:
+                entry = self.cache.get(self.TOKEN_CACHE_KEY)
+                if entry and entry['token'] != stale_token and time.time() < entry['expires_at']:
+                    return entry['token']
+                
+                owner = uuid.uuid4().hex
+                if self.cache.add(self.LOCK_CACHE_KEY, owner, timeout=self.LOCK_TIMEOUT):
+                    try:
+                        return self._login()
+                    finally:
+                        if self.cache.get(self.LOCK_CACHE_KEY) == owner:
+                            self.cache.delete(self.LOCK_CACHE_KEY)
+                
+                # Another process is logging in; wait for its token
+                if time.time() >= deadline:
+                    logger.warning("Timed out waiting for ShipRocket token refresh, logging in directly")
+                    return self._login()
+                time.sleep(self.WAIT_INTERVAL)
+    
+    def _start_background_refresh(self, stale_token: str):
+        """Refresh a soon-to-expire token without blocking the caller"""
+        if self.background_refresh and self.background_refresh.is_alive():
+            return
         
-        if token and expiry and datetime.now() < expiry:
-            return token
+        def run():
+            try:
+                self.refresh(stale_token=stale_token)
+            except ShipRocketAPIError as e:
+                logger.error(f"Background ShipRocket token refresh failed: {e}")
         
-        # Request new token
+        self.background_refresh = threading.Thread(target=run, name='shiprocket-token-refresh', daemon=True)
+        self.background_refresh.start()
+    
+    def _login(self) -> str:
+        """Request a new token and store it with its expiry"""
         logger.info("Requesting new ShipRocket authentication token")
         
         payload = {
@@ -54,34 +103,61 @@ class ShipRocketService:
         }
         
         try:
-            response = requests.post(self.AUTH_URL, json=payload, timeout=30)
+            response = requests.post(self.auth_url, json=payload, timeout=30)
             response.raise_for_status()
-            
             data = response.json()
-            
-            if 'token' not in data:
-                raise ShipRocketAPIError(f"Authentication failed: {data}")
-            
-            token = data['token']
-            
-            # Cache token for 240 hours minus 1 hour for safety
-            expiry_time = datetime.now() + timedelta(hours=239)
-            cache.set(self.TOKEN_CACHE_KEY, token, timeout=239*3600)
-            cache.set(self.TOKEN_EXPIRY_CACHE_KEY, expiry_time, timeout=239*3600)
-            
-            logger.info("Successfully obtained new ShipRocket token")
-            return token
-            
         except requests.RequestException as e:
             logger.error(f"Failed to authenticate with ShipRocket: {e}")
             raise ShipRocketAPIError(f"Authentication failed: {e}")
+        
+        if 'token' not in data:
+            raise ShipRocketAPIError(f"Authentication failed: {data}")
+        
+        entry = {
+            'token': data['token'],
+            'expires_at': time.time() + self.lifetime,
+        }
+        self.cache.set(self.TOKEN_CACHE_KEY, entry, timeout=self.lifetime)
+        
+        logger.info("Successfully obtained new ShipRocket token")
+        return entry['token']
+
+
+class ShipRocketService:
+    """
+    Service class for interacting with ShipRocket API
+    Handles authentication, token management, and all API calls
+    """
+    
+    BASE_URL = "https://apiv2.shiprocket.in/v1/external"
+    AUTH_URL = "https://apiv2.shiprocket.in/v1/external/auth/login"
+    
+    def __init__(self):
+        self.email = getattr(settings, 'SHIPROCKET_EMAIL', None)
+        self.password = getattr(settings, 'SHIPROCKET_PASSWORD', None)
+        # Overridable so jobs can be pointed at a sandbox or a local fake server
+        self.base_url = getattr(settings, 'SHIPROCKET_BASE_URL', self.BASE_URL)
+        self.auth_url = getattr(settings, 'SHIPROCKET_AUTH_URL', self.AUTH_URL)
+        self.session = requests.Session()
+        
+        if not self.email or not self.password:
+            raise ShipRocketAPIError("ShipRocket credentials not found in settings")
+        
+        self.token_manager = ShipRocketTokenManager(self.auth_url, self.email, self.password)
+    
+    def _get_auth_token(self) -> str:
+        """
+        Get authentication token (shared across processes, see ShipRocketTokenManager)
+        Token is valid for 240 hours (10 days)
+        """
+        return self.token_manager.get_token()
     
     def _make_request(self, method: str, endpoint: str, data: dict = None, params: dict = None) -> dict:
         """
         Make authenticated request to ShipRocket API
         """
         token = self._get_auth_token()
-        url = f"{self.BASE_URL}/{endpoint.lstrip('/')}"
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
         
         headers = {
             'Authorization': f'Bearer {token}',
@@ -102,11 +178,9 @@ class ShipRocketService:
             
             # Handle token expiry
             if response.status_code == 401:
-                logger.warning("ShipRocket token expired, requesting new token")
-                cache.delete(self.TOKEN_CACHE_KEY)
-                cache.delete(self.TOKEN_EXPIRY_CACHE_KEY)
-                # Retry with new token
-                token = self._get_auth_token()
+                logger.warning("ShipRocket token rejected, refreshing token")
+                # Concurrent 401s for the same token share a single login
+                token = self.token_manager.refresh(stale_token=token)
                 headers['Authorization'] = f'Bearer {token}'
                 
                 if method.upper() == 'GET':
@@ -208,6 +282,54 @@ class ShipRocketService:
             logger.error(f"Failed to generate pickup for shipment {shipment_id}: {e}")
             raise
     
+    def generate_pickups(self, shipment_ids: List[str]) -> dict:
+        """
+        Generate one pickup request covering several shipments
+        """
+        data = {
+            'shipment_id': shipment_ids
+        }
+        
+        try:
+            response = self._make_request('POST', 'courier/generate/pickup', data=data)
+            logger.info(f"Bulk pickup generation response: {response}")
+            return response
+        except Exception as e:
+            logger.error(f"Failed to generate pickup for shipments {shipment_ids}: {e}")
+            raise
+    
+    def generate_manifest(self, shipment_ids: List[str]) -> dict:
+        """
+        Generate a manifest for shipments handed over in the same pickup
+        """
+        data = {
+            'shipment_id': shipment_ids
+        }
+        
+        try:
+            response = self._make_request('POST', 'manifests/generate', data=data)
+            logger.info(f"Manifest generation response: {response}")
+            return response
+        except Exception as e:
+            logger.error(f"Failed to generate manifest for shipments {shipment_ids}: {e}")
+            raise
+    
+    def generate_label(self, shipment_ids: List[str]) -> dict:
+        """
+        Generate shipping labels (a single PDF) for shipments
+        """
+        data = {
+            'shipment_id': shipment_ids
+        }
+        
+        try:
+            response = self._make_request('POST', 'courier/generate/label', data=data)
+            logger.info(f"Label generation response: {response}")
+            return response
+        except Exception as e:
+            logger.error(f"Failed to generate labels for shipments {shipment_ids}: {e}")
+            raise
+    
     def cancel_shipment(self, awb_codes: List[str]) -> dict:
         """
         Cancel shipment(s)
@@ -2,9 +2,13 @@
 
 import json
 import logging
+import threading
+import time
+from datetime import datetime
 from decimal import Decimal
 from typing import Dict, List, Optional, Tuple
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from .models import Order, Address, Product
 import re
@@ -57,39 +61,43 @@ class ShipRocketDataMapper:
         
         return parsed
     
+    @staticmethod
+    def get_shipping_info(order: Order) -> Dict[str, str]:
+        """
+        Shipping address components for an order. Uses the structured snapshot
+        taken at checkout; only legacy orders without one fall back to parsing
+        the free-text address.
+        """
+        if order.has_structured_address:
+            return {
+                'name': order.shipping_name,
+                'phone': order.shipping_phone,
+                'address': order.shipping_address_line_1,
+                'address_2': order.shipping_address_line_2,
+                'city': order.shipping_city,
+                'state': order.shipping_state,
+                'country': order.shipping_country or 'India',
+                'pin_code': order.shipping_pincode
+            }
+        return ShipRocketDataMapper.parse_shipping_address(order.shipping_address or '')
+    
     @staticmethod
     def get_order_weight(order: Order) -> float:
         """
-        Calculate total order weight based on products
-        Returns weight in kilograms
+        Chargeable order weight in kilograms (see PackageCalculator)
         """
-        total_weight = 0.0
-        default_weight = settings.SHIPROCKET_DEFAULT_DIMENSIONS['weight']
-        
-        for item in order.items.all():
-            # If product has weight, use it; otherwise use default
-            product_weight = getattr(item.product, 'weight', default_weight)
-            if not product_weight:
-                product_weight = default_weight
-            total_weight += float(product_weight) * item.quantity
-        
-        # Minimum weight of 0.1 kg
-        return max(total_weight, 0.1)
+        return PackageCalculator.get_order_package(order)['weight']
     
     @staticmethod
     def get_order_dimensions(order: Order) -> Dict[str, float]:
         """
-        Calculate order dimensions (simplified approach)
-        Returns dimensions in centimeters
+        Package dimensions in centimeters (see PackageCalculator)
         """
-        defaults = settings.SHIPROCKET_DEFAULT_DIMENSIONS
-        
-        # For simplicity, we'll use default dimensions
-        # In a real scenario, you might calculate based on product dimensions
+        package = PackageCalculator.get_order_package(order)
         return {
-            'length': defaults['length'],
-            'breadth': defaults['breadth'], 
-            'height': defaults['height']
+            'length': package['length'],
+            'breadth': package['breadth'],
+            'height': package['height']
         }
     
     @staticmethod
@@ -97,22 +105,22 @@ class ShipRocketDataMapper:
         """
         Map Django Order object to ShipRocket order format
         """
-        # Parse shipping address
-        shipping_info = ShipRocketDataMapper.parse_shipping_address(order.shipping_address)
+        # Structured address snapshot (legacy orders are parsed)
+        shipping_info = ShipRocketDataMapper.get_shipping_info(order)
         
         # Get pickup address from settings
         pickup_info = settings.SHIPROCKET_DEFAULT_PICKUP
         
-        # Calculate order weight and dimensions
-        weight = ShipRocketDataMapper.get_order_weight(order)
-        dimensions = ShipRocketDataMapper.get_order_dimensions(order)
+        # Package weight and dimensions (cached on the order)
+        package = PackageCalculator.get_order_package(order)
+        weight = package['weight']
         
         # Prepare order items
         order_items = []
-        for item in order.items.all():
+        for item in order.items.select_related('product', 'variant'):
             order_items.append({
                 'name': item.product.name,
-                'sku': getattr(item.product, 'sku', f'PROD-{item.product.id}'),
+                'sku': item.variant.sku if item.variant else f'PROD-{item.product.id}',
                 'units': item.quantity,
                 'selling_price': float(item.price),
                 'discount': '',
@@ -127,7 +135,9 @@ class ShipRocketDataMapper:
             'pickup_location': pickup_info['pickup_location'],
             'channel_id': '',
             'comment': f'Order from GroovyStreetz - Order #{order.id}',
-            'billing_customer_name': order.user.get_full_name() if order.user else 'Guest Customer',
+            'billing_customer_name': shipping_info.get('name') or (
+                order.user.get_full_name() if order.user else 'Guest Customer'
+            ),
             'billing_last_name': '',
             'billing_address': shipping_info['address'],
             'billing_address_2': shipping_info.get('address_2', ''),
@@ -136,7 +146,9 @@ class ShipRocketDataMapper:
             'billing_state': shipping_info['state'],
             'billing_country': shipping_info['country'],
             'billing_email': order.user.email if order.user else 'customer@groovystreetz.com',
-            'billing_phone': getattr(order.user, 'phone', '9999999999') if order.user else '9999999999',
+            'billing_phone': shipping_info.get('phone') or (
+                getattr(order.user, 'phone', '9999999999') if order.user else '9999999999'
+            ),
             'shipping_is_billing': True,
             'shipping_customer_name': '',
             'shipping_last_name': '',
@@ -151,9 +163,9 @@ class ShipRocketDataMapper:
             'order_items': order_items,
             'payment_method': 'Prepaid',  # Assuming prepaid orders
             'sub_total': float(order.original_price),
-            'length': dimensions['length'],
-            'breadth': dimensions['breadth'],
-            'height': dimensions['height'],
+            'length': package['length'],
+            'breadth': package['breadth'],
+            'height': package['height'],
             'weight': weight
         }
         
@@ -172,16 +184,93 @@ class ShipRocketDataMapper:
         Extract address components from Address model object
         """
         return {
-            'name': f"{address_obj.user.first_name} {address_obj.user.last_name}".strip(),
-            'phone': getattr(address_obj.user, 'phone', '9999999999'),
+            'name': address_obj.full_name,
+            'phone': address_obj.phone_number,
             'email': address_obj.user.email,
             'address': address_obj.address_line_1,
             'address_2': address_obj.address_line_2 or '',
             'city': address_obj.city,
-            'state': address_obj.state,
+            'state': address_obj.state_province,
             'country': address_obj.country,
-            'pin_code': address_obj.postal_code
+            'pin_code': address_obj.zip_postal_code
+        }
+
+
+class PackageCalculator:
+    """
+    Computes the shipment package for a set of items: actual weight,
+    stacked dimensions and volumetric weight. Variant attributes override
+    product attributes, which fall back to SHIPROCKET_DEFAULT_DIMENSIONS.
+    """
+    
+    # Columns needed from OrderItem, fetched in a single query
+    ITEM_FIELDS = (
+        'quantity',
+        'product__weight', 'product__length', 'product__breadth', 'product__height',
+        'variant__weight', 'variant__length', 'variant__breadth', 'variant__height',
+    )
+    DIMENSIONS = ('weight', 'length', 'breadth', 'height')
+    MIN_WEIGHT = 0.1
+    
+    @staticmethod
+    def resolve_unit(row: Dict) -> Dict[str, float]:
+        """Per-unit weight/dimensions for an item row from ITEM_FIELDS"""
+        defaults = settings.SHIPROCKET_DEFAULT_DIMENSIONS
+        unit = {}
+        for dimension in PackageCalculator.DIMENSIONS:
+            value = row.get(f'variant__{dimension}')
+            if value is None:
+                value = row.get(f'product__{dimension}')
+            unit[dimension] = float(value) if value else defaults[dimension]
+        return unit
+    
+    @staticmethod
+    def calculate(rows: List[Dict]) -> Dict[str, float]:
+        """
+        Package for item rows. Units are stacked: the footprint is the largest
+        unit's, heights add up. ShipRocket bills the greater of actual and
+        volumetric weight, which is returned as 'weight'.
+        """
+        defaults = settings.SHIPROCKET_DEFAULT_DIMENSIONS
+        actual_weight = 0.0
+        length = breadth = height = 0.0
+        
+        for row in rows:
+            quantity = row['quantity']
+            unit = PackageCalculator.resolve_unit(row)
+            actual_weight += unit['weight'] * quantity
+            length = max(length, unit['length'])
+            breadth = max(breadth, unit['breadth'])
+            height += unit['height'] * quantity
+        
+        if not rows:
+            length, breadth, height = defaults['length'], defaults['breadth'], defaults['height']
+        
+        divisor = getattr(settings, 'SHIPROCKET_VOLUMETRIC_DIVISOR', 5000)
+        volumetric_weight = length * breadth * height / divisor
+        return {
+            'actual_weight': round(actual_weight, 3),
+            'volumetric_weight': round(volumetric_weight, 3),
+            'weight': round(max(actual_weight, volumetric_weight, PackageCalculator.MIN_WEIGHT), 3),
+            'length': round(length, 1),
+            'breadth': round(breadth, 1),
+            'height': round(height, 1)
         }
+    
+    @staticmethod
+    def get_order_package(order: Order, refresh: bool = False) -> Dict[str, float]:
+        """
+        Package for an order, computed once from a single items query and
+        cached in order.package_details.
+        """
+        if order.package_details and not refresh:
+            return order.package_details
+        
+        rows = list(order.items.values(*PackageCalculator.ITEM_FIELDS))
+        order.package_details = PackageCalculator.calculate(rows)
+        if order.pk:
+            Order.objects.filter(pk=order.pk).update(package_details=order.package_details)
+        return order.package_details
 
 
 class ShipRocketStatusMapper:
@@ -252,11 +341,11 @@ class ShipRocketValidator:
             errors.append("Order has no items")
         
         # Check if order has shipping address
-        if not order.shipping_address:
+        if not order.shipping_address and not order.has_structured_address:
             errors.append("Order has no shipping address")
         else:
-            # Parse and validate address components
-            shipping_info = ShipRocketDataMapper.parse_shipping_address(order.shipping_address)
+            # Validate address components
+            shipping_info = ShipRocketDataMapper.get_shipping_info(order)
             
             if not shipping_info['pin_code']:
                 errors.append("Shipping address must contain a valid pincode")
@@ -345,6 +434,89 @@ class ShipRocketHelper:
     Helper functions for common ShipRocket operations
     """
     
+    SERVICEABILITY_CACHE_TIMEOUT = 6 * 3600  # Courier rates change rarely during a day
+    WEIGHT_SLAB_KG = 0.5
+    
+    @staticmethod
+    def get_cached_serviceability(delivery_pincode: str, weight: float, cod: int = 0) -> Dict:
+        """
+        Courier serviceability for the default pickup location, cached per
+        destination pincode, weight slab and COD flag.
+        Weight is rounded up to the courier slab so nearby weights share a cache entry.
+        """
+        from .shiprocket_service import shiprocket_service
+        
+        pickup_pincode = settings.SHIPROCKET_DEFAULT_PICKUP.get('pin_code')
+        slab = ShipRocketHelper.WEIGHT_SLAB_KG
+        slab_weight = max(slab, -(-float(weight) // slab) * slab)
+        cache_key = f"shiprocket_serviceability:{pickup_pincode}:{delivery_pincode}:{slab_weight}:{cod}"
+        
+        serviceability = cache.get(cache_key)
+        if serviceability is None:
+            serviceability = shiprocket_service.get_courier_serviceability(
+                pickup_postcode=pickup_pincode,
+                delivery_postcode=delivery_pincode,
+                weight=slab_weight,
+                cod=cod
+            )
+            cache.set(cache_key, serviceability, timeout=ShipRocketHelper.SERVICEABILITY_CACHE_TIMEOUT)
+        
+        return serviceability
+    
+    @staticmethod
+    def get_cached_shipping_cost(delivery_pincode: str, weight: float = None, cod: int = 0) -> Optional[Decimal]:
+        """
+        Cheapest available courier rate for a destination, from cached serviceability.
+        Returns None when the rate can't be determined (unknown pincode, API down).
+        """
+        if not ShipRocketValidator.validate_pincode(delivery_pincode):
+            return None
+        if weight is None:
+            weight = settings.SHIPROCKET_DEFAULT_DIMENSIONS['weight']
+        
+        try:
+            serviceability = ShipRocketHelper.get_cached_serviceability(delivery_pincode, weight, cod)
+        except Exception as e:
+            logger.warning(f"Could not determine shipping cost for pincode {delivery_pincode}: {e}")
+            return None
+        
+        if serviceability.get('status') != 200:
+            return None
+        
+        couriers = serviceability.get('data', {}).get('available_courier_companies', [])
+        rates = [courier.get('rate') for courier in couriers if courier.get('rate') is not None]
+        if not rates:
+            return None
+        return Decimal(str(min(rates)))
+    
+    @staticmethod
+    def format_shipping_options(serviceability: Dict, cod: int = 0) -> Optional[List[Dict]]:
+        """
+        Courier options from a serviceability response, cheapest first.
+        Returns None if the response is not a successful one.
+        """
+        if serviceability.get('status') != 200:
+            return None
+        
+        shipping_options = []
+        for courier in serviceability.get('data', {}).get('available_courier_companies', []):
+            shipping_options.append({
+                'courier_company_id': courier.get('courier_company_id'),
+                'courier_name': courier.get('courier_name'),
+                'freight_charge': courier.get('freight_charge', 0),
+                'cod_charge': courier.get('cod_charges', 0) if cod else 0,
+                'total_charge': courier.get('rate', 0),
+                'expected_delivery_days': courier.get('etd'),
+                'is_cod_available': courier.get('cod') == 1,
+                'is_surface': courier.get('is_surface', False),
+                'pickup_performance': courier.get('pickup_performance', 0),
+                'delivery_performance': courier.get('delivery_performance', 0)
+            })
+        
+        # Sort by total charge (cheapest first)
+        shipping_options.sort(key=lambda x: x['total_charge'])
+        return shipping_options
+    
     @staticmethod
     def calculate_shipping_discount(original_shipping: float, applied_shipping: float) -> float:
         """
@@ -393,11 +565,37 @@ class ShipRocketHelper:
             'expected_delivery': webhook_data.get('etd'),
             'courier_company': webhook_data.get('courier_company_name'),
             'courier_id': webhook_data.get('courier_company_id'),
+            'event_timestamp': webhook_data.get('current_timestamp'),
             'tracking_data': webhook_data.get('scans', [])
         }
         
         return {k: v for k, v in parsed.items() if v is not None}
     
+    @staticmethod
+    def parse_datetime(value) -> Optional[datetime]:
+        """
+        Parse a ShipRocket date string (ISO 8601 or "DD MM YYYY HH:MM:SS")
+        into an aware datetime. Returns None if it can't be parsed.
+        """
+        if not value:
+            return None
+        
+        value = str(value).strip()
+        parsed = None
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            for fmt in ('%d %m %Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d-%m-%Y %H:%M:%S'):
+                try:
+                    parsed = datetime.strptime(value, fmt)
+                    break
+                except ValueError:
+                    continue
+        
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+    
     @staticmethod
     def get_business_days_from_now(days: int) -> timezone.datetime:
         """
@@ -412,4 +610,27 @@ class ShipRocketHelper:
             if current.weekday() < 5:
                 business_days_added += 1
         
-        return current
\ No newline at end of file
+        return current
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls evenly at `rate` per second,
+    shared by the worker threads of bulk ShipRocket jobs.
+    """
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        """Block until the caller may make its next request"""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -1,3 +1,193 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .archive_utils import archive_reward_transactions_batch
+from .coupon_utils import CouponCalculator
+from .models import (
+    Category, Coupon, CouponTier, CustomUser, Order, OrderItem, Product, ProductVariant, RewardPoints,
+    RewardTransaction,
+)
+from .reward_utils import (
+    InsufficientPointsError, accrue_order_points_batch, award_points, expire_points_batch, get_balance,
+    reconcile_batch, redeem_points,
+)
+
+
+class AdminOrderListQueryCountTests(APITestCase):
+    """The admin order list runs the same number of queries whatever the page size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            username='admin', email='admin@example.com', password='admin123', role='admin'
+        )
+        customer = CustomUser.objects.create_user(
+            username='customer', email='customer@example.com', password='test123'
+        )
+        category = Category.objects.create(name='T-Shirts', slug='t-shirts')
+        now = timezone.now()
+        coupon = Coupon.objects.create(
+            code='SAVE10', name='Save 10', discount_type='percentage', discount_value=Decimal('10.00'),
+            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=30),
+        )
+
+        for n in range(10):
+            product = Product.objects.create(category=category, name=f'Tee {n}', price=Decimal('499.00'), stock=10)
+            variant = ProductVariant.objects.create(product=product, size='M', sku=f'TEE-{n}-M', stock=10)
+            order = Order.objects.create(
+                user=customer, total_price=Decimal('998.00'), shipping_address='Test address',
+                applied_coupon=coupon if n % 2 else None,
+            )
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=Decimal('499.00'))
+            OrderItem.objects.create(order=order, product=product, variant=variant, quantity=1,
+                                     price=Decimal('499.00'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_query_count_is_constant_per_page(self):
+        with CaptureQueriesContext(connection) as small_page:
+            small = self.client.get('/api/admin/orders/', {'page_size': 2})
+        self.assertEqual(small.status_code, 200)
+        self.assertEqual(len(small.data['results']), 2)
+
+        with self.assertNumQueries(len(small_page.captured_queries)):
+            large = self.client.get('/api/admin/orders/', {'page_size': 8})
+        self.assertEqual(len(large.data['results']), 8)
+
+    def test_impossible_date_is_rejected(self):
+        result = self.client.get('/api/admin/orders/', {'date_from': '2024-02-30'})
+        self.assertEqual(result.status_code, 400)
+
+
+class CouponCalculatorTests(TestCase):
+    """Discounts and per-item allocations of the single-pass coupon engine"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Hoodies', slug='hoodies')
+        cls.products = [
+            Product.objects.create(category=category, name=f'Hoodie {n}', price=Decimal('100.00'), stock=10)
+            for n in range(3)
+        ]
+
+    def make_coupon(self, discount_type, discount_value, **kwargs):
+        now = timezone.now()
+        return Coupon.objects.create(
+            code=f'{discount_type.upper()}-{Coupon.objects.count()}', name=discount_type,
+            discount_type=discount_type, discount_value=Decimal(discount_value),
+            valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=30), **kwargs
+        )
+
+    def make_items(self, *lines):
+        return [
+            {'product': product, 'quantity': quantity, 'price': Decimal(price)}
+            for product, (quantity, price) in zip(self.products, lines)
+        ]
+
+    def test_buy_x_get_y_discounts_cheapest_units_across_lines(self):
+        coupon = self.make_coupon('buy_x_get_y', '100', buy_quantity=2, get_quantity=1)
+        items = self.make_items((2, '100.00'), (1, '40.00'), (3, '70.00'))
+
+        result = CouponCalculator.calculate(coupon, Decimal('450.00'), items)
+
+        # 6 units earn 2 free: the 40.00 unit, then one 70.00 unit
+        self.assertEqual(result['discount_amount'], Decimal('110.00'))
+        self.assertEqual(result['allocations'], [Decimal('0'), Decimal('40.00'), Decimal('70.00')])
+        self.assertEqual(result['final_total'], Decimal('340.00'))
+
+    def test_tiered_uses_highest_matching_tier(self):
+        coupon = self.make_coupon('tiered', '0')
+        CouponTier.objects.bulk_create([
+            CouponTier(coupon=coupon, minimum_order_value=Decimal('500'), discount_value=Decimal('5')),
+            CouponTier(coupon=coupon, minimum_order_value=Decimal('1000'), discount_value=Decimal('10')),
+            CouponTier(coupon=coupon, minimum_order_value=Decimal('2000'), discount_type='fixed',
+                       discount_value=Decimal('300')),
+        ])
+        items = self.make_items((1, '1000.00'), (1, '500.00'))
+
+        result = CouponCalculator.calculate(coupon, Decimal('1500.00'), items)
+
+        self.assertEqual(result['discount_amount'], Decimal('150.00'))
+        self.assertEqual(sum(result['allocations']), result['discount_amount'])
+
+    def test_free_shipping_is_capped_by_discount_value(self):
+        coupon = self.make_coupon('free_shipping', '50')
+
+        capped = CouponCalculator.calculate(coupon, Decimal('500.00'), shipping_cost=Decimal('80.00'))
+        self.assertEqual(capped['discount_amount'], Decimal('50.00'))
+        self.assertEqual(capped['shipping_discount'], Decimal('50.00'))
+
+        under_cap = CouponCalculator.calculate(coupon, Decimal('500.00'), shipping_cost=Decimal('30.00'))
+        self.assertEqual(under_cap['discount_amount'], Decimal('30.00'))
+        self.assertEqual(under_cap['final_total'], Decimal('470.00'))
+
+    def test_allocations_sum_exactly_to_discount(self):
+        coupon = self.make_coupon('percentage', '15')
+        items = self.make_items((1, '10.01'), (3, '20.03'), (1, '30.07'))
+
+        result = CouponCalculator.calculate(coupon, Decimal('100.17'), items)
+
+        self.assertEqual(result['discount_amount'], Decimal('15.03'))
+        self.assertEqual(sum(result['allocations']), result['discount_amount'])
+        # Shares are rounded to the cent; the last line absorbs the remainder
+        self.assertEqual(result['allocations'][:2], [Decimal('1.50'), Decimal('9.02')])
+        self.assertEqual(result['allocations'][2], Decimal('4.51'))
+
+
+@override_settings(REWARD_POINTS_PER_100=10)
+class RewardLedgerTests(TestCase):
+    """Balances stay equal to the ledger through redemptions, accruals, expiry and archival"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='buyer', email='buyer@example.com', password='test123')
+        cls.other = CustomUser.objects.create_user(username='other', email='other@example.com', password='test123')
+
+    def test_redeeming_more_than_balance_is_refused(self):
+        award_points(self.user, 100, 'Welcome bonus', transaction_type='bonus')
+
+        with self.assertRaises(InsufficientPointsError):
+            redeem_points(self.user, 150, 'Too much')
+
+        self.assertEqual(get_balance(self.user), 100)
+        self.assertFalse(RewardTransaction.objects.filter(user=self.user, transaction_type='redeem').exists())
+        self.assertEqual(redeem_points(self.user, 100, 'Everything'), 0)
+
+    def test_order_earns_points_once(self):
+        order = Order.objects.create(user=self.user, total_price=Decimal('500.00'), shipping_address='Test address')
+
+        self.assertEqual(accrue_order_points_batch([(order.id, self.user.id, order.total_price)]), {self.user.id: 50})
+        with self.assertRaises(IntegrityError):
+            accrue_order_points_batch([(order.id, self.user.id, order.total_price)])
+
+        self.assertEqual(get_balance(self.user), 50)
+        self.assertEqual(RewardTransaction.objects.filter(order=order, transaction_type='earn').count(), 1)
+
+    def test_reconcile_after_expiry_and_archival(self):
+        now = timezone.now()
+        award_points(self.user, 100, 'Old bonus', transaction_type='bonus', expires_at=now - timedelta(days=1))
+        redeem_points(self.user, 30, 'Redeemed')
+        award_points(self.other, 40, 'Bonus', transaction_type='bonus')
+
+        self.assertEqual(reconcile_batch([self.user.id, self.other.id], snapshot=True), [])
+        # Each user's watermark is their own newest entry
+        for user in (self.user, self.other):
+            newest = RewardTransaction.objects.filter(user=user).order_by('-id').values_list('id', flat=True)[0]
+            self.assertEqual(RewardPoints.objects.get(user=user).snapshot_watermark, newest)
+
+        self.assertEqual(expire_points_batch([self.user.id], now=now), {self.user.id: 70})
+        self.assertEqual(archive_reward_transactions_batch([self.user.id], now + timedelta(days=1), now=now), 2)
+        award_points(self.other, 10, 'Later bonus', transaction_type='bonus')
+
+        self.assertEqual(RewardPoints.objects.get(user=self.user).archived_points, 70)
+        self.assertEqual(reconcile_batch([self.user.id, self.other.id]), [])
+        self.assertEqual(expire_points_batch([self.user.id], now=now), {})
+        self.assertEqual(get_balance(self.user), 0)
+        self.assertEqual(get_balance(self.other), 50)
@@ -0,0 +1,213 @@
+# backend/api/tracking_utils.py
+
+import hashlib
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .order_utils import OrderStateMachine
+from .models import Order, ShipmentEvent
+from .shiprocket_utils import ShipRocketHelper
+
+logger = logging.getLogger(__name__)
+
+# Shipments in these states don't change any more, so their snapshot never expires
+FINAL_TRACKING_STATUSES = {'DELIVERED', 'CANCELLED', 'RTO', 'LOST', 'DAMAGED'}
+
+
+def get_tracking_ttl(shiprocket_status):
+    """How long a snapshot in this status stays fresh (None = never refresh)"""
+    if shiprocket_status in FINAL_TRACKING_STATUSES:
+        return None
+    ttls = getattr(settings, 'SHIPMENT_TRACKING_TTL', {})
+    return timedelta(seconds=ttls.get(shiprocket_status, ttls.get('default', 1800)))
+
+
+def is_tracking_stale(order, now=None):
+    """True if the order's tracking snapshot should be refreshed from ShipRocket"""
+    if not order.awb_code:
+        return False
+    if order.tracking_synced_at is None:
+        return True
+    ttl = get_tracking_ttl(order.shiprocket_status)
+    if ttl is None:
+        return False
+    return (now or timezone.now()) - order.tracking_synced_at >= ttl
+
+
+def stale_tracking_filter(now=None):
+    """
+    Q matching in-flight orders whose snapshot has outlived its status TTL,
+    the database-side equivalent of is_tracking_stale().
+    """
+    now = now or timezone.now()
+    ttls = getattr(settings, 'SHIPMENT_TRACKING_TTL', {})
+    listed = [key for key in ttls if key != 'default']
+
+    stale = Q(tracking_synced_at__isnull=True)
+    for shiprocket_status in listed:
+        stale |= Q(shiprocket_status=shiprocket_status,
+                   tracking_synced_at__lte=now - get_tracking_ttl(shiprocket_status))
+    stale |= (
+        ~Q(shiprocket_status__in=listed) &
+        Q(tracking_synced_at__lte=now - timedelta(seconds=ttls.get('default', 1800)))
+    )
+    return Q(awb_code__isnull=False) & ~Q(shiprocket_status__in=FINAL_TRACKING_STATUSES) & stale
+
+
+def build_shipment_events(order_id, awb_code, scans, source):
+    """Unsaved ShipmentEvent rows for a list of ShipRocket scans"""
+    events = []
+    for scan in scans or []:
+        raw_date = scan.get('date') or ''
+        scan_status = scan.get('status') or ''
+        activity = scan.get('activity') or scan.get('status_body') or ''
+        dedup_key = hashlib.sha256(
+            f"{awb_code}|{raw_date}|{scan_status}|{activity}".encode()
+        ).hexdigest()
+        events.append(ShipmentEvent(
+            order_id=order_id,
+            awb_code=awb_code,
+            status=scan_status[:100],
+            activity=activity,
+            location=(scan.get('location') or '')[:255],
+            event_time=ShipRocketHelper.parse_datetime(raw_date),
+            source=source,
+            dedup_key=dedup_key,
+        ))
+    return events
+
+
+def save_shipment_events(events):
+    """Insert scan rows, skipping ones already stored"""
+    if events:
+        ShipmentEvent.objects.bulk_create(events, ignore_conflicts=True)
+
+
+def build_tracking_summary(tracking_info):
+    """Snapshot fields that have no column on Order"""
+    return {
+        'current_status_display': tracking_info.get('current_status_body'),
+        'pickup_date': tracking_info.get('pickup_date'),
+        'origin': tracking_info.get('pickup_location'),
+        'destination': tracking_info.get('delivery_location'),
+    }
+
+
+def apply_tracking_info(order, tracking_info, source='poll', now=None):
+    """
+    Apply a ShipRocket tracking payload to an order in memory and collect its
+    scans. Returns (changed_fields, events); the caller saves both, which lets
+    batch jobs write many orders with bulk_update.
+    """
+    from .webhook_processor import ShipRocketWebhookProcessor
+
+    parsed_data = ShipRocketHelper.parse_shiprocket_webhook(tracking_info)
+    changed = ShipRocketWebhookProcessor.apply_event(order, parsed_data)
+
+    summary = {**order.tracking_summary, **{
+        key: value for key, value in build_tracking_summary(tracking_info).items() if value
+    }}
+    if summary != order.tracking_summary:
+        order.tracking_summary = summary
+        changed.add('tracking_summary')
+
+    order.tracking_synced_at = now or timezone.now()
+    changed.add('tracking_synced_at')
+
+    events = build_shipment_events(order.id, order.awb_code, parsed_data.get('tracking_data'), source)
+    return changed, events
+
+
+def fetch_tracking_info(awb_code):
+    """
+    Live tracking payload from ShipRocket, or None if ShipRocket has nothing
+    for this AWB. Raises ShipRocketAPIError on service errors.
+    """
+    from .shiprocket_service import shiprocket_service
+
+    tracking_response = shiprocket_service.track_awb(awb_code)
+    if tracking_response.get('status') == 200:
+        return tracking_response.get('data') or None
+    return None
+
+
+def mark_tracking_checked(order_ids, now=None):
+    """
+    Stamp tracking_synced_at without touching the snapshot, so a lookup that
+    came back empty or failed isn't retried until the status TTL passes.
+    """
+    now = now or timezone.now()
+    Order.objects.filter(id__in=order_ids).update(tracking_synced_at=now)
+    return now
+
+
+def refresh_order_tracking(order):
+    """
+    Pull tracking from ShipRocket and persist the snapshot and new scans.
+    Returns True if the order was refreshed.
+    """
+    from .shiprocket_service import ShipRocketAPIError
+
+    try:
+        tracking_info = fetch_tracking_info(order.awb_code)
+    except ShipRocketAPIError as e:
+        logger.warning(f"Could not refresh tracking for order {order.id}: {e}")
+        tracking_info = None
+
+    if not tracking_info:
+        order.tracking_synced_at = mark_tracking_checked([order.id])
+        return False
+
+    with transaction.atomic():
+        OrderStateMachine.lock(order)
+        previous_status = order.status
+        changed, events = apply_tracking_info(order, tracking_info)
+        order.save(update_fields=sorted(changed) + ['updated_at'])
+        save_shipment_events(events)
+        OrderStateMachine.record_transitions([(order.id, previous_status, order.status)], 'tracking')
+    return True
+
+
+def get_tracking_history(order):
+    """Stored scans for an order, newest first"""
+    return [
+        {
+            'date': event['event_time'],
+            'status': event['status'],
+            'activity': event['activity'],
+            'location': event['location'],
+        }
+        for event in order.shipment_events.values('event_time', 'status', 'activity', 'location')
+    ]
+
+
+def get_order_tracking(order, refresh=True):
+    """
+    Tracking data for an order from the local snapshot, refreshing it first
+    when it is older than its status TTL.
+    """
+    if refresh and is_tracking_stale(order):
+        refresh_order_tracking(order)
+
+    summary = order.tracking_summary or {}
+    return {
+        'awb_code': order.awb_code,
+        'current_status': order.shiprocket_status,
+        'current_status_display': summary.get('current_status_display') or order.get_shiprocket_status_display(),
+        'courier_company': order.courier_company_name,
+        'pickup_date': summary.get('pickup_date') or order.shipped_date,
+        'delivery_date': order.delivered_date,
+        'expected_delivery': order.estimated_delivery_date,
+        'origin': summary.get('origin'),
+        'destination': summary.get('destination'),
+        'last_synced_at': order.tracking_synced_at,
+        'tracking_history': get_tracking_history(order),
+    }
+
+
+def get_order_by_awb(awb_code):
+    """Order for an AWB code (served by the partial awb_code index), or None"""
+    return Order.objects.filter(awb_code=awb_code).order_by('-id').first()
@@ -6,14 +6,16 @@ from .views import (
     RegisterView, LoginView, LogoutView, UserProfileEditView,
     CategoryListView, CategoryDetailView, ProductListView, ProductDetailView,
     DesignListCreateView, OrderCreateView,
-    OrderListView, OrderDetailView, OrderStatusUpdateView, AddressViewSet,
+    OrderListView, OrderDetailView, OrderStatusUpdateView, AdminBulkOrderStatusView, AddressViewSet,
     WishlistView, WishlistAddView, WishlistRemoveView,
     WishlistToggleView, WishlistClearView, WishlistStatsView, WishlistCheckView,
+    WishlistBulkCheckView,
     AdminUserListView, AdminUserDetailView, AdminOrderListView,
+    AdminOrderExportView, AdminUserExportView, AdminCouponUsageExportView,
     AdminSalesReportView, AdminCategoryViewSet, AdminProductViewSet,
     # ShipRocket views
-    ShippingRateCalculationView, PincodeServiceabilityView, ShipmentTrackingView,
-    PublicTrackingView, AdminShipmentManagementView,
+    ShippingRateCalculationView, CartShippingQuoteView, PincodeServiceabilityView, ShipmentTrackingView,
+    PublicTrackingView, AdminShipmentManagementView, AdminBulkShipmentView,
     # Coupon views
     CouponValidationView, ApplyCouponView, AdminCouponViewSet,
     AdminCouponUsageView, AdminCouponStatsView,
@@ -79,14 +81,17 @@ urlpatterns = [
     path('wishlist/toggle/<int:product_id>/', WishlistToggleView.as_view(), name='wishlist-toggle'),
     path('wishlist/clear/', WishlistClearView.as_view(), name='wishlist-clear'),
     path('wishlist/stats/', WishlistStatsView.as_view(), name='wishlist-stats'),
+    path('wishlist/check/', WishlistBulkCheckView.as_view(), name='wishlist-bulk-check'),
     path('wishlist/check/<int:product_id>/', WishlistCheckView.as_view(), name='wishlist-check'),
 
     # ShipRocket endpoints
     path('shipping/calculate-rates/', ShippingRateCalculationView.as_view(), name='shipping-calculate-rates'),
+    path('shipping/quote/', CartShippingQuoteView.as_view(), name='shipping-cart-quote'),
     path('shipping/pincode/<str:pincode>/', PincodeServiceabilityView.as_view(), name='pincode-serviceability'),
     path('orders/<int:order_id>/tracking/', ShipmentTrackingView.as_view(), name='shipment-tracking'),
     path('tracking/<str:awb_code>/', PublicTrackingView.as_view(), name='public-tracking'),
     path('admin/orders/<int:order_id>/shipment/', AdminShipmentManagementView.as_view(), name='admin-shipment-management'),
+    path('admin/orders/shipments/bulk/', AdminBulkShipmentView.as_view(), name='admin-bulk-shipment'),
 
     # ShipRocket Webhooks
     path('webhooks/shiprocket/', ShipRocketWebhookView.as_view(), name='shiprocket-webhook'),
@@ -122,12 +127,16 @@ urlpatterns = [
 
     # Admin endpoints
     path('admin/users/', AdminUserListView.as_view(), name='admin-user-list'),
+    path('admin/users/export/', AdminUserExportView.as_view(), name='admin-user-export'),
     path('admin/users/<int:pk>/', AdminUserDetailView.as_view(), name='admin-user-detail'),
     path('admin/users/<int:user_id>/contact/', AdminUserContactUpdateView.as_view(), name='admin-user-contact-update'),
     path('admin/orders/', AdminOrderListView.as_view(), name='admin-order-list'),
+    path('admin/orders/export/', AdminOrderExportView.as_view(), name='admin-order-export'),
     path('admin/orders/<int:order_id>/status/', OrderStatusUpdateView.as_view(), name='admin-order-status-update'),
+    path('admin/orders/status/bulk/', AdminBulkOrderStatusView.as_view(), name='admin-order-status-bulk'),
     path('admin/sales-report/', AdminSalesReportView.as_view(), name='admin-sales-report'),
     path('admin/coupon-usage/', AdminCouponUsageView.as_view(), name='admin-coupon-usage-list'),
+    path('admin/coupon-usage/export/', AdminCouponUsageExportView.as_view(), name='admin-coupon-usage-export'),
     path('admin/coupon-usage/<int:coupon_id>/', AdminCouponUsageView.as_view(), name='admin-coupon-usage'),
     path('admin/coupon-stats/', AdminCouponStatsView.as_view(), name='admin-coupon-stats'),
     path('admin/contacts/<int:message_id>/resolve/', ContactMessageResolveView.as_view(), name='admin-contact-resolve'),
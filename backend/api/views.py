@@ -3,7 +3,7 @@
 from django.contrib.auth import login, logout, get_user_model
 from rest_framework import generics, views, response, status, permissions, viewsets, serializers
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 from .serializers import (
     RegisterSerializer, LoginSerializer, CustomUserDetailsSerializer,
     CategorySerializer, ProductSerializer, OrderSerializer, DesignSerializer,
@@ -15,7 +15,7 @@ from .serializers import (
     ReviewSerializer, AdminReviewSerializer, RewardPointsSerializer, RewardTransactionSerializer,
     BannerSerializer, SpotlightSerializer, EnhancedProductSerializer, NewArrivalProductSerializer, EnhancedAddressSerializer,
     PermissionSerializer, RoleSerializer, AdminRoleSerializer, UserRoleSerializer,
-    UserRoleAssignmentSerializer, EnhancedUserSerializer
+    UserRoleAssignmentSerializer, EnhancedUserSerializer, OrderSummarySerializer
 )
 from .models import (
     Category, Product, Design, Order, Address, Wishlist, Coupon, CouponUsage,
@@ -23,6 +23,11 @@ from .models import (
     RewardPoints, RewardTransaction, Banner, Spotlight, Permission, Role, UserRole
 )
 from .permissions import IsAdminUser, IsSuperAdminUser, IsAdminOrSuperAdmin
+from .pagination import AdminListPagination, OrderHistoryPagination
+from .fieldset_utils import get_column_fields, get_expansion, includes_field, parse_field_list
+from .export_utils import (
+    EXPORT_FORMATS, ORDER_EXPORT_COLUMNS, USER_EXPORT_COLUMNS, COUPON_USAGE_EXPORT_COLUMNS, stream_export
+)
 import requests
 from django.conf import settings
 from django.utils.decorators import method_decorator
@@ -131,6 +136,42 @@ class UserProfileEditView(views.APIView):
 # E-COMMERCE VIEWS
 # ==============================================================================
 
+class SparseFieldsViewMixin:
+    """
+    ?fields=a,b returns only those fields (plus id) and ?expand=x,y only
+    those embedded groups (the serializer's Meta.expandable_fields).
+    get_queryset uses includes_field() and get_only_fields() to skip the
+    columns, joins and prefetches the response won't show.
+    """
+
+    def get_requested_fields(self):
+        return parse_field_list(self.request.query_params.get('fields'))
+
+    def get_requested_expansions(self):
+        return parse_field_list(self.request.query_params.get('expand'))
+
+    def includes_field(self, name):
+        return includes_field(
+            name, get_expansion(self.get_serializer_class(), name),
+            self.get_requested_fields(), self.get_requested_expansions()
+        )
+
+    def get_only_fields(self):
+        """Columns for only() when ?fields= is given, otherwise None"""
+        if self.get_requested_fields() is None:
+            return None
+        serializer_class = self.get_serializer_class()
+        return get_column_fields(
+            serializer_class, [name for name in serializer_class.Meta.fields if self.includes_field(name)]
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['requested_fields'] = self.get_requested_fields()
+        context['requested_expansions'] = self.get_requested_expansions()
+        return context
+
+
 class CategoryListView(generics.ListAPIView):
     """
     Read-only endpoint for all categories.
@@ -138,6 +179,7 @@ class CategoryListView(generics.ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
 
 
 class CategoryDetailView(generics.RetrieveAPIView):
@@ -147,15 +189,17 @@ class CategoryDetailView(generics.RetrieveAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
 
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(SparseFieldsViewMixin, generics.ListAPIView):
     """
     Read-only endpoint for products.
-    Can be filtered by category slug.
+    Can be filtered by category slug; ?fields= selects card fields.
     """
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
 
     def get_queryset(self):
         queryset = Product.objects.all()
@@ -169,14 +213,29 @@ class ProductListView(generics.ListAPIView):
             queryset = queryset.filter(gender=gender)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        from .product_card_utils import PRODUCT_CARD_FIELDS, build_product_cards
+
+        # Same output as ProductSerializer, built from one values_list() query
+        fields = [name for name in PRODUCT_CARD_FIELDS if self.includes_field(name)]
+        queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+        return response.Response(build_product_cards(queryset, fields, request=request))
 
-class ProductDetailView(generics.RetrieveAPIView):
+
+class ProductDetailView(SparseFieldsViewMixin, generics.RetrieveAPIView):
     """
     Read-only endpoint for a single product.
     """
-    queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
+
+    def get_queryset(self):
+        queryset = Product.objects.all()
+        if self.includes_field('category'):
+            queryset = queryset.select_related('category')
+        only = self.get_only_fields()
+        return queryset.only(*only) if only else queryset
 
 
 class DesignListCreateView(generics.ListCreateAPIView):
@@ -303,7 +362,7 @@ class ShippingRateCalculationView(views.APIView):
     
     def post(self, request):
         from .shiprocket_service import shiprocket_service, ShipRocketAPIError
-        from .shiprocket_utils import ShipRocketValidator
+        from .shiprocket_utils import ShipRocketHelper, ShipRocketValidator
         from django.conf import settings
         import logging
         
@@ -349,30 +408,8 @@ class ShippingRateCalculationView(views.APIView):
                 cod=cod
             )
             
-            if serviceability_response.get('status') == 200:
-                courier_data = serviceability_response.get('data', {})
-                available_couriers = courier_data.get('available_courier_companies', [])
-                
-                # Format response
-                shipping_options = []
-                for courier in available_couriers:
-                    shipping_option = {
-                        'courier_company_id': courier.get('courier_company_id'),
-                        'courier_name': courier.get('courier_name'),
-                        'freight_charge': courier.get('freight_charge', 0),
-                        'cod_charge': courier.get('cod_charges', 0) if cod else 0,
-                        'total_charge': courier.get('rate', 0),
-                        'expected_delivery_days': courier.get('etd'),
-                        'is_cod_available': courier.get('cod') == 1,
-                        'is_surface': courier.get('is_surface', False),
-                        'pickup_performance': courier.get('pickup_performance', 0),
-                        'delivery_performance': courier.get('delivery_performance', 0)
-                    }
-                    shipping_options.append(shipping_option)
-                
-                # Sort by total charge (cheapest first)
-                shipping_options.sort(key=lambda x: x['total_charge'])
-                
+            shipping_options = ShipRocketHelper.format_shipping_options(serviceability_response, cod)
+            if shipping_options is not None:
                 return response.Response({
                     'success': True,
                     'delivery_pincode': delivery_pincode,
@@ -403,6 +440,85 @@ class ShippingRateCalculationView(views.APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class CartShippingQuoteView(views.APIView):
+    """
+    Shipping quotes for the current cart, for one or all of the user's saved
+    addresses (checkout address picker). Weight comes from the catalog.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        from .shipment_utils import CartShippingQuote
+        from django.conf import settings
+        import logging
+        
+        logger = logging.getLogger(__name__)
+        
+        if not getattr(settings, 'SHIPROCKET_ENABLED', True):
+            return response.Response({
+                'error': 'Shipping rate calculation is currently unavailable'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        raw_items = request.data.get('items')
+        if not isinstance(raw_items, list) or not raw_items:
+            return response.Response({
+                'error': 'items must be a non-empty list'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(raw_items) > CartShippingQuote.MAX_ITEMS:
+            return response.Response({
+                'error': f'At most {CartShippingQuote.MAX_ITEMS} items per quote'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            items = [{
+                'product': int(item['product']),
+                'variant': int(item['variant']) if item.get('variant') else None,
+                'quantity': int(item.get('quantity', 1)),
+            } for item in raw_items]
+        except (KeyError, TypeError, ValueError):
+            return response.Response({
+                'error': 'Each item needs a product id, optional variant id and quantity'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if any(item['quantity'] < 1 for item in items):
+            return response.Response({
+                'error': 'Quantity must be at least 1'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # address_id, address_ids, or neither for every saved address
+        address_ids = request.data.get('address_ids')
+        if request.data.get('address_id'):
+            address_ids = [request.data.get('address_id')]
+        if address_ids is not None:
+            try:
+                address_ids = [int(address_id) for address_id in address_ids]
+            except (TypeError, ValueError):
+                return response.Response({
+                    'error': 'address_ids must be a list of integers'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            quote = CartShippingQuote.quote(request.user, items, address_ids)
+        except ValueError as e:
+            return response.Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Unexpected error during cart shipping quote: {e}")
+            return response.Response({
+                'error': 'An error occurred while calculating shipping rates'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if address_ids is not None and not quote['quotes']:
+            return response.Response({
+                'error': 'Address not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return response.Response({
+            'success': True,
+            **quote
+        }, status=status.HTTP_200_OK)
+
+
 class PincodeServiceabilityView(views.APIView):
     """
     Check if delivery is available to a specific pincode
@@ -412,6 +528,7 @@ class PincodeServiceabilityView(views.APIView):
     def get(self, request, pincode):
         from .shiprocket_service import shiprocket_service, ShipRocketAPIError
         from .shiprocket_utils import ShipRocketValidator
+        from .pincode_utils import lookup_pincode
         from django.conf import settings
         import logging
         
@@ -424,6 +541,11 @@ class PincodeServiceabilityView(views.APIView):
                 'error': 'Invalid pincode format'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        # Answer from the local pincode dataset when it knows the pincode
+        local_result = lookup_pincode(pincode)
+        if local_result is not None:
+            return response.Response({**local_result, 'source': 'local'}, status=status.HTTP_200_OK)
+        
         # Check if ShipRocket is enabled
         if not getattr(settings, 'SHIPROCKET_ENABLED', True):
             return response.Response({
@@ -459,7 +581,8 @@ class PincodeServiceabilityView(views.APIView):
                     'pincode': pincode,
                     'available_couriers_count': len(available_couriers),
                     'cod_available': any(courier.get('cod') == 1 for courier in available_couriers),
-                    'fastest_delivery_days': min((courier.get('etd', 999) for courier in available_couriers), default=None)
+                    'fastest_delivery_days': min((courier.get('etd', 999) for courier in available_couriers), default=None),
+                    'source': 'live'
                 }, status=status.HTTP_200_OK)
             
             else:
@@ -491,7 +614,7 @@ class ShipmentTrackingView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request, order_id):
-        from .shiprocket_service import shiprocket_service, ShipRocketAPIError
+        from .tracking_utils import get_order_tracking
         import logging
         
         logger = logging.getLogger(__name__)
@@ -511,6 +634,9 @@ class ShipmentTrackingView(views.APIView):
                     'error': 'This order cannot be tracked yet'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            # Served from the stored snapshot; refreshed from ShipRocket only when stale
+            tracking = get_order_tracking(order)
+            
             tracking_data = {
                 'order_id': order.id,
                 'order_status': order.status,
@@ -522,43 +648,15 @@ class ShipmentTrackingView(views.APIView):
                 'shipped_date': order.shipped_date,
                 'delivered_date': order.delivered_date,
                 'estimated_delivery_date': order.estimated_delivery_date,
-                'tracking_history': []
+                'current_status': tracking['current_status'],
+                'current_status_display': tracking['current_status_display'],
+                'delivery_date': tracking['delivery_date'],
+                'pickup_date': tracking['pickup_date'],
+                'expected_delivery': tracking['expected_delivery'],
+                'last_synced_at': tracking['last_synced_at'],
+                'tracking_history': tracking['tracking_history']
             }
             
-            # Try to get live tracking data from ShipRocket
-            if order.awb_code:
-                try:
-                    shiprocket_tracking = shiprocket_service.track_awb(order.awb_code)
-                    
-                    if shiprocket_tracking.get('status') == 200:
-                        tracking_info = shiprocket_tracking.get('data', {})
-                        
-                        # Update tracking data with live information
-                        if tracking_info:
-                            tracking_data['current_status'] = tracking_info.get('current_status')
-                            tracking_data['current_status_display'] = tracking_info.get('current_status_body')
-                            tracking_data['delivery_date'] = tracking_info.get('delivered_date')
-                            tracking_data['pickup_date'] = tracking_info.get('pickup_date')
-                            tracking_data['expected_delivery'] = tracking_info.get('etd')
-                            
-                            # Format tracking history
-                            scans = tracking_info.get('scans', [])
-                            tracking_history = []
-                            for scan in scans:
-                                tracking_history.append({
-                                    'date': scan.get('date'),
-                                    'status': scan.get('status'),
-                                    'activity': scan.get('activity'),
-                                    'location': scan.get('location'),
-                                    'status_body': scan.get('status_body')
-                                })
-                            
-                            tracking_data['tracking_history'] = tracking_history
-                
-                except ShipRocketAPIError as e:
-                    logger.warning(f"Could not fetch live tracking for order {order.id}: {e}")
-                    # Continue with stored data
-            
             return response.Response(tracking_data, status=status.HTTP_200_OK)
         
         except Exception as e:
@@ -576,6 +674,7 @@ class PublicTrackingView(views.APIView):
     
     def get(self, request, awb_code):
         from .shiprocket_service import shiprocket_service, ShipRocketAPIError
+        from .tracking_utils import get_order_by_awb, get_order_tracking
         import logging
         
         logger = logging.getLogger(__name__)
@@ -586,6 +685,11 @@ class PublicTrackingView(views.APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
+            # AWBs we shipped are served from the stored snapshot
+            order = get_order_by_awb(awb_code)
+            if order:
+                return response.Response(get_order_tracking(order), status=status.HTTP_200_OK)
+            
             # Get tracking data from ShipRocket
             shiprocket_tracking = shiprocket_service.track_awb(awb_code)
             
@@ -702,9 +806,18 @@ class AdminShipmentManagementView(views.APIView):
                 cancel_response = shiprocket_service.cancel_shipment([order.awb_code])
                 
                 if cancel_response.get('status_code') == 1:
-                    order.status = 'cancelled'
-                    order.shiprocket_status = 'CANCELLED'
-                    order.save()
+                    from .order_utils import OrderStateMachine
+
+                    with transaction.atomic():
+                        OrderStateMachine.lock(order)
+                        previous_status = order.status
+                        if OrderStateMachine.can_transition(order.status, 'cancelled'):
+                            OrderStateMachine.apply_status(order, 'cancelled')
+                        order.shiprocket_status = 'CANCELLED'
+                        order.save(update_fields=OrderStateMachine.STATUS_FIELDS + ['shiprocket_status'])
+                        OrderStateMachine.record_transitions(
+                            [(order.id, previous_status, order.status)], 'admin', actor=request.user
+                        )
                     
                     return response.Response({
                         'success': True,
@@ -716,23 +829,31 @@ class AdminShipmentManagementView(views.APIView):
                     }, status=status.HTTP_400_BAD_REQUEST)
             
             elif action == 'sync_status':
+                from .order_utils import OrderStateMachine
+                from .tracking_utils import apply_tracking_info, fetch_tracking_info, save_shipment_events
+                
                 # Sync status from ShipRocket
                 if order.awb_code:
-                    tracking_response = shiprocket_service.track_awb(order.awb_code)
+                    tracking_info = fetch_tracking_info(order.awb_code)
                     
-                    if tracking_response.get('status') == 200:
-                        tracking_info = tracking_response.get('data', {})
+                    if tracking_info:
+                        # Update order status and scan history from tracking info
+                        with transaction.atomic():
+                            OrderStateMachine.lock(order)
+                            previous_status = order.status
+                            changed, events = apply_tracking_info(order, tracking_info)
+                            order.save(update_fields=sorted(changed) + ['updated_at'])
+                            save_shipment_events(events)
+                            OrderStateMachine.record_transitions(
+                                [(order.id, previous_status, order.status)], 'tracking', actor=request.user
+                            )
                         
-                        if tracking_info:
-                            # Update order status from tracking info
-                            order.update_from_shiprocket_webhook(tracking_info)
-                            
-                            return response.Response({
-                                'success': True,
-                                'message': 'Order status synced successfully',
-                                'current_status': order.shiprocket_status,
-                                'order_status': order.status
-                            }, status=status.HTTP_200_OK)
+                        return response.Response({
+                            'success': True,
+                            'message': 'Order status synced successfully',
+                            'current_status': order.shiprocket_status,
+                            'order_status': order.status
+                        }, status=status.HTTP_200_OK)
                     
                 return response.Response({
                     'error': 'Failed to sync status'
@@ -756,30 +877,135 @@ class AdminShipmentManagementView(views.APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AdminBulkShipmentView(views.APIView):
+    """
+    Admin view for running a shipment action on many orders in one request.
+    Returns a result per order; partial failures don't fail the request.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrSuperAdmin]
+    
+    def post(self, request):
+        from .shipment_utils import BulkShipmentActions
+        
+        action = request.data.get('action')
+        order_ids = request.data.get('order_ids')
+        
+        if action not in BulkShipmentActions.ACTIONS:
+            return response.Response({
+                'error': f"Invalid action. Supported actions: {', '.join(BulkShipmentActions.ACTIONS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not isinstance(order_ids, list) or not order_ids:
+            return response.Response({
+                'error': 'order_ids must be a non-empty list'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            # Deduplicate while keeping the caller's order
+            order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+        except (TypeError, ValueError):
+            return response.Response({
+                'error': 'order_ids must contain integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(order_ids) > BulkShipmentActions.MAX_ORDERS:
+            return response.Response({
+                'error': f'At most {BulkShipmentActions.MAX_ORDERS} orders per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = BulkShipmentActions.run(action, order_ids)
+        succeeded = sum(1 for result in results if result['success'])
+        
+        return response.Response({
+            'action': action,
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        }, status=status.HTTP_200_OK)
+
+
 # ==============================================================================
 # USER PROFILE VIEWS
 # ==============================================================================
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(SparseFieldsViewMixin, generics.ListAPIView):
     """
     Endpoint for listing a user's order history.
+    Returns cursor-paginated order summaries, live and archived orders
+    together; the full order is available from OrderDetailView.
+    ?archived=true or ?archived=false limits the list to archived or live
+    orders; ?fields= selects summary fields.
     """
-    serializer_class = OrderSerializer
+    serializer_class = OrderSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderHistoryPagination
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        from django.db.models import OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+        from .models import ArchivedOrder, OrderItem
+        from .pagination import MergedQuerySet
+
+        archived = self.request.query_params.get('archived')
+        # Summary columns are stored on the archived row
+        archived_orders = ArchivedOrder.objects.filter(user=self.request.user).only(
+            'id', 'created_at', 'status', 'total_price', 'item_count', 'thumbnail'
+        )
+        if archived == 'true':
+            return archived_orders
+
+        queryset = Order.objects.filter(user=self.request.user).only('id', 'created_at', 'status', 'total_price')
+        # The item join and image subquery only run when their fields are returned
+        if self.includes_field('item_count'):
+            queryset = queryset.annotate(item_count=Coalesce(Sum('items__quantity'), 0))
+        if self.includes_field('thumbnail'):
+            first_item_image = (
+                OrderItem.objects.filter(order=OuterRef('pk'))
+                .order_by('id').values('product__image')[:1]
+            )
+            queryset = queryset.annotate(thumbnail=Subquery(first_item_image))
+        if archived == 'false':
+            return queryset
+        # Archived ids are the original order ids, so the (-created_at, -id) cursor spans both tables
+        return MergedQuerySet(queryset, archived_orders)
 
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(SparseFieldsViewMixin, generics.RetrieveAPIView):
     """
     Endpoint for retrieving a single order.
+    ?fields= and ?expand=items,shipment select what is returned.
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        from django.db.models import Prefetch
+        from .models import OrderItem
+
+        queryset = Order.objects.filter(user=self.request.user)
+        if self.includes_field('coupon_code'):
+            queryset = queryset.select_related('applied_coupon')
+        if self.includes_field('items'):
+            queryset = queryset.prefetch_related(
+                Prefetch('items', queryset=OrderItem.objects.select_related('product', 'variant'))
+            )
+        only = self.get_only_fields()
+        return queryset.only(*only) if only else queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        from django.http import Http404
+        from .archive_utils import get_archived_order
+
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Old orders live in the archive, stored as this endpoint returned them
+            archived = get_archived_order(kwargs['pk'], user=request.user)
+            if archived is None:
+                raise
+            data = {key: value for key, value in archived.data['order'].items() if self.includes_field(key)}
+            return response.Response({**data, 'archived': True}, status=status.HTTP_200_OK)
 
 
 class OrderStatusUpdateView(views.APIView):
@@ -789,20 +1015,35 @@ class OrderStatusUpdateView(views.APIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminOrSuperAdmin]
 
     def patch(self, request, order_id):
+        new_status = request.data.get('status')
+        tracking_number = request.data.get('tracking_number')
+
+        if new_status not in ['pending', 'shipped', 'delivered', 'cancelled']:
+            return response.Response({
+                'error': 'Invalid status. Must be one of: pending, shipped, delivered, cancelled'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        from .order_utils import OrderStateMachine
+
         try:
-            order = Order.objects.get(id=order_id)
-            new_status = request.data.get('status')
-            tracking_number = request.data.get('tracking_number')
-            
-            if new_status not in ['pending', 'shipped', 'delivered', 'cancelled']:
-                return response.Response({
-                    'error': 'Invalid status. Must be one of: pending, shipped, delivered, cancelled'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            order.status = new_status
-            if tracking_number:
-                order.tracking_number = tracking_number
-            order.save()
+            with transaction.atomic():
+                # Locked so a concurrent change (e.g. a delivery webhook) can't be overwritten
+                order = Order.objects.select_for_update().get(id=order_id)
+                previous_status = order.status
+                if new_status != previous_status and not OrderStateMachine.can_transition(previous_status, new_status):
+                    return response.Response({
+                        'error': f'Cannot change order status from {previous_status} to {new_status}'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+
+                if new_status != previous_status:
+                    OrderStateMachine.apply_status(order, new_status)
+                if tracking_number:
+                    order.tracking_number = tracking_number
+                order.save()
+                OrderStateMachine.record_transitions(
+                    [(order.id, previous_status, new_status)], 'admin',
+                    actor=request.user, note=str(request.data.get('note') or '')
+                )
             
             return response.Response({
                 'message': 'Order status updated successfully',
@@ -817,6 +1058,59 @@ class OrderStatusUpdateView(views.APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
+class AdminBulkOrderStatusView(views.APIView):
+    """
+    Admin endpoint for moving many orders to one status in a single
+    transaction (e.g. warehouse batch updates). Orders whose current status
+    doesn't allow the transition are reported and left unchanged.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrSuperAdmin]
+
+    def post(self, request):
+        from .order_utils import OrderStateMachine
+
+        new_status = request.data.get('status')
+        order_ids = request.data.get('order_ids')
+        note = request.data.get('note', '')
+
+        if new_status not in OrderStateMachine.TRANSITIONS:
+            return response.Response({
+                'error': f"Invalid status. Must be one of: {', '.join(OrderStateMachine.TRANSITIONS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(order_ids, list) or not order_ids:
+            return response.Response({
+                'error': 'order_ids must be a non-empty list'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Deduplicate while keeping the caller's order
+            order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+        except (TypeError, ValueError):
+            return response.Response({
+                'error': 'order_ids must contain integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(order_ids) > OrderStateMachine.MAX_BULK_ORDERS:
+            return response.Response({
+                'error': f'At most {OrderStateMachine.MAX_BULK_ORDERS} orders per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = OrderStateMachine.bulk_transition(
+            order_ids, new_status, source='bulk', actor=request.user, note=str(note)
+        )
+        succeeded = sum(1 for result in results if result['success'])
+
+        return response.Response({
+            'status': new_status,
+            'total': len(results),
+            'succeeded': succeeded,
+            'changed': sum(1 for result in results if result.get('changed')),
+            'failed': len(results) - succeeded,
+            'results': results
+        }, status=status.HTTP_200_OK)
+
+
 class AddressViewSet(viewsets.ModelViewSet):
     """
     A ViewSet for viewing and editing a user's addresses.
@@ -839,7 +1133,10 @@ class WishlistView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        wishlist, created = Wishlist.objects.get_or_create(user=self.request.user)
+        from django.db.models import Prefetch
+        wishlist, created = Wishlist.objects.prefetch_related(
+            Prefetch('products', queryset=Product.objects.select_related('category'))
+        ).get_or_create(user=self.request.user)
         return wishlist
 
 
@@ -851,28 +1148,27 @@ class WishlistToggleView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, product_id):
-        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        try:
-            product = Product.objects.get(id=product_id)
-            if wishlist.products.filter(id=product_id).exists():
-                wishlist.products.remove(product)
-                return response.Response({
-                    "message": "Product removed from wishlist",
-                    "action": "removed",
-                    "product_id": product_id
-                }, status=status.HTTP_200_OK)
-            else:
-                wishlist.products.add(product)
-                return response.Response({
-                    "message": "Product added to wishlist",
-                    "action": "added",
-                    "product_id": product_id
-                }, status=status.HTTP_200_OK)
-        except Product.DoesNotExist:
+        from .wishlist_utils import add_to_wishlist, remove_from_wishlist
+
+        if remove_from_wishlist(request.user, product_id):
+            return response.Response({
+                "message": "Product removed from wishlist",
+                "action": "removed",
+                "product_id": product_id
+            }, status=status.HTTP_200_OK)
+
+        if not Product.objects.filter(id=product_id).exists():
             return response.Response({
                 "error": "Product not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
+        add_to_wishlist(request.user, product_id)
+        return response.Response({
+            "message": "Product added to wishlist",
+            "action": "added",
+            "product_id": product_id
+        }, status=status.HTTP_200_OK)
+
 
 class WishlistAddView(views.APIView):
     """
@@ -881,25 +1177,24 @@ class WishlistAddView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, product_id):
-        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        try:
-            product = Product.objects.get(id=product_id)
-            if wishlist.products.filter(id=product_id).exists():
-                return response.Response({
-                    "message": "Product already in wishlist",
-                    "product_id": product_id
-                }, status=status.HTTP_200_OK)
-            
-            wishlist.products.add(product)
-            return response.Response({
-                "message": "Product added to wishlist",
-                "product_id": product_id
-            }, status=status.HTTP_200_OK)
-        except Product.DoesNotExist:
+        from .wishlist_utils import add_to_wishlist
+
+        if not Product.objects.filter(id=product_id).exists():
             return response.Response({
                 "error": "Product not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
+        if not add_to_wishlist(request.user, product_id):
+            return response.Response({
+                "message": "Product already in wishlist",
+                "product_id": product_id
+            }, status=status.HTTP_200_OK)
+
+        return response.Response({
+            "message": "Product added to wishlist",
+            "product_id": product_id
+        }, status=status.HTTP_200_OK)
+
 
 class WishlistRemoveView(views.APIView):
     """
@@ -908,25 +1203,24 @@ class WishlistRemoveView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def delete(self, request, product_id):
-        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        try:
-            product = Product.objects.get(id=product_id)
-            if not wishlist.products.filter(id=product_id).exists():
-                return response.Response({
-                    "message": "Product not in wishlist",
-                    "product_id": product_id
-                }, status=status.HTTP_200_OK)
-                
-            wishlist.products.remove(product)
+        from .wishlist_utils import remove_from_wishlist
+
+        if remove_from_wishlist(request.user, product_id):
             return response.Response({
                 "message": "Product removed from wishlist",
                 "product_id": product_id
             }, status=status.HTTP_200_OK)
-        except Product.DoesNotExist:
+
+        if not Product.objects.filter(id=product_id).exists():
             return response.Response({
                 "error": "Product not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
+        return response.Response({
+            "message": "Product not in wishlist",
+            "product_id": product_id
+        }, status=status.HTTP_200_OK)
+
 
 class WishlistClearView(views.APIView):
     """
@@ -935,9 +1229,9 @@ class WishlistClearView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def delete(self, request):
-        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        product_count = wishlist.products.count()
-        wishlist.products.clear()
+        from .wishlist_utils import clear_wishlist
+
+        product_count = clear_wishlist(request.user)
         return response.Response({
             "message": f"Cleared {product_count} products from wishlist"
         }, status=status.HTTP_200_OK)
@@ -950,14 +1244,13 @@ class WishlistStatsView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        total_items = wishlist.products.count()
-        total_value = sum(product.price for product in wishlist.products.all())
-        
+        from .wishlist_utils import get_wishlist_stats
+
+        stats = get_wishlist_stats(request.user)
         return response.Response({
-            "total_items": total_items,
-            "total_value": total_value,
-            "is_empty": total_items == 0
+            "total_items": stats['total_items'],
+            "total_value": stats['total_value'],
+            "is_empty": stats['total_items'] == 0
         }, status=status.HTTP_200_OK)
 
 
@@ -968,20 +1261,51 @@ class WishlistCheckView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, product_id):
-        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        try:
-            product = Product.objects.get(id=product_id)
-            is_in_wishlist = wishlist.products.filter(id=product_id).exists()
-            return response.Response({
-                "product_id": product_id,
-                "in_wishlist": is_in_wishlist,
-                "product_name": product.name
-            }, status=status.HTTP_200_OK)
-        except Product.DoesNotExist:
+        from .wishlist_utils import is_in_wishlist
+
+        product_name = Product.objects.filter(id=product_id).values_list('name', flat=True).first()
+        if product_name is None:
             return response.Response({
                 "error": "Product not found"
             }, status=status.HTTP_404_NOT_FOUND)
 
+        return response.Response({
+            "product_id": product_id,
+            "in_wishlist": is_in_wishlist(request.user, product_id),
+            "product_name": product_name
+        }, status=status.HTTP_200_OK)
+
+
+class WishlistBulkCheckView(views.APIView):
+    """
+    Endpoint for checking many products at once, e.g. heart icons on a product grid.
+    GET /api/wishlist/check/?product_ids=1,2,3
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_PRODUCT_IDS = 200
+
+    def get(self, request):
+        from .wishlist_utils import get_wishlisted_ids
+
+        raw_ids = request.query_params.get('product_ids', '')
+        try:
+            product_ids = [int(pid) for pid in raw_ids.split(',') if pid.strip()]
+        except ValueError:
+            return response.Response({
+                "error": "product_ids must be a comma-separated list of integers"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(product_ids) > self.MAX_PRODUCT_IDS:
+            return response.Response({
+                "error": f"At most {self.MAX_PRODUCT_IDS} product ids can be checked at once"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        wishlisted = get_wishlisted_ids(request.user, product_ids) if product_ids else set()
+        return response.Response({
+            "results": {str(pid): pid in wishlisted for pid in product_ids},
+            "wishlisted_ids": sorted(wishlisted)
+        }, status=status.HTTP_200_OK)
+
 
 # ==============================================================================
 # ADMIN VIEWS
@@ -1057,30 +1381,171 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.save()
 
 
-class AdminOrderListView(generics.ListAPIView):
+class AdminOrderListView(SparseFieldsViewMixin, generics.ListAPIView):
     """
     Admin endpoint for listing all orders.
     Both admin and superadmin can view all orders.
+
+    Paginated, newest first. Filters: status, shiprocket_status, user,
+    awb_code, date_from/date_to (YYYY-MM-DD, on created_at). Items, products,
+    variants and coupons are loaded in a fixed number of queries per page,
+    and only when ?fields=/?expand= leave them in the response.
     """
-    queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrSuperAdmin]
+    pagination_class = AdminListPagination
+
+    # Columns OrderItemSerializer reads from items and their product/variant
+    ITEM_FIELDS = [
+        'id', 'order_id', 'product_id', 'variant_id', 'quantity', 'price', 'discount_amount',
+        'product__id', 'product__name', 'variant__id', 'variant__size', 'variant__color_name',
+        'variant__color_hex', 'variant__price_modifier',
+    ]
+
+    def get_queryset(self):
+        from datetime import datetime, time, timedelta
+        from django.db.models import Prefetch
+        from django.utils.dateparse import parse_date
+        from .models import OrderItem
+
+        params = self.request.query_params
+        # Each filter matches an index on Order (see Order.Meta.indexes)
+        queryset = Order.objects.all()
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'])
+        if params.get('shiprocket_status'):
+            queryset = queryset.filter(shiprocket_status=params['shiprocket_status'])
+        if params.get('user', '').isdigit():
+            queryset = queryset.filter(user_id=params['user'])
+        if params.get('awb_code'):
+            queryset = queryset.filter(awb_code=params['awb_code'])
+        # Compare created_at against day boundaries so the index can be used
+        try:
+            date_from = parse_date(params.get('date_from', ''))
+            date_to = parse_date(params.get('date_to', ''))
+        except ValueError:
+            # Well-formed but impossible dates such as 2024-02-30
+            raise serializers.ValidationError({'error': 'date_from and date_to must be valid dates (YYYY-MM-DD)'})
+        if date_from:
+            queryset = queryset.filter(created_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+        if date_to:
+            queryset = queryset.filter(
+                created_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+            )
+
+        if self.includes_field('coupon_code'):
+            queryset = queryset.select_related('applied_coupon')
+        if self.includes_field('items'):
+            items = OrderItem.objects.select_related('product', 'variant').only(*self.ITEM_FIELDS)
+            queryset = queryset.prefetch_related(Prefetch('items', queryset=items))
+        only = self.get_only_fields()
+        if only:
+            queryset = queryset.only(*only, 'created_at')
+        else:
+            queryset = queryset.defer('package_details', 'tracking_summary')
+        return queryset.order_by('-created_at', '-id')
+
+
+class AdminExportMixin:
+    """
+    Streams the view's queryset as a CSV or NDJSON download (?output=csv|ndjson)
+    instead of a JSON page. Filters of the list view apply to the export.
+    """
+    export_name = None
+    export_columns = None
+    read_from_replica = True
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('output', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return response.Response({
+                'error': f"Invalid output. Must be one of: {', '.join(EXPORT_FORMATS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # values_list() ignores select_related/only; prefetches would be wasted work
+        queryset = self.get_queryset().prefetch_related(None).order_by('id')
+        return stream_export(queryset, self.export_columns, self.export_name, export_format)
+
+
+class AdminOrderExportView(AdminExportMixin, AdminOrderListView):
+    """
+    Admin endpoint for exporting all orders.
+    """
+    export_name = 'orders'
+    export_columns = ORDER_EXPORT_COLUMNS
+
+
+class AdminUserExportView(AdminExportMixin, AdminUserListView):
+    """
+    SuperAdmin endpoint for exporting all users.
+    """
+    export_name = 'users'
+    export_columns = USER_EXPORT_COLUMNS
 
 
 class AdminSalesReportView(views.APIView):
     """
     Admin endpoint for generating a sales report.
     Both admin and superadmin can view sales reports.
+
+    Query params: start/end (YYYY-MM-DD, end inclusive; default last 30 days),
+    granularity (hour/day/week/month), status (comma-separated; cancelled
+    orders are excluded by default), breakdown (category/product/variant/
+    gender/coupon) and limit. Served from the hourly sales rollups.
     """
     permission_classes = [permissions.IsAuthenticated, IsAdminOrSuperAdmin]
+    read_from_replica = True
 
     def get(self, request):
-        total_sales = Order.objects.aggregate(total_sales=Sum('total_price'))['total_sales'] or 0
-        total_orders = Order.objects.count()
-        report = {
-            'total_sales': total_sales,
-            'total_orders': total_orders,
-        }
+        from datetime import datetime, time, timedelta
+        from django.utils import timezone
+        from django.utils.dateparse import parse_date
+        from .analytics_utils import BREAKDOWNS, DEFAULT_REPORT_STATUSES, GRANULARITIES, get_sales_report
+
+        params = request.query_params
+        today = timezone.localdate()
+        try:
+            start_date = parse_date(params.get('start', '')) if params.get('start') else today - timedelta(days=29)
+            end_date = parse_date(params.get('end', '')) if params.get('end') else today
+        except ValueError:
+            # Well-formed but impossible dates such as 2024-02-30
+            start_date = end_date = None
+        if not start_date or not end_date or start_date > end_date:
+            return response.Response({
+                'error': 'start and end must be dates (YYYY-MM-DD) with start <= end'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        granularity = params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return response.Response({
+                'error': f"Invalid granularity. Must be one of: {', '.join(GRANULARITIES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        statuses = [value for value in params.get('status', '').split(',') if value] or DEFAULT_REPORT_STATUSES
+        valid_statuses = {choice for choice, _ in Order.STATUS_CHOICES}
+        if not set(statuses) <= valid_statuses:
+            return response.Response({
+                'error': f"Invalid status. Must be one of: {', '.join(sorted(valid_statuses))}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        breakdown = params.get('breakdown')
+        if breakdown and breakdown not in BREAKDOWNS:
+            return response.Response({
+                'error': f"Invalid breakdown. Must be one of: {', '.join(BREAKDOWNS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(max(int(params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+
+        start = timezone.make_aware(datetime.combine(start_date, time.min))
+        end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+        report = get_sales_report(start, end, granularity, statuses, breakdown, limit)
+
+        # Kept for existing dashboard clients
+        report['total_sales'] = report['summary']['net_sales']
+        report['total_orders'] = report['summary']['orders']
         return response.Response(report, status=status.HTTP_200_OK)
 
 
@@ -1115,8 +1580,16 @@ class CouponValidationView(views.APIView):
 
             if is_valid:
                 from .coupon_utils import CouponCalculator
+                from .shiprocket_utils import ShipRocketHelper
+
+                # Free shipping is worth the real courier rate to the customer's pincode
+                shipping_cost = None
+                delivery_pincode = serializer.validated_data.get('delivery_pincode')
+                if coupon.discount_type == 'free_shipping' and delivery_pincode:
+                    shipping_cost = ShipRocketHelper.get_cached_shipping_cost(delivery_pincode)
+
                 discount_amount, final_total = CouponCalculator.calculate_discount(
-                    coupon, order_total
+                    coupon, order_total, shipping_cost=shipping_cost
                 )
                 
                 return response.Response({
@@ -1225,11 +1698,20 @@ class AdminCouponUsageView(generics.ListAPIView):
         return queryset
 
 
+class AdminCouponUsageExportView(AdminExportMixin, AdminCouponUsageView):
+    """
+    Admin endpoint for exporting coupon usage (same filters as the listing)
+    """
+    export_name = 'coupon-usage'
+    export_columns = COUPON_USAGE_EXPORT_COLUMNS
+
+
 class AdminCouponStatsView(views.APIView):
     """
     Admin endpoint for coupon analytics and statistics
     """
     permission_classes = [permissions.IsAuthenticated, IsAdminOrSuperAdmin]
+    read_from_replica = True
 
     def get(self, request):
         # Overall coupon statistics
@@ -1239,11 +1721,13 @@ class AdminCouponStatsView(views.APIView):
             valid_until__lt=timezone.now()
         ).count()
         
-        # Usage statistics
-        total_usage = CouponUsage.objects.count()
-        total_discount_given = CouponUsage.objects.aggregate(
-            total=models.Sum('discount_amount')
-        )['total'] or 0
+        # Usage statistics (archived orders' usage included)
+        from .models import ArchivedCouponUsage
+        total_usage = CouponUsage.objects.count() + ArchivedCouponUsage.objects.count()
+        total_discount_given = (
+            (CouponUsage.objects.aggregate(total=models.Sum('discount_amount'))['total'] or 0)
+            + (ArchivedCouponUsage.objects.aggregate(total=models.Sum('discount_amount'))['total'] or 0)
+        )
         
         # Top coupons by usage
         from django.db import models
@@ -1281,6 +1765,7 @@ class AdminCouponStatsView(views.APIView):
 class TestimonialListView(generics.ListCreateAPIView):
     serializer_class = TestimonialSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    read_from_replica = True
     
     def get_queryset(self):
         queryset = Testimonial.objects.filter(is_approved=True)
@@ -1342,12 +1827,55 @@ class ContactMessageResolveView(views.APIView):
 
 
 # Enhanced Product Views with variants and images
-class EnhancedProductListView(generics.ListAPIView):
+class EnhancedProductQuerysetMixin(SparseFieldsViewMixin):
+    """
+    Product queryset for EnhancedProductSerializer that joins, prefetches
+    and aggregates only what ?fields=/?expand= leave in the response.
+    """
+
+    def get_product_queryset(self):
+        from django.db.models import Prefetch
+        from .models import Review
+
+        queryset = Product.objects.all()
+        if self.includes_field('category'):
+            queryset = queryset.select_related('category')
+        prefetches = [name for name in ('variants', 'images') if self.includes_field(name)]
+        if self.includes_field('reviews'):
+            prefetches.append(Prefetch('reviews', queryset=Review.objects.select_related('user')))
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        if self.includes_field('average_rating') or self.includes_field('review_count'):
+            queryset = queryset.annotate(
+                approved_rating_avg=Avg('reviews__rating', filter=Q(reviews__is_approved=True)),
+                approved_review_count=Count('reviews', filter=Q(reviews__is_approved=True))
+            )
+        only = self.get_only_fields()
+        return queryset.only(*only) if only else queryset
+
+
+class EnhancedProductListView(EnhancedProductQuerysetMixin, generics.ListAPIView):
     serializer_class = EnhancedProductSerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        
+        # ?with_wishlist=true adds in_wishlist to each product from the cached id set
+        with_wishlist = self.request.query_params.get('with_wishlist')
+        if with_wishlist == 'true' and self.request.user.is_authenticated:
+            from .wishlist_utils import get_cached_wishlist_ids
+            context['wishlist_ids'] = get_cached_wishlist_ids(self.request.user.id)
+        
+        return context
+    
+    def is_card_request(self):
+        return self.request.query_params.get('card') == 'true'
+
     def get_queryset(self):
-        queryset = Product.objects.prefetch_related('variants', 'images', 'reviews')
+        # Cards project their own columns; see list()
+        queryset = Product.objects.all() if self.is_card_request() else self.get_product_queryset()
         
         # Category filter (multiple categories)
         categories = self.request.query_params.get('categories')
@@ -1382,11 +1910,31 @@ class EnhancedProductListView(generics.ListAPIView):
         
         return queryset.order_by('-created_at')
 
+    def list(self, request, *args, **kwargs):
+        # ?card=true returns compact grid cards (no variants, images or reviews)
+        if not self.is_card_request():
+            return super().list(request, *args, **kwargs)
+
+        from .product_card_utils import GRID_CARD_FIELD_SPECS, GRID_CARD_FIELDS, build_product_cards
 
-class EnhancedProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.prefetch_related('variants', 'images', 'reviews')
+        fields = [name for name in GRID_CARD_FIELDS if self.includes_field(name)]
+        cards = build_product_cards(
+            self.filter_queryset(self.get_queryset()), fields, request=request, specs=GRID_CARD_FIELD_SPECS
+        )
+        wishlist_ids = self.get_serializer_context().get('wishlist_ids')
+        if wishlist_ids is not None:
+            for card in cards:
+                card['in_wishlist'] = card['id'] in wishlist_ids
+        return response.Response(cards)
+
+
+class EnhancedProductDetailView(EnhancedProductQuerysetMixin, generics.RetrieveAPIView):
     serializer_class = EnhancedProductSerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
+
+    def get_queryset(self):
+        return self.get_product_queryset()
 
 
 # Product Variant Views
@@ -1417,6 +1965,7 @@ class ProductImageViewSet(viewsets.ModelViewSet):
 class ReviewListCreateView(generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    read_from_replica = True
     
     def get_queryset(self):
         product_id = self.request.query_params.get('product')
@@ -1431,9 +1980,13 @@ class ReviewListCreateView(generics.ListCreateAPIView):
         user = self.request.user
         
         # Check if user has ordered this product
+        from .models import ArchivedOrderItem
         has_purchased = Order.objects.filter(
             user=user,
             items__product=product
+        ).exists() or ArchivedOrderItem.objects.filter(
+            order__user=user,
+            product_id=product.id
         ).exists()
         
         serializer.save(
@@ -1490,58 +2043,57 @@ class RedeemRewardPointsView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
-        points_to_redeem = request.data.get('points', 0)
+        from django.db import transaction
+        from .reward_utils import redeem_points, InsufficientPointsError
+
+        try:
+            points_to_redeem = int(request.data.get('points', 0))
+        except (TypeError, ValueError):
+            return response.Response({
+                'error': 'Points must be a whole number'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         if points_to_redeem < 1000:
             return response.Response({
                 'error': 'Minimum 1000 points required for redemption'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        reward_points, created = RewardPoints.objects.get_or_create(user=request.user)
+        # Create coupon worth points/1000 in rupees
+        coupon_value = points_to_redeem // 1000
+        coupon_code = f"REWARD{request.user.id}{timezone.now().strftime('%Y%m%d%H%M%S')}"
         
-        if reward_points.total_points < points_to_redeem:
+        try:
+            # Debit, coupon and ledger entry succeed or fail together
+            with transaction.atomic():
+                remaining_points = redeem_points(
+                    request.user, points_to_redeem, f"Redeemed for coupon {coupon_code}"
+                )
+                
+                coupon = Coupon.objects.create(
+                    code=coupon_code,
+                    name=f"Reward Redemption - ₹{coupon_value}",
+                    description=f"Redeemed from {points_to_redeem} reward points",
+                    discount_type='fixed',
+                    discount_value=coupon_value,
+                    valid_from=timezone.now(),
+                    valid_until=timezone.now() + timezone.timedelta(days=30),
+                    max_uses_per_user=1,
+                    is_active=True,
+                    created_by=request.user
+                )
+                
+                # Add user restriction
+                coupon.user_restrictions.add(request.user)
+        except InsufficientPointsError:
             return response.Response({
                 'error': 'Insufficient points'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create coupon worth points/1000 in rupees
-        coupon_value = points_to_redeem // 1000
-        coupon_code = f"REWARD{request.user.id}{timezone.now().strftime('%Y%m%d%H%M')}"
-        
-        # Create the coupon
-        coupon = Coupon.objects.create(
-            code=coupon_code,
-            name=f"Reward Redemption - ₹{coupon_value}",
-            description=f"Redeemed from {points_to_redeem} reward points",
-            discount_type='fixed',
-            discount_value=coupon_value,
-            valid_from=timezone.now(),
-            valid_until=timezone.now() + timezone.timedelta(days=30),
-            max_uses_per_user=1,
-            is_active=True,
-            created_by=request.user
-        )
-        
-        # Add user restriction
-        coupon.user_restrictions.add(request.user)
-        
-        # Deduct points
-        reward_points.total_points -= points_to_redeem
-        reward_points.save()
-        
-        # Record transaction
-        RewardTransaction.objects.create(
-            user=request.user,
-            transaction_type='redeem',
-            points=-points_to_redeem,
-            description=f"Redeemed for coupon {coupon_code}"
-        )
-        
         return response.Response({
             'message': f'Successfully redeemed {points_to_redeem} points',
             'coupon_code': coupon_code,
             'coupon_value': coupon_value,
-            'remaining_points': reward_points.total_points
+            'remaining_points': remaining_points
         }, status=status.HTTP_200_OK)
 
 
@@ -1549,6 +2101,7 @@ class RedeemRewardPointsView(views.APIView):
 class BannerListView(generics.ListAPIView):
     serializer_class = BannerSerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
 
     def get_queryset(self):
         queryset = Banner.objects.filter(is_active=True)
@@ -1587,6 +2140,7 @@ class SpotlightListView(generics.ListAPIView):
     queryset = Spotlight.objects.filter(is_active=True).order_by('order', '-created_at')
     serializer_class = SpotlightSerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
 
 
 class AdminSpotlightViewSet(viewsets.ModelViewSet):
@@ -1729,35 +2283,33 @@ class EnhancedOrderSerializer(OrderSerializer):
 
 
 # New Arrival Products View
-class NewArrivalProductsView(generics.ListAPIView):
+class NewArrivalProductsView(SparseFieldsViewMixin, generics.ListAPIView):
     serializer_class = NewArrivalProductSerializer
     permission_classes = [permissions.AllowAny]
+    read_from_replica = True
+
+    limit = 20
 
     def get_queryset(self):
         from datetime import timedelta
         thirty_days_ago = timezone.now() - timedelta(days=30)
-        return Product.objects.filter(
-            created_at__gte=thirty_days_ago
-        ).select_related('category').annotate(
-            average_rating=Avg('reviews__rating', filter=Q(reviews__is_approved=True)),
-            review_count=Count('reviews', filter=Q(reviews__is_approved=True))
-        ).order_by('-created_at')[:20]
+        return Product.objects.filter(created_at__gte=thirty_days_ago).order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        from .product_card_utils import NEW_ARRIVAL_CARD_FIELDS, build_product_cards
+
+        # Same output as NewArrivalProductSerializer, built from one values_list() query;
+        # review stats are only aggregated when ?fields= keeps them
+        fields = [name for name in NEW_ARRIVAL_CARD_FIELDS if self.includes_field(name)]
+        cards = build_product_cards(self.get_queryset(), fields, request=request, limit=self.limit)
+        return response.Response(cards)
 
 
 # Reward Point Utility Function
 def award_reward_points(user, points, description, order=None):
     """Utility function to award points to user"""
-    reward_points, created = RewardPoints.objects.get_or_create(user=user)
-    reward_points.total_points += points
-    reward_points.save()
-    
-    RewardTransaction.objects.create(
-        user=user,
-        transaction_type='earn',
-        points=points,
-        description=description,
-        order=order
-    )
+    from .reward_utils import award_points
+    return award_points(user, points, description, order=order)
 
 
 # ==============================================================================
@@ -0,0 +1,233 @@
+# backend/api/webhook_processor.py
+
+import hashlib
+import logging
+from typing import Dict, Set, Tuple
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .order_utils import OrderStateMachine
+from .models import Order, ShipmentWebhookEvent
+from .shiprocket_utils import ShipRocketHelper
+from .tracking_utils import build_shipment_events, save_shipment_events
+
+logger = logging.getLogger(__name__)
+
+
+class ShipRocketWebhookProcessor:
+    """
+    Two-stage ShipRocket webhook handling:
+    record_event() stores the raw payload on receipt (deduplicated), and
+    process_pending() applies stored events to orders in batches.
+    """
+
+    # Once a shipment reaches one of these, older in-flight events are ignored
+    TERMINAL_STATUSES = {'DELIVERED', 'CANCELLED', 'RTO', 'LOST', 'DAMAGED'}
+
+    # Order columns the processor reads or writes
+    ORDER_FIELDS = [
+        'id', 'status', 'awb_code', 'shiprocket_status', 'courier_company_name',
+        'courier_company_id', 'shipped_date', 'delivered_date', 'estimated_delivery_date',
+        'tracking_synced_at',
+    ]
+
+    @staticmethod
+    def build_dedup_key(parsed_data: Dict) -> str:
+        """Stable key for a delivery: same AWB, status and event time means a retry"""
+        raw = '|'.join(str(parsed_data.get(key) or '') for key in (
+            'awb_code', 'order_id', 'current_status', 'event_timestamp'
+        ))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def record_event(webhook_data: Dict) -> Tuple[ShipmentWebhookEvent, bool]:
+        """
+        Persist a webhook payload. Returns (event, created); created is False
+        when the same event was already received.
+        """
+        parsed_data = ShipRocketHelper.parse_shiprocket_webhook(webhook_data)
+        dedup_key = ShipRocketWebhookProcessor.build_dedup_key(parsed_data)
+
+        try:
+            with transaction.atomic():
+                event = ShipmentWebhookEvent.objects.create(
+                    dedup_key=dedup_key,
+                    awb_code=parsed_data.get('awb_code'),
+                    order_reference=str(parsed_data['order_id']) if parsed_data.get('order_id') else None,
+                    current_status=parsed_data.get('current_status'),
+                    event_time=ShipRocketHelper.parse_datetime(parsed_data.get('event_timestamp')),
+                    payload=webhook_data,
+                )
+            return event, True
+        except IntegrityError:
+            return ShipmentWebhookEvent.objects.get(dedup_key=dedup_key), False
+
+    @staticmethod
+    def process_pending(batch_size: int = 500) -> Dict[str, int]:
+        """
+        Apply one batch of pending events. Events are applied in event-time
+        order, orders are resolved with one query for the whole batch and
+        each order is written once with only the changed columns.
+        Rows are claimed with SKIP LOCKED so several workers can run side by side.
+        """
+        counts = {'processed': 0, 'ignored': 0, 'failed': 0}
+
+        with transaction.atomic():
+            events = list(
+                ShipmentWebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(processing_status='pending')
+                .order_by('received_at', 'id')[:batch_size]
+            )
+            if not events:
+                return counts
+
+            order_ids = {
+                int(event.order_reference) for event in events
+                if event.order_reference and event.order_reference.isdigit()
+            }
+            awb_codes = {event.awb_code for event in events if event.awb_code}
+            # Locked (in id order) so transitions are checked against committed statuses
+            orders = Order.objects.select_for_update().filter(
+                Q(id__in=order_ids) | Q(awb_code__in=awb_codes)
+            ).only(*ShipRocketWebhookProcessor.ORDER_FIELDS).order_by('id')
+
+            orders_by_id = {order.id: order for order in orders}
+            original_statuses = {order.id: order.status for order in orders_by_id.values()}
+            orders_by_awb = {order.awb_code: order for order in orders_by_id.values() if order.awb_code}
+
+            events.sort(key=lambda event: (event.event_time or event.received_at, event.id))
+            changed_fields = {}
+            shipment_events = []
+            now = timezone.now()
+
+            for event in events:
+                order = None
+                if event.order_reference and event.order_reference.isdigit():
+                    order = orders_by_id.get(int(event.order_reference))
+                if order is None and event.awb_code:
+                    order = orders_by_awb.get(event.awb_code)
+
+                event.processed_at = now
+                if order is None:
+                    # The order may not exist yet; --retry-failed requeues the event later
+                    event.processing_status = 'failed'
+                    event.error = 'Order not found'
+                    counts['failed'] += 1
+                    logger.warning(f"No order found for webhook event {event.id}: "
+                                   f"order_id={event.order_reference}, awb_code={event.awb_code}")
+                    continue
+
+                event.order = order
+                try:
+                    parsed_data = ShipRocketHelper.parse_shiprocket_webhook(event.payload)
+                    superseded = ShipRocketWebhookProcessor.is_superseded(order, parsed_data.get('current_status'))
+                    fields = ShipRocketWebhookProcessor.apply_event(order, parsed_data)
+                    # A webhook is as fresh as a poll, so it also resets the tracking TTL
+                    order.tracking_synced_at = now
+                    fields.add('tracking_synced_at')
+                    changed_fields.setdefault(order.id, set()).update(fields)
+                    shipment_events.extend(
+                        ShipRocketWebhookProcessor.build_scan_events(order, event, parsed_data)
+                    )
+                    # Late in-transit events still add their scans but don't change the order
+                    if superseded:
+                        event.processing_status = 'ignored'
+                        event.error = 'Shipment already in a final status'
+                        counts['ignored'] += 1
+                    else:
+                        event.processing_status = 'processed'
+                        counts['processed'] += 1
+                except Exception as e:
+                    event.processing_status = 'failed'
+                    event.error = str(e)
+                    counts['failed'] += 1
+                    logger.error(f"Failed to apply webhook event {event.id} to order {order.id}: {e}")
+
+            for order_id, fields in changed_fields.items():
+                if fields:
+                    orders_by_id[order_id].save(update_fields=sorted(fields) + ['updated_at'])
+                    logger.info(f"Order {order_id} updated from webhook: fields={sorted(fields)}")
+
+            save_shipment_events(shipment_events)
+            OrderStateMachine.record_transitions(
+                [(order_id, original_statuses[order_id], orders_by_id[order_id].status)
+                 for order_id, fields in changed_fields.items() if 'status' in fields],
+                'webhook'
+            )
+            ShipmentWebhookEvent.objects.bulk_update(
+                events, ['processing_status', 'error', 'order', 'processed_at']
+            )
+
+        return counts
+
+    @staticmethod
+    def build_scan_events(order: Order, event: ShipmentWebhookEvent, parsed_data: Dict):
+        """
+        Scan history rows for a webhook: its scans when included, otherwise
+        the status change itself as a single scan.
+        """
+        awb_code = order.awb_code or event.awb_code
+        if not awb_code:
+            return []
+        scans = parsed_data.get('tracking_data') or [{
+            'date': parsed_data.get('event_timestamp') or event.received_at.isoformat(),
+            'status': event.current_status,
+            'activity': event.payload.get('current_status_body') or event.current_status,
+            'location': event.payload.get('current_location') or '',
+        }]
+        return build_shipment_events(order.id, awb_code, scans, 'webhook')
+
+    @staticmethod
+    def is_superseded(order: Order, current_status) -> bool:
+        """True for a non-final status arriving after the shipment reached a final one"""
+        return (order.shiprocket_status in ShipRocketWebhookProcessor.TERMINAL_STATUSES
+                and current_status not in ShipRocketWebhookProcessor.TERMINAL_STATUSES)
+
+    @staticmethod
+    def apply_event(order: Order, webhook_data: Dict) -> Set[str]:
+        """
+        Update order attributes from parsed webhook data.
+        Returns the names of the fields that actually changed.
+        """
+        changed = set()
+
+        def set_field(name, value):
+            if getattr(order, name) != value:
+                setattr(order, name, value)
+                changed.add(name)
+
+        current_status = webhook_data.get('current_status', '')
+
+        # A late event must not move a finished shipment back into transit
+        if ShipRocketWebhookProcessor.is_superseded(order, current_status):
+            return changed
+
+        if current_status:
+            set_field('shiprocket_status', current_status)
+        if 'courier_company' in webhook_data:
+            set_field('courier_company_name', webhook_data['courier_company'])
+        if 'courier_id' in webhook_data:
+            set_field('courier_company_id', str(webhook_data['courier_id']))
+
+        # Update dates based on status; order status only follows allowed transitions
+        if current_status == 'PICKED_UP' and not order.shipped_date:
+            set_field('shipped_date',
+                      ShipRocketHelper.parse_datetime(webhook_data.get('pickup_date')) or timezone.now())
+            if OrderStateMachine.can_transition(order.status, 'shipped'):
+                set_field('status', 'shipped')
+
+        elif current_status == 'DELIVERED' and not order.delivered_date:
+            set_field('delivered_date',
+                      ShipRocketHelper.parse_datetime(webhook_data.get('delivery_date')) or timezone.now())
+            if OrderStateMachine.can_transition(order.status, 'delivered'):
+                set_field('status', 'delivered')
+
+        elif current_status in ['CANCELLED', 'RTO', 'LOST']:
+            if OrderStateMachine.can_transition(order.status, 'cancelled'):
+                set_field('status', 'cancelled')
+
+        expected_delivery = ShipRocketHelper.parse_datetime(webhook_data.get('expected_delivery'))
+        if expected_delivery:
+            set_field('estimated_delivery_date', expected_delivery)
+
+        return changed
@@ -9,8 +9,8 @@ from django.utils.decorators import method_decorator
 from rest_framework import views, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from .models import Order
 from .shiprocket_utils import ShipRocketHelper
+from .webhook_processor import ShipRocketWebhookProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -44,38 +44,15 @@ class ShipRocketWebhookView(views.APIView):
                     'error': 'Invalid webhook data: missing order_id or awb_code'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Find the order
-            order = None
-            
-            # Try to find by order ID first
-            if order_id:
-                try:
-                    order = Order.objects.get(id=order_id)
-                except Order.DoesNotExist:
-                    logger.warning(f"Order with ID {order_id} not found")
-            
-            # If not found by order ID, try by AWB code
-            if not order and awb_code:
-                try:
-                    order = Order.objects.get(awb_code=awb_code)
-                except Order.DoesNotExist:
-                    logger.warning(f"Order with AWB {awb_code} not found")
-            
-            if not order:
-                logger.error(f"No order found for webhook data: order_id={order_id}, awb_code={awb_code}")
-                return Response({
-                    'error': 'Order not found'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
-            # Update order with webhook data
-            self._update_order_from_webhook(order, parsed_data)
-            
-            logger.info(f"Successfully processed webhook for order {order.id}")
-            
+            # Store the event and acknowledge; orders are updated by the batch processor
+            event, created = ShipRocketWebhookProcessor.record_event(webhook_data)
+            if not created:
+                logger.info(f"Duplicate ShipRocket webhook ignored: event {event.id}")
+
             return Response({
                 'success': True,
-                'message': 'Webhook processed successfully',
-                'order_id': order.id,
+                'message': 'Webhook accepted' if created else 'Duplicate webhook ignored',
+                'event_id': event.id,
                 'status': current_status
             }, status=status.HTTP_200_OK)
         
@@ -90,69 +67,6 @@ class ShipRocketWebhookView(views.APIView):
             return Response({
                 'error': 'Webhook processing failed'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    def _update_order_from_webhook(self, order: Order, webhook_data: dict):
-        """
-        Update order based on webhook data
-        """
-        from django.utils import timezone
-        from datetime import datetime
-        
-        # Update basic ShipRocket information
-        if 'current_status' in webhook_data:
-            order.shiprocket_status = webhook_data['current_status']
-        
-        if 'courier_company' in webhook_data:
-            order.courier_company_name = webhook_data['courier_company']
-        
-        if 'courier_id' in webhook_data:
-            order.courier_company_id = webhook_data['courier_id']
-        
-        # Update dates based on status
-        current_status = webhook_data.get('current_status', '')
-        
-        if current_status == 'PICKED_UP' and not order.shipped_date:
-            if 'pickup_date' in webhook_data and webhook_data['pickup_date']:
-                try:
-                    order.shipped_date = datetime.fromisoformat(webhook_data['pickup_date'].replace('Z', '+00:00'))
-                except:
-                    order.shipped_date = timezone.now()
-            else:
-                order.shipped_date = timezone.now()
-            
-            # Update Django order status
-            if order.status == 'pending':
-                order.status = 'shipped'
-        
-        elif current_status == 'DELIVERED' and not order.delivered_date:
-            if 'delivery_date' in webhook_data and webhook_data['delivery_date']:
-                try:
-                    order.delivered_date = datetime.fromisoformat(webhook_data['delivery_date'].replace('Z', '+00:00'))
-                except:
-                    order.delivered_date = timezone.now()
-            else:
-                order.delivered_date = timezone.now()
-            
-            # Update Django order status
-            order.status = 'delivered'
-        
-        elif current_status in ['CANCELLED', 'RTO', 'LOST']:
-            order.status = 'cancelled'
-        
-        # Update estimated delivery date
-        if 'expected_delivery' in webhook_data and webhook_data['expected_delivery']:
-            try:
-                order.estimated_delivery_date = datetime.fromisoformat(
-                    webhook_data['expected_delivery'].replace('Z', '+00:00')
-                )
-            except:
-                pass
-        
-        # Save the updated order
-        order.save()
-        
-        # Log the update
-        logger.info(f"Order {order.id} updated from webhook: status={current_status}, django_status={order.status}")
 
 
 @csrf_exempt
@@ -206,10 +120,14 @@ class ShipRocketWebhookTestView(views.APIView):
         mock_request = type('MockRequest', (), {'data': sample_webhook})()
         response = webhook_view.post(mock_request)
         
+        # Apply immediately so the result is visible without the background worker
+        processed = ShipRocketWebhookProcessor.process_pending()
+        
         return Response({
             'message': 'Test webhook processed',
             'sample_data': sample_webhook,
-            'processing_result': response.data if hasattr(response, 'data') else 'Unknown'
+            'processing_result': response.data if hasattr(response, 'data') else 'Unknown',
+            'batch_result': processed
         }, status=status.HTTP_200_OK)
     
     def get(self, request):
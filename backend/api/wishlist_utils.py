@@ -0,0 +1,99 @@
+# backend/api/wishlist_utils.py
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Sum
+from .models import Product, Wishlist
+
+# Rows of the wishlist <-> product m2m table
+WishlistItem = Wishlist.products.through
+
+# Kept in the shared cache so a change made through one process is seen by all
+WISHLIST_IDS_CACHE_KEY = "wishlist_ids:{user_id}"
+
+
+def invalidate_wishlist_cache(user_id):
+    """Drop the cached product id set after any wishlist change"""
+    caches['shared'].delete(WISHLIST_IDS_CACHE_KEY.format(user_id=user_id))
+
+
+def get_cached_wishlist_ids(user_id):
+    """
+    Wishlisted product ids for a user as a frozenset, served from cache.
+    The cache holds a sorted tuple of ids, so even large wishlists stay compact.
+    """
+    cache_key = WISHLIST_IDS_CACHE_KEY.format(user_id=user_id)
+    product_ids = caches['shared'].get(cache_key)
+    if product_ids is None:
+        product_ids = tuple(sorted(
+            WishlistItem.objects.filter(wishlist__user_id=user_id).values_list('product_id', flat=True)
+        ))
+        caches['shared'].set(cache_key, product_ids, timeout=getattr(settings, 'WISHLIST_CACHE_TIMEOUT', 300))
+    return frozenset(product_ids)
+
+
+def get_wishlist_id(user, create=False):
+    """
+    Id of the user's wishlist without loading the row.
+    Returns None if the user has no wishlist and create is False.
+    """
+    wishlist_id = Wishlist.objects.filter(user=user).values_list('id', flat=True).first()
+    if wishlist_id is None and create:
+        wishlist_id = Wishlist.objects.get_or_create(user=user)[0].id
+    return wishlist_id
+
+
+def is_in_wishlist(user, product_id):
+    """Single existence check on the through table"""
+    return WishlistItem.objects.filter(wishlist__user=user, product_id=product_id).exists()
+
+
+def get_wishlisted_ids(user, product_ids=None):
+    """Set of product ids in the user's wishlist, optionally limited to product_ids"""
+    items = WishlistItem.objects.filter(wishlist__user=user)
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+    return set(items.values_list('product_id', flat=True))
+
+
+def add_to_wishlist(user, product_id):
+    """
+    Add a product by id. Returns True if it was added, False if already present.
+    Callers must check the product exists.
+    """
+    wishlist_id = get_wishlist_id(user, create=True)
+    if WishlistItem.objects.filter(wishlist_id=wishlist_id, product_id=product_id).exists():
+        return False
+    WishlistItem.objects.bulk_create(
+        [WishlistItem(wishlist_id=wishlist_id, product_id=product_id)],
+        ignore_conflicts=True
+    )
+    invalidate_wishlist_cache(user.id)
+    return True
+
+
+def remove_from_wishlist(user, product_id):
+    """Remove a product by id. Returns True if a row was deleted."""
+    deleted, _ = WishlistItem.objects.filter(wishlist__user=user, product_id=product_id).delete()
+    if deleted:
+        invalidate_wishlist_cache(user.id)
+    return deleted > 0
+
+
+def clear_wishlist(user):
+    """Remove every product from the user's wishlist. Returns the number removed."""
+    deleted, _ = WishlistItem.objects.filter(wishlist__user=user).delete()
+    invalidate_wishlist_cache(user.id)
+    return deleted
+
+
+def get_wishlist_stats(user):
+    """Item count and total value computed in the database"""
+    stats = Product.objects.filter(wishlists__user=user).aggregate(
+        total_items=Count('id'),
+        total_value=Sum('price')
+    )
+    return {
+        'total_items': stats['total_items'],
+        'total_value': stats['total_value'] or 0,
+    }
@@ -3,8 +3,10 @@ Django settings for main project.
 Generated by 'django-admin startproject' using Django 5.2.4.
 """
 
+import copy
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -69,6 +71,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'main.urls'
@@ -97,11 +100,58 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        # Keep connections open between requests instead of reconnecting every time
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        # Check a reused connection is still alive before handing it to a request
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+        },
     }
 }
 
+# Connection pool shared by the threads of a worker (requires psycopg 3: pip install "psycopg[pool]").
+# Replaces persistent connections, which Django does not allow together with a pool.
+if os.environ.get('DB_POOL', 'false').lower() == 'true':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+        'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    }
+
+# Behind PgBouncer in transaction pooling mode a cursor can't outlive its transaction,
+# so server-side cursors are disabled and streaming reads page by primary key instead
+if os.environ.get('DB_PGBOUNCER', 'false').lower() == 'true':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Read replicas ("host:port,host:port") for catalog reads, admin reports and exports.
+# Same credentials as the primary; tests mirror the primary instead.
+REPLICA_DATABASES = []
+for number, address in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **copy.deepcopy(DATABASES['default']),
+        'HOST': host,
+        'PORT': port or '5432',
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['api.replica_utils.ReplicaRouter']
+
+# After writing, a user reads from the primary for this long (seconds)
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+
+# Replicas further behind than this are skipped until they catch up (seconds)
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '2'))
+
+# How often each process re-checks replica lag (seconds)
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', '5'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -206,8 +256,8 @@ SHIPROCKET_EMAIL = os.environ.get('SHIPROCKET_EMAIL')
 SHIPROCKET_PASSWORD = os.environ.get('SHIPROCKET_PASSWORD')
 
 # ShipRocket Configuration
-SHIPROCKET_BASE_URL = 'https://apiv2.shiprocket.in/v1/external'
-SHIPROCKET_AUTH_URL = 'https://apiv2.shiprocket.in/v1/external/auth/login'
+SHIPROCKET_BASE_URL = os.environ.get('SHIPROCKET_BASE_URL', 'https://apiv2.shiprocket.in/v1/external')
+SHIPROCKET_AUTH_URL = os.environ.get('SHIPROCKET_AUTH_URL', SHIPROCKET_BASE_URL + '/auth/login')
 
 # Default pickup address (can be overridden per order)
 SHIPROCKET_DEFAULT_PICKUP = {
@@ -233,6 +283,42 @@ SHIPROCKET_DEFAULT_DIMENSIONS = {
     'weight': float(os.environ.get('SHIPROCKET_DEFAULT_WEIGHT', '0.5')),  # kg
 }
 
+# Volumetric weight = L x B x H (cm) / divisor; ShipRocket bills the greater of actual and volumetric
+SHIPROCKET_VOLUMETRIC_DIVISOR = int(os.environ.get('SHIPROCKET_VOLUMETRIC_DIVISOR', '5000'))
+
+# Fallback shipping cost for free-shipping coupons when no courier rate is available
+COUPON_DEFAULT_SHIPPING_COST = os.environ.get('COUPON_DEFAULT_SHIPPING_COST', '10.00')
+
+# Reward points credited per ₹100 of a delivered order
+REWARD_POINTS_PER_100 = int(os.environ.get('REWARD_POINTS_PER_100', '10'))
+
+# Reward points earned expire after this many days (0 disables expiry)
+REWARD_POINTS_EXPIRY_DAYS = int(os.environ.get('REWARD_POINTS_EXPIRY_DAYS', '365'))
+
+# How long a user's wishlisted product ids stay cached for product grids (seconds)
+WISHLIST_CACHE_TIMEOUT = int(os.environ.get('WISHLIST_CACHE_TIMEOUT', '300'))
+
+# Delivered/cancelled orders (and settled reward ledger entries) older than
+# this many days are moved to the archive tables by archive_orders
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', '365'))
+
+# Maximum ShipRocket tracking calls per second made by sync_shipments
+SHIPROCKET_TRACKING_RATE_LIMIT = float(os.environ.get('SHIPROCKET_TRACKING_RATE_LIMIT', '5'))
+
+# Shipments per ShipRocket call and concurrent calls for bulk admin shipment actions
+SHIPROCKET_BULK_CHUNK_SIZE = int(os.environ.get('SHIPROCKET_BULK_CHUNK_SIZE', '50'))
+SHIPROCKET_BULK_WORKERS = int(os.environ.get('SHIPROCKET_BULK_WORKERS', '4'))
+
+# How long tracking snapshots stay fresh, in seconds, by ShipRocket status.
+# Statuses not listed use the default; delivered/cancelled shipments are never refreshed.
+SHIPMENT_TRACKING_TTL = {
+    'default': int(os.environ.get('SHIPMENT_TRACKING_TTL_DEFAULT', '1800')),
+    'NEW': 7200,
+    'AWB_ASSIGNED': 7200,
+    'PICKUP_GENERATED': 3600,
+    'OUT_FOR_DELIVERY': 600,
+}
+
 # Cache configuration for ShipRocket tokens
 CACHES = {
     'default': {
@@ -245,6 +331,40 @@ CACHES = {
     }
 }
 
+# Cache shared by all processes (ShipRocket token, cross-process locks and
+# version stamps). Uses Redis when REDIS_URL is set, a database table when
+# SHARED_CACHE_TABLE is set (run `python manage.py createcachetable`), and
+# falls back to per-process memory for single-process development.
+if os.environ.get('REDIS_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'KEY_PREFIX': 'groovystreetz',
+    }
+elif os.environ.get('SHARED_CACHE_TABLE'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ['SHARED_CACHE_TABLE'],
+    }
+else:
+    if REPLICA_DATABASES:
+        # Primary pins written by one process must be seen by all of them
+        raise ImproperlyConfigured(
+            'DB_REPLICA_HOSTS needs a cache shared between processes; set REDIS_URL or SHARED_CACHE_TABLE'
+        )
+    # Not gated on DEBUG, which is hardcoded and can't tell production apart
+    warnings.warn(
+        'Neither REDIS_URL nor SHARED_CACHE_TABLE is set; the shared cache is per-process memory'
+    )
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    }
+
+# ShipRocket tokens last 240 hours; refresh in the background this long before expiry
+SHIPROCKET_TOKEN_LIFETIME_HOURS = int(os.environ.get('SHIPROCKET_TOKEN_LIFETIME_HOURS', '239'))
+SHIPROCKET_TOKEN_REFRESH_BEFORE_HOURS = int(os.environ.get('SHIPROCKET_TOKEN_REFRESH_BEFORE_HOURS', '24'))
+
 # Logging configuration for ShipRocket
 LOGGING = {
     'version': 1,